@@ -1,34 +1,83 @@
-
-import os
-import streamlit as st
-import requests
+import concurrent.futures
 import json
 
+from ai_transport import CallTimer, get_ai_transport
+from config import get_secret, get_int
+from response_cache import SOURCE_UPSTREAM, get_response_cache, response_key
+from sse import CompletionStream
+from translation_cache import get_translation_cache
+
+# 译文缓存键中的目标语言
+TRANSLATION_TARGET_LANG = "zh-Hans"
+
+
+# 批量翻译的分片配置，可通过环境变量调整
+# chunk_tokens: 每个请求的原文估算 token 上限 (译文长度与原文相当，需给输出留足余量)
+# chunk_items: 每个请求最多的条目数，条目越多模型越容易漏译导致长度不一致
+# workers: 同时进行的翻译请求数
+TRANSLATION_CONFIG = {
+    'chunk_tokens': get_int("CROW_TRANSLATE_CHUNK_TOKENS", 1500),
+    'chunk_items': get_int("CROW_TRANSLATE_CHUNK_ITEMS", 40),
+    'workers': get_int("CROW_TRANSLATE_WORKERS", 4)
+}
+
+# _request_translation 的失败类型：格式错误可以拆小重试，请求失败只整体重试
+FAILURE_FORMAT = "format"
+FAILURE_REQUEST = "request"
+
+
+def estimate_tokens(text):
+    """
+    粗略估算 token 数：ASCII 约 4 个字符一个 token，其他字符 (中文等) 约一个字符一个 token
+    """
+    ascii_chars = sum(1 for c in text if c < "\x80")
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars) + 1
+
+
+def chunk_texts(texts, max_tokens=None, max_items=None):
+    """
+    按 token 预算顺序切分文本列表，单条超出预算的文本独占一片
+    Returns: [[text, ...], ...]
+    """
+    max_tokens = max_tokens or TRANSLATION_CONFIG['chunk_tokens']
+    max_items = max_items or TRANSLATION_CONFIG['chunk_items']
+    chunks = []
+    current = []
+    budget = 0
+    for text in texts:
+        # JSON 数组中每条还有引号、逗号等开销
+        cost = estimate_tokens(text) + 2
+        if current and (budget + cost > max_tokens or len(current) >= max_items):
+            chunks.append(current)
+            current = []
+            budget = 0
+        current.append(text)
+        budget += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
 class DoubaoAI:
     def __init__(self, api_key=None, model_id=None):
         self.api_key = api_key
         self.model_id = model_id
         self.base_url = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+        # 所有实例共用连接池 (Streamlit 每次重跑都会新建客户端)
+        self.transport = get_ai_transport()
+        # 最近一次调用的指标 (ttft / tokens_per_sec 等)，见 ai_transport.CallTimer
+        self.last_metrics = None
         
         if not self.api_key:
-            try:
-                self.api_key = st.secrets["doubao"]["api_key"]
-            except:
-                try:
-                    self.api_key = st.secrets["DOUBAO_API_KEY"]
-                except:
-                    pass
+            self.api_key = get_secret("doubao.api_key", "DOUBAO_API_KEY")
         
         if not self.model_id:
-            try:
-                self.model_id = st.secrets["doubao"]["model_id"]
-            except:
-                try:
-                    self.model_id = st.secrets["DOUBAO_MODEL_ID"]
-                except:
-                    pass
+            self.model_id = get_secret("doubao.model_id", "DOUBAO_MODEL_ID")
 
-    def generate_summary(self, text_content, context_type="general"):
+    def generate_summary(self, text_content, context_type="general", use_cache=True):
+        """
+        流式生成总结；相同的数据和提示词在缓存有效期内直接重放已完成的回答，
+        同时到达的相同请求共用一次上游调用 (见 response_cache)
+        """
         if not self.api_key:
             yield "Error: API Key not configured."
             return
@@ -43,41 +92,30 @@ class DoubaoAI:
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": f"Here is the data:\n\n{text_content}"}
         ]
-        
-        payload = {
-            "model": self.model_id,
-            "messages": messages,
-            "temperature": 0.7,
-            "stream": True
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
 
-        try:
-            with requests.post(self.base_url, headers=headers, json=payload, stream=True, timeout=180) as response:
-                if response.status_code != 200:
-                    yield f"API Error {response.status_code}: {response.text}"
-                    return
+        if not use_cache:
+            yield from self._stream_completion(messages, temperature=0.7, kind="summary", error_label="Request Error")
+            return
 
-                for line in response.iter_lines():
-                    if line:
-                        line = line.decode('utf-8')
-                        if line.startswith("data: "):
-                            data_str = line[6:]
-                            if data_str.strip() == "[DONE]":
-                                break
-                            try:
-                                json_data = json.loads(data_str)
-                                content = json_data['choices'][0]['delta'].get('content', '')
-                                if content:
-                                    yield content
-                            except json.JSONDecodeError:
-                                continue
-        except Exception as e:
-            yield f"Request Error: {str(e)}"
+        def producer(outcome):
+            return self._stream_completion(messages, temperature=0.7, kind="summary", error_label="Request Error", outcome=outcome)
+
+        key = response_key(messages, self.model_id, 0.7)
+        info = {}
+        timer = CallTimer("summary", self.model_id)
+        output = []
+        try:
+            for chunk in get_response_cache().stream(key, producer, info):
+                timer.mark_first_token()
+                output.append(chunk)
+                yield chunk
+        finally:
+            upstream = info.get('outcome', {}).get('metrics')
+            if info.get('source') == SOURCE_UPSTREAM and upstream:
+                self.last_metrics = upstream
+            else:
+                # 命中缓存或跟读其他请求：记录本次请求方实际感受到的延迟
+                self.last_metrics = timer.finish(sum(estimate_tokens(t) for t in output), backend=info.get('source'))
 
     def chat(self, messages):
         """
@@ -87,49 +125,153 @@ class DoubaoAI:
             yield "Error: API Key not configured."
             return
 
+        yield from self._stream_completion(messages, temperature=0.7, kind="chat", error_label="Stream Error")
+
+    def _headers(self):
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    def _stream_completion(self, messages, temperature, kind, error_label, outcome=None):
+        """
+        流式调用，逐段 yield 输出文本；结束后把本次调用的指标写入 self.last_metrics
+        outcome: 可选的字典，结束时写入 'status' ("ok" 表示完整成功) 和 'metrics'
+        """
         payload = {
             "model": self.model_id,
             "messages": messages,
-            "temperature": 0.7,
-            "stream": True
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
+            "temperature": temperature,
+            "stream": True,
+            # 最后一个事件附带 usage，用于计算 tokens/s
+            "stream_options": {"include_usage": True}
         }
 
+        timer = CallTimer(kind, self.model_id)
+        output = []
+        stream = None
+        status = "ok"
         try:
-            with requests.post(self.base_url, headers=headers, json=payload, stream=True, timeout=180) as response:
+            with self.transport.post(self.base_url, self._headers(), payload, stream=True, timeout=180) as response:
                 if response.status_code != 200:
+                    status = f"http_{response.status_code}"
                     yield f"API Error {response.status_code}: {response.text}"
                     return
 
-                for line in response.iter_lines():
-                    if line:
-                        line = line.decode('utf-8')
-                        if line.startswith("data: "):
-                            data_str = line[6:]
-                            if data_str.strip() == "[DONE]":
-                                break
-                            try:
-                                data = json.loads(data_str)
-                                content = data['choices'][0]['delta'].get('content', '')
-                                if content:
-                                    yield content
-                            except:
-                                pass
+                stream = CompletionStream(response.iter_bytes())
+                try:
+                    for content in stream:
+                        timer.mark_first_token()
+                        output.append(content)
+                        yield content
+                finally:
+                    # 先让后台读取线程退出，再离开 with 块关闭响应
+                    stream.close()
+
+                if stream.error:
+                    status = "error"
+                    yield f"\n\n{error_label}: {stream.error}"
+                elif not stream.completed:
+                    # 读到 [DONE] 才算完整，连接中途断开时不能当作成功 (不会进入回答缓存)
+                    status = "incomplete"
         except Exception as e:
-            yield f"Stream Error: {str(e)}"
+            status = "error"
+            yield f"{error_label}: {str(e)}"
+        finally:
+            if status == "ok" and (stream is None or not stream.completed):
+                # 调用方中途停止读取
+                status = "incomplete"
+            usage = stream.usage if stream is not None else None
+            # 没有 usage 时按输出文本估算
+            tokens = (usage or {}).get('completion_tokens')
+            if tokens is None:
+                tokens = sum(estimate_tokens(t) for t in output)
+            if stream is not None and stream.invalid_events:
+                print(f"Skipped {stream.invalid_events} malformed stream events.")
+            self.last_metrics = timer.finish(
+                tokens, status=status, backend=self.transport.backend,
+                finish_reason=stream.finish_reason if stream is not None else None,
+                usage=usage
+            )
+            if outcome is not None:
+                outcome['metrics'] = self.last_metrics
+                outcome['status'] = status
 
-    def batch_translate(self, texts):
+    def batch_translate(self, texts, use_cache=True):
         """
         批量翻译文本列表 (English -> Chinese)
-        Returns: list of translated strings
+        已翻译过的文本直接从持久化缓存读取，未命中的部分按 token 预算分片后并发请求
+        Returns: list of translated strings (与输入顺序一致，翻译失败的条目保留原文)
         """
         if not self.api_key or not texts:
             return texts
-            
+
+        # 空文本无需翻译，重复文本只翻译一次
+        pending = list(dict.fromkeys(t for t in texts if isinstance(t, str) and t.strip()))
+        if not pending:
+            return texts
+
+        cache = None
+        translated = {}
+        if use_cache:
+            try:
+                cache = get_translation_cache()
+                translated = cache.get_many(pending, TRANSLATION_TARGET_LANG, self.model_id)
+            except Exception as e:
+                print(f"Translation cache unavailable: {e}")
+                cache = None
+
+        misses = [t for t in pending if t not in translated]
+        if misses:
+            chunks = chunk_texts(misses)
+            workers = max(1, min(TRANSLATION_CONFIG['workers'], len(chunks)))
+            if workers == 1:
+                results = [self._translate_chunk(chunk) for chunk in chunks]
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    # map 按提交顺序返回，结果与分片一一对应
+                    results = list(executor.map(self._translate_chunk, chunks))
+
+            fresh = {}
+            for chunk, result in zip(chunks, results):
+                for text, translation in zip(chunk, result):
+                    if translation is not None:
+                        fresh[text] = translation
+            translated.update(fresh)
+            if cache is not None and fresh:
+                cache.put_many(list(fresh.items()), TRANSLATION_TARGET_LANG, self.model_id)
+
+        # 翻译失败的条目保留原文 (Fallback)，且不写入缓存，下次重试
+        return [translated.get(t, t) if isinstance(t, str) else t for t in texts]
+
+    def _translate_chunk(self, texts, retried=False):
+        """
+        翻译一个分片，返回与 texts 等长的列表，失败的条目为 None
+        返回格式不对 (通常是漏译/合并导致长度不一致) 时对半拆分重试，只重做出错的部分；
+        请求本身失败 (超时、限流等) 时整片重试一次
+        """
+        result, failure = self._request_translation(texts)
+        if result is not None:
+            return result
+
+        if failure == FAILURE_REQUEST:
+            if retried:
+                return [None] * len(texts)
+            return self._translate_chunk(texts, retried=True)
+
+        if len(texts) == 1:
+            if retried:
+                return [None]
+            return self._translate_chunk(texts, retried=True)
+
+        middle = len(texts) // 2
+        return self._translate_chunk(texts[:middle]) + self._translate_chunk(texts[middle:])
+
+    def _request_translation(self, texts):
+        """
+        调用接口翻译一批文本
+        Returns: (与 texts 等长的译文列表, None)，失败时返回 (None, FAILURE_FORMAT / FAILURE_REQUEST)
+        """
         # 简单处理：将文本列表合并为一个 prompt 发送，然后解析返回结果
         # 为了稳定性，我们使用 JSON 格式交互
         
@@ -155,35 +297,51 @@ class DoubaoAI:
             "stream": False
         }
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
+        timer = CallTimer("translate", self.model_id, streaming=False)
+        status = "ok"
+        output_tokens = 0
         try:
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=60)
-            if response.status_code == 200:
-                res_json = response.json()
-                content = res_json['choices'][0]['message']['content']
-                # 尝试解析 JSON
-                # 有时候模型会返回 markdown code block，需要处理
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                translated_texts = json.loads(content)
-                if isinstance(translated_texts, list) and len(translated_texts) == len(texts):
-                    return translated_texts
-                else:
-                    print("Translation returned invalid format or length mismatch.")
-                    return texts # Fallback
-            else:
-                print(f"Translation API Error: {response.status_code}")
-                return texts
+            with self.transport.post(self.base_url, self._headers(), payload, timeout=60) as response:
+                if response.status_code != 200:
+                    status = f"http_{response.status_code}"
+                    print(f"Translation API Error: {response.status_code}")
+                    return None, FAILURE_REQUEST
+                try:
+                    res_json = response.json()
+                except ValueError as e:
+                    # 响应体本身不是 JSON (网关错误页、被截断的响应等)，属于请求失败，拆分重试没有意义
+                    status = "error"
+                    print(f"Translation API returned a non-JSON body: {e}")
+                    return None, FAILURE_REQUEST
+
+            timer.mark_first_token()
+            output_tokens = (res_json.get('usage') or {}).get('completion_tokens') or 0
+            content = res_json['choices'][0]['message']['content']
+            # 尝试解析 JSON
+            # 有时候模型会返回 markdown code block，需要处理
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0].strip()
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0].strip()
+
+            translated_texts = json.loads(content)
+            if isinstance(translated_texts, list) and len(translated_texts) == len(texts) \
+                    and all(isinstance(t, str) for t in translated_texts):
+                return translated_texts, None
+            status = "format"
+            print(f"Translation returned invalid format or length mismatch ({len(texts)} items).")
+            return None, FAILURE_FORMAT
+        except ValueError as e:
+            # 模型返回的译文不是合法的 JSON
+            status = "format"
+            print(f"Translation returned invalid JSON: {e}")
+            return None, FAILURE_FORMAT
         except Exception as e:
+            status = "error"
             print(f"Translation Exception: {e}")
-            return texts
+            return None, FAILURE_REQUEST
+        finally:
+            self.last_metrics = timer.finish(output_tokens, status=status, backend=self.transport.backend)
 
 def get_doubao_client(api_key=None, model_id=None):
     return DoubaoAI(api_key, model_id)
@@ -0,0 +1,216 @@
+import collections
+import contextlib
+import importlib.util
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import get_secret, get_int, get_float
+
+# 大模型接口 (方舟) 的共享连接层
+# 所有 DoubaoAI 实例共用一个连接池，同一 host 的并发请求复用已建立的 TLS 连接。
+# 安装了 httpx 和 h2 时默认使用 HTTP/2，多个请求在同一条连接上多路复用；否则使用 requests 连接池。
+# 每次调用记录首字延迟 (TTFT) 与输出速度 (tokens/s)。
+
+HAS_HTTPX = importlib.util.find_spec("httpx") is not None
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
+
+# 连接配置，可通过环境变量调整
+# http2: auto (依赖齐全时启用) / on / off
+# max_connections: 连接池上限 (HTTP/2 下多个请求共用一条连接，通常远小于并发数)
+# keepalive_expiry: 空闲连接保持的秒数
+AI_HTTP_CONFIG = {
+    'http2': str(get_secret("CROW_AI_HTTP2", default="auto")).strip().lower(),
+    'max_connections': get_int("CROW_AI_POOL_MAXSIZE", 8),
+    'keepalive_expiry': get_float("CROW_AI_KEEPALIVE", 60),
+    'connect_timeout': get_float("CROW_AI_CONNECT_TIMEOUT", 10)
+}
+
+# 最近调用的指标，页面和基准脚本可以读取
+METRICS_HISTORY = 100
+
+
+class AIResponse:
+    """
+    统一 requests / httpx 响应的最小接口
+    """
+
+    def __init__(self, response, backend):
+        self._response = response
+        self.backend = backend
+        self.status_code = response.status_code
+
+    @property
+    def text(self):
+        if self.backend == "httpx":
+            self._response.read()
+        return self._response.text
+
+    def json(self):
+        if self.backend == "httpx":
+            self._response.read()
+        return self._response.json()
+
+    def iter_bytes(self):
+        """
+        按网络到达的块返回原始字节
+        """
+        if self.backend == "httpx":
+            return self._response.iter_bytes()
+        return self._response.iter_content(chunk_size=None)
+
+
+class AITransport:
+    def __init__(self, config):
+        self.config = dict(config)
+        self.backend = self._pick_backend()
+        self._client = self._build_client()
+
+    def _pick_backend(self):
+        mode = self.config['http2']
+        if mode in ("off", "0", "false", "no"):
+            return "requests"
+        if HAS_HTTPX and HAS_H2:
+            return "httpx"
+        if mode != "auto":
+            print("httpx[http2] not installed, using requests for AI calls.")
+        return "requests"
+
+    def _build_client(self):
+        if self.backend == "httpx":
+            import httpx
+            limits = httpx.Limits(
+                max_connections=self.config['max_connections'],
+                max_keepalive_connections=self.config['max_connections'],
+                keepalive_expiry=self.config['keepalive_expiry']
+            )
+            return httpx.Client(http2=True, limits=limits)
+
+        # POST 不自动重试 (按 token 计费)，连接池满时阻塞等待
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.config['max_connections'],
+            max_retries=0,
+            pool_block=True
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _timeout(self, timeout):
+        if self.backend == "httpx":
+            import httpx
+            return httpx.Timeout(timeout, connect=self.config['connect_timeout'])
+        return (self.config['connect_timeout'], timeout)
+
+    @contextlib.contextmanager
+    def post(self, url, headers, payload, stream=False, timeout=60):
+        """
+        发送 JSON POST，yield AIResponse；stream=True 时在 with 块内逐块读取
+        """
+        if self.backend == "httpx":
+            with self._client.stream("POST", url, headers=headers, json=payload, timeout=self._timeout(timeout)) as response:
+                yield AIResponse(response, self.backend)
+            return
+
+        response = self._client.post(url, headers=headers, json=payload, stream=stream, timeout=self._timeout(timeout))
+        try:
+            yield AIResponse(response, self.backend)
+        finally:
+            response.close()
+
+    def close(self):
+        self._client.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_ai_transport():
+    """
+    获取全局共享的 AITransport (线程安全的懒加载)
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = AITransport(AI_HTTP_CONFIG)
+    return _transport
+
+
+def configure_ai_http(**overrides):
+    """
+    调整连接配置并重建连接池，例如 configure_ai_http(http2="off", max_connections=4)
+    """
+    global _transport
+    unknown = set(overrides) - set(AI_HTTP_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown AI HTTP config keys: {sorted(unknown)}")
+
+    with _transport_lock:
+        AI_HTTP_CONFIG.update(overrides)
+        old_transport = _transport
+        _transport = AITransport(AI_HTTP_CONFIG)
+    if old_transport is not None:
+        old_transport.close()
+
+
+_metrics = collections.deque(maxlen=METRICS_HISTORY)
+_metrics_lock = threading.Lock()
+
+
+class CallTimer:
+    """
+    记录一次调用的耗时：
+    ttft: 发出请求到收到第一段输出的秒数 (非流式调用即完整响应的耗时)
+    tokens_per_sec: 输出 token 数 / 首字之后的生成时间 (非流式调用按完整耗时计算)
+    """
+
+    def __init__(self, kind, model=None, streaming=True):
+        self.kind = kind
+        self.model = model
+        self.streaming = streaming
+        self.start = time.perf_counter()
+        self.first_token = None
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, output_tokens=0, status="ok", backend=None, **extra):
+        """
+        extra: 附加字段，例如流式调用的 finish_reason / usage
+        """
+        end = time.perf_counter()
+        first = self.first_token or end
+        generation = end - first if self.streaming else end - self.start
+        metrics = {
+            'kind': self.kind,
+            'model': self.model,
+            'backend': backend,
+            'status': status,
+            'ttft': round(first - self.start, 4),
+            'duration': round(end - self.start, 4),
+            'output_tokens': output_tokens,
+            'tokens_per_sec': round(output_tokens / generation, 1) if output_tokens and generation > 0 else None
+        }
+        metrics.update(extra)
+        with _metrics_lock:
+            _metrics.append(metrics)
+        return metrics
+
+
+def get_recent_metrics(kind=None):
+    """
+    返回最近的调用指标 (旧 -> 新)，可按类型过滤
+    """
+    with _metrics_lock:
+        items = list(_metrics)
+    if kind:
+        items = [m for m in items if m['kind'] == kind]
+    return items
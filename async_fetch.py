@@ -0,0 +1,160 @@
+import asyncio
+import importlib.util
+import json
+import threading
+import time
+import urllib.parse
+from requests.structures import CaseInsensitiveDict
+
+# aiohttp 只在真正使用 asyncio 后端时才导入
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+
+from config import get_secret
+from http_client import DEFAULT_USER_AGENT, ACCEPT_ENCODING
+
+# 基于 asyncio 的抓取引擎
+# 单线程内同时挂起成百上千个请求，按 host 限制并发，超时的请求会被取消。
+# 通过 fetch_many() 提供同步接口，Streamlit 等同步代码可以直接调用。
+
+BACKEND_THREAD = "thread"
+BACKEND_ASYNC = "async"
+
+# 默认抓取后端，可通过 CROW_FETCH_BACKEND=async 全局切换，也可以在调用 get_* 时单独指定
+DEFAULT_BACKEND = get_secret("CROW_FETCH_BACKEND", default=BACKEND_THREAD)
+
+
+def resolve_backend(backend=None):
+    """
+    确定实际使用的后端：未安装 aiohttp 时回退到线程池
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == BACKEND_ASYNC and not HAS_AIOHTTP:
+        print("aiohttp not installed, falling back to thread backend.")
+        return BACKEND_THREAD
+    if backend not in (BACKEND_THREAD, BACKEND_ASYNC):
+        raise ValueError(f"Unknown fetch backend: {backend}")
+    return backend
+
+
+class FetchResult:
+    """
+    异步请求的结果，接口与 requests.Response 常用部分保持一致，方便复用解析函数
+    """
+    def __init__(self, url, status_code=None, headers=None, content=b"", error=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.content = content
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.status_code is not None and self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncFetchEngine:
+    def __init__(self, per_host_limit=8, total_limit=100, timeout=10):
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.timeout = timeout
+
+    async def _fetch_one(self, aiohttp, session, semaphores, req):
+        url = req['url']
+        host = urllib.parse.urlsplit(url).netloc
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        timeout = req.get('timeout', self.timeout)
+
+        async with semaphore:
+            try:
+                async with session.request(
+                    req.get('method', 'GET'),
+                    url,
+                    headers=req.get('headers'),
+                    data=req.get('data'),
+                    json=req.get('json'),
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    content = await response.read()
+                    return FetchResult(url, response.status, dict(response.headers), content)
+            except asyncio.TimeoutError:
+                return FetchResult(url, error=f"timeout after {timeout}s")
+            except Exception as e:
+                return FetchResult(url, error=str(e))
+
+    async def fetch_all(self, reqs, total_timeout=None):
+        """
+        并发执行所有请求，返回与 reqs 顺序一致的 FetchResult 列表
+        total_timeout 到期时取消仍未完成的请求
+        """
+        if not reqs:
+            return []
+
+        import aiohttp
+
+        # 按 host 的并发由信号量控制 (超时从拿到信号量后才开始计算)，连接器只限制总连接数
+        connector = aiohttp.TCPConnector(limit=self.total_limit)
+        headers = {'User-Agent': DEFAULT_USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+        semaphores = {}
+
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+            tasks = [asyncio.create_task(self._fetch_one(aiohttp, session, semaphores, req)) for req in reqs]
+            done, pending = await asyncio.wait(tasks, timeout=total_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for req, task in zip(reqs, tasks):
+            if task in done and not task.cancelled():
+                results.append(task.result())
+            else:
+                results.append(FetchResult(req['url'], error=f"cancelled after {total_timeout}s"))
+        return results
+
+
+def run_sync(coro):
+    """
+    在同步代码中执行协程。
+    当前线程已有运行中的事件循环时 (例如在 Jupyter 中)，在独立线程里执行，避免嵌套 asyncio.run。
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+
+    def runner():
+        try:
+            outcome['result'] = asyncio.run(coro)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def fetch_many(reqs, per_host_limit=8, timeout=10, total_timeout=None, deadline=None):
+    """
+    同步接口：批量抓取
+    reqs: [{'url': ..., 'method': 'GET', 'headers': {...}, 'data': ..., 'json': ..., 'timeout': 秒}]
+    deadline: time.monotonic() 下的截止时间 (例如 run_fanout 分配给数据源的截止时间)，到期时取消仍未完成的请求
+    Returns: 与 reqs 顺序一致的 FetchResult 列表
+    """
+    if deadline is not None:
+        remaining = max(0.0, deadline - time.monotonic())
+        total_timeout = remaining if total_timeout is None else min(total_timeout, remaining)
+    engine = AsyncFetchEngine(per_host_limit=per_host_limit, timeout=timeout)
+    return run_sync(engine.fetch_all(reqs, total_timeout=total_timeout))
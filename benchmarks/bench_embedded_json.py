@@ -0,0 +1,113 @@
+"""
+__INITIAL_STATE__ 提取基准
+
+在多 MB 的探索页上比较原来的逐字符括号匹配 + 全局 replace("undefined", "null")
+与 embedded_json.extract_js_object，并校验新实现不会改写字符串中的 "undefined"。
+有录制的 benchmarks/fixtures/xhs_explore.html 时一并测试。
+
+用法:
+    python -m benchmarks.bench_embedded_json
+    python -m benchmarks.bench_embedded_json --sizes 1024,8192 --iterations 3
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.fixtures import _fixture_file, load_fixture, make_xhs_explore
+
+
+def legacy_extract(html):
+    # 优化前 fetch_xhs_explore_hot 中的实现
+    key = "__INITIAL_STATE__="
+    idx = html.find(key)
+    if idx == -1:
+        return None
+    start = html.find("{", idx)
+    if start == -1:
+        return None
+    brace = 0
+    in_str = False
+    esc = False
+    end = -1
+    for i in range(start, len(html)):
+        c = html[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif c == "\\":
+                esc = True
+            elif c == "\"":
+                in_str = False
+        else:
+            if c == "\"":
+                in_str = True
+            elif c == "{":
+                brace += 1
+            elif c == "}":
+                brace -= 1
+                if brace == 0:
+                    end = i + 1
+                    break
+    if end == -1:
+        return None
+    return json.loads(html[start:end].replace("undefined", "null"))
+
+
+def _best_of(func, iterations):
+    best = None
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _titles(state):
+    from embedded_json import get_path
+    feeds = get_path(state, ('feed', 'feeds')) or []
+    return [f.get('noteCard', {}).get('displayTitle') for f in feeds if isinstance(f, dict)]
+
+
+def run(sizes_kb, iterations):
+    from embedded_json import extract_js_object
+
+    pages = [(f"synthetic {kb} KB padding", make_xhs_explore(notes=400, padding_kb=kb).decode("utf-8")) for kb in sizes_kb]
+    if _fixture_file('xhs_explore.html'):
+        pages.append(("recorded xhs_explore.html", load_fixture('xhs_explore.html').decode("utf-8", errors="replace")))
+
+    ok = True
+    for label, html in pages:
+        legacy_time, legacy_state = _best_of(lambda: legacy_extract(html), iterations)
+        new_time, new_state = _best_of(lambda: extract_js_object(html, "__INITIAL_STATE__="), iterations)
+        if new_state is None:
+            ok = False
+            print(f"{label}: extraction failed")
+            continue
+
+        new_titles = _titles(new_state)
+        # 新实现保留字符串中的 "undefined"，旧实现会把它改成 "null"
+        corrupted = sum(1 for t in _titles(legacy_state or {}) if t and '"null"' in t)
+        preserved = sum(1 for t in new_titles if t and '"undefined"' in t)
+        if label.startswith("synthetic") and preserved != len(new_titles):
+            ok = False
+
+        print(f"{label:<32} {len(html) / 1024 / 1024:>6.2f} MB  legacy {legacy_time * 1000:>9.1f} ms  "
+              f"new {new_time * 1000:>8.1f} ms  ({legacy_time / new_time:.1f}x)  "
+              f"notes {len(new_titles)}  legacy-corrupted titles {corrupted}")
+    return ok
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="__INITIAL_STATE__ extraction benchmark")
+    arg_parser.add_argument("--sizes", default="0,1024,4096", help="合成页面的填充大小 (KB)，逗号分隔")
+    arg_parser.add_argument("--iterations", type=int, default=3)
+    args = arg_parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    return 0 if run(sizes, args.iterations) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+摘要 HTML 转文本：快速提取器与 BeautifulSoup 的等价性校验和性能对比
+
+校验三类输入：RSS 样本经 feedparser 解析后的真实摘要、手工整理的残缺 HTML、
+按固定种子随机拼接的标签/实体片段。每条输入同时校验完整文本和提前停止 (max_chars) 的结果。
+
+用法:
+    python -m benchmarks.bench_html_text
+    python -m benchmarks.bench_html_text --fuzz 50000 --iterations 20
+"""
+import argparse
+import random
+import sys
+import time
+import warnings
+
+import feedparser
+
+from benchmarks.fixtures import load_fixture, make_rss
+
+MALFORMED_CASES = [
+    "a <!-- b", "a<!--x-->b", "a<!-->b", "a<!--->b", "a<!---->b",
+    "a<script>var x=1<2;</script>b", "a<script>x", "<SCRIPT>x</SCRIPT>y", "a<style>p{}</style>b",
+    "x<![CDATA[ y ]]>z", "x<![CDATA[ y", "a<!DOCTYPE html>b", "a<?php x ?>b", "a<!>b", "a<?>b",
+    "x<![if !IE]>y<![endif]>z", "a < b", "a<3 b", "a<", "a<b", "a<b c", "<a href=\"x\"",
+    "a</ b>c", "a</>b", "a</x y>c", "<a title='x>y'>t</a>u", "a<b\nclass='c'>x", "<a href='x'/>y",
+    "a &amp; b &mdash &#39; &#x27; &bogus; &amp", "a&apos;b&hellip;c&NotEqualTilde;d&nbsp;e",
+    "&#150;&#0;&#xD800;&#99999999;&#65", "a&#39b", "a&#x27z", "a&#x;b<p>c</p>&#39b<p>d", "a & b", "a&", "a&#",
+    "a&;b", "a&1b", "&AMP;&Amp;&lt&LT&gtx", "a&amp<b>c</b>", "a&lt;b&gt;c",
+    "<rt>x</rt>y", "<template><p>x</p></template>y", "<p><rt>x</p>y", "a<noscript>x</noscript>b",
+    "a<textarea><b>x</b></textarea>c", "<pre>  </pre>x<p> \t </p>y", "<p>x</p>\n<p>y</p>",
+    "  \n a \n ", "a\x00b", "a<br/>b<br>c<br />d"
+]
+
+FUZZ_TOKENS = [
+    "<p>", "</p>", "<b>", "</b>", "<br>", "<br/>", "<a href='x>y'>", "</a>", "<!-- c -->", "<!--", "-->",
+    "<![CDATA[ d ]]>", "<!DOCTYPE html>", "<?pi?>", "&amp;", "&amp", "&mdash", "&#39;", "&#x27;", "&#150;",
+    "&bogus;", "&", "<", " < ", ">", "</>", "</ x>", "</x y>", "text", "中文", "  ", "\n", " \t\n ",
+    "<pre>", "</pre>", "<rt>", "</rt>", "<template>", "</template>", "<textarea>", "</textarea>",
+    "<script>x<y</script>", "<style>a{}</style>", "<img src=\"a.png\" alt='b'>", "word ", "&nbsp;",
+    "&lt;b&gt;", "<p class=\"x\">", "<div>", "</div>", "<B>", "</B >", "<![if !IE]>", "&#x;", "&#65",
+    "&#39b", "&#x1F600;", "&#128;", "&hellip;", "&notin;", "<script/>", "<br />"
+]
+
+
+def fixture_summaries():
+    summaries = []
+    for name in ('rss_generic.xml', 'rss_hn.xml', 'rss_reddit.xml'):
+        parsed = feedparser.parse(load_fixture(name))
+        summaries.extend(getattr(e, 'summary', getattr(e, 'description', '')) for e in parsed.entries)
+    # 再生成一批更长的摘要，覆盖提前停止
+    for seed in range(5):
+        parsed = feedparser.parse(make_rss("generic", items=30, seed=seed))
+        summaries.extend(e.summary for e in parsed.entries)
+    return summaries
+
+
+def fuzz_cases(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(1, 16))) for _ in range(count)]
+
+
+def check(cases, limits=(5, 20, 200)):
+    """
+    Returns: 不一致的输入列表
+    """
+    from html_text import bs4_html_to_text, fast_html_to_text
+
+    mismatches = []
+    for html in cases:
+        expected = bs4_html_to_text(html)
+        if fast_html_to_text(html) != expected:
+            mismatches.append(html)
+            continue
+        for limit in limits:
+            text = fast_html_to_text(html, max_chars=limit)
+            if text[:limit] != expected[:limit] or (len(text) > limit) != (len(expected) > limit):
+                mismatches.append(html)
+                break
+    return mismatches
+
+
+def timing(summaries, iterations):
+    from html_text import bs4_html_to_text, fast_html_to_text
+
+    results = {}
+    for name, func, kwargs in (
+        ('bs4', bs4_html_to_text, {}),
+        ('fast', fast_html_to_text, {}),
+        ('fast_max200', fast_html_to_text, {'max_chars': 200})
+    ):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for html in summaries:
+                func(html, **kwargs)
+        results[name] = (time.perf_counter() - start) / iterations
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="HTML-to-text equivalence check and benchmark")
+    arg_parser.add_argument("--fuzz", type=int, default=20000)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--iterations", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    # BeautifulSoup 对像文件名/URL 的输入会发出警告，这里无关
+    warnings.filterwarnings("ignore", module="bs4")
+
+    summaries = fixture_summaries()
+    ok = True
+    for label, cases in (
+        ('fixtures', summaries),
+        ('malformed', MALFORMED_CASES),
+        ('fuzz', fuzz_cases(args.fuzz, args.seed))
+    ):
+        mismatches = check(cases)
+        ok = ok and not mismatches
+        print(f"{label:<10} {len(cases):>6} inputs  mismatches {len(mismatches)}")
+        for html in mismatches[:5]:
+            print(f"    mismatch: {html!r}")
+
+    results = timing(summaries, args.iterations)
+    base = results['bs4']
+    for name, seconds in results.items():
+        print(f"{name:<12} {seconds * 1000:>9.2f} ms per {len(summaries)} summaries  ({base / seconds:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+关键词过滤微基准
+
+对大批量标题比较旧实现 (逐个关键词 re.search / `in`) 和 KeywordMatcher 的单次扫描，
+同时逐条校验两者的过滤结果完全一致。
+
+用法:
+    python -m benchmarks.bench_keywords
+    python -m benchmarks.bench_keywords --titles 200000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from benchmarks.fixtures import AI_TITLES, OTHER_TITLES, XHS_WORDS
+
+
+def _legacy_hn_match(keywords, title):
+    for k in keywords:
+        if k in ['ai', 'gpt', 'llm', 'rag']:
+            pattern = r'(?i)\b' + re.escape(k) + r'\b'
+        else:
+            pattern = r'(?i)\b' + re.escape(k)
+        if re.search(pattern, title):
+            return True
+    return False
+
+
+def _legacy_negative_match(negative_keywords, title):
+    title_lower = title.lower()
+    return any(nk in title_lower for nk in negative_keywords)
+
+
+def _legacy_douyin_match(keywords, word):
+    word_lower = word.lower()
+    return any(k.lower() in word_lower for k in keywords)
+
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    noise = ["Maine", "email", "rage", "gptq", "Transformers", "RAG", "Agents", "HELP", "crashes", "odd", "MV"]
+    pool = AI_TITLES + OTHER_TITLES + XHS_WORDS
+    titles = []
+    for i in range(count):
+        words = [rng.choice(pool), rng.choice(noise), str(i)]
+        rng.shuffle(words)
+        titles.append(" ".join(words))
+    return titles
+
+
+def _time(func, titles):
+    start = time.perf_counter()
+    result = [func(t) for t in titles]
+    return time.perf_counter() - start, result
+
+
+def run(count):
+    import utils
+
+    titles = make_titles(count)
+    cases = [
+        ('hn_keywords',
+         lambda t: _legacy_hn_match(utils.AI_KEYWORDS, t),
+         utils.AI_KEYWORD_MATCHER.search),
+        ('negative_keywords',
+         lambda t: _legacy_negative_match(utils.NEGATIVE_KEYWORDS, t),
+         utils.NEGATIVE_KEYWORD_MATCHER.search),
+        ('xhs_keywords',
+         lambda t, r=re.compile("|".join(utils.XHS_KEYWORDS)): r.search(t) is not None,
+         utils.XHS_KEYWORD_MATCHER.search),
+        ('douyin_music',
+         lambda t: _legacy_douyin_match(utils.DOUYIN_MUSIC_KEYWORDS, t),
+         utils.DOUYIN_MUSIC_MATCHER.search),
+        ('douyin_odd',
+         lambda t: _legacy_douyin_match(utils.DOUYIN_ODD_KEYWORDS, t),
+         utils.DOUYIN_ODD_MATCHER.search)
+    ]
+
+    ok = True
+    for name, legacy, matcher in cases:
+        legacy_time, legacy_result = _time(legacy, titles)
+        new_time, new_result = _time(matcher, titles)
+        mismatches = [t for t, a, b in zip(titles, legacy_result, new_result) if a != b]
+        ok = ok and not mismatches
+        print(f"{name:<18} legacy {legacy_time * 1000:>9.1f} ms  matcher {new_time * 1000:>9.1f} ms  "
+              f"({legacy_time / new_time:.1f}x)  hits {sum(new_result)}  mismatches {len(mismatches)}")
+        for t in mismatches[:5]:
+            print(f"    mismatch: {t!r}")
+    return ok
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Keyword filter micro-benchmark")
+    arg_parser.add_argument("--titles", type=int, default=50000)
+    args = arg_parser.parse_args()
+    return 0 if run(args.titles) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Postgres 直连后端冒烟测试与写入基准
+
+连接 CROW_DATABASE_URL (或 --dsn) 指向的 Postgres，在一个不会与真实数据冲突的日期上：
+写入生成的样本 (二进制 COPY + ON CONFLICT)，重复写入校验幂等和新增/更新计数，
+用服务端游标分页读回并与 schema.sql 中 get_snapshot_range 函数 (REST 路径读取的同一份排序) 逐行比对，
+再与 PostgREST 的写入方式 (json_populate_recordset) 对比写入耗时，最后删除测试数据。
+
+可以用本地 Postgres 代替 Supabase，--init 会创建 Supabase 的 anon/authenticated 角色并执行 schema.sql。
+--throwaway 在临时目录中启动一个嵌入式 Postgres (需要 pip install pgserver)，初始化后运行全部检查，结束后删除，
+不需要任何已有的数据库。
+
+用法:
+    python -m benchmarks.bench_pg_backend --throwaway
+    CROW_DATABASE_URL=postgresql://postgres@localhost/postgres python -m benchmarks.bench_pg_backend --init
+    python -m benchmarks.bench_pg_backend --dsn postgresql://... --rows 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from db_utils import DAY_READS, NATURAL_KEYS, _dedupe_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试数据写在很早的日期上，结束后删除
+SCRATCH_DATE = "1999-01-01"
+
+
+def make_rows(table, count, date_str, seed=0):
+    rng = random.Random(f"{table}-{seed}")
+    base = datetime(1999, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        if table == 'ai_news':
+            published = base + timedelta(minutes=rng.randint(0, 1440))
+            rows.append({
+                'source': rng.choice(["OpenAI Blog", "Hacker News", "机器之心"]),
+                'title': f"标题 {i}, \"引号\" (括号)",
+                'link': f"https://example.com/{i}",
+                'summary': "摘要\n" * rng.randint(0, 3),
+                # 一部分没有发布时间，检查 nulls last
+                'published': published.isoformat() if i % 7 else None,
+                'published_str': published.strftime('%Y-%m-%d %H:%M'),
+                'fetched_date': date_str
+            })
+        elif table == 'reddit_demands':
+            rows.append({
+                'source': "r/SideProject", 'title': f"post {i}",
+                # 大量相同分数，检查 id 作为第二排序键
+                'score': rng.randint(0, 20), 'comments': rng.randint(0, 100),
+                'url': f"https://reddit.com/{i}", 'permalink': f"/r/SideProject/{i}",
+                'created_utc': "1999-01-01 08:00", 'fetched_date': date_str
+            })
+        elif table == 'github_trending':
+            rows.append({
+                'repo_name': f"owner/repo-{i}", 'description': None if i % 5 == 0 else f"repo {i}",
+                'language': "Python", 'stars_today': rng.randint(0, 50), 'total_stars': rng.randint(0, 10000),
+                'url': f"https://github.com/owner/repo-{i}", 'since': rng.choice(["daily", "weekly"]),
+                'lang': "all", 'fetched_date': date_str
+            })
+        else:
+            rows.append({
+                'title': f"笔记 {i}", 'link': f"https://xiaohongshu.com/{i}",
+                'snippet': "内容", 'keyword': "独居", 'fetched_date': date_str
+            })
+    return rows
+
+
+def init_schema(conn):
+    for role in ("anon", "authenticated"):
+        exists = conn.execute("select 1 from pg_roles where rolname = %s", [role]).fetchone()
+        if not exists:
+            conn.execute(f'create role "{role}" nologin')
+    exists = conn.execute("select to_regclass('public.ai_news')").fetchone()[0]
+    if not exists:
+        with open(os.path.join(ROOT, "schema.sql"), encoding="utf-8") as f:
+            conn.execute(f.read())
+    conn.commit()
+
+
+def cleanup(conn, date_str):
+    for table in list(DAY_READS) + ['fetch_runs']:
+        conn.execute(f"delete from public.{table} where fetched_date = %s", [date_str])
+    conn.commit()
+
+
+def rpc_rows(conn, date_str):
+    # schema.sql 中的函数就是 Supabase 路径一次读取时使用的查询，列和排序与 DAY_READS 一致
+    exists = conn.execute("select to_regproc('public.get_snapshot_range')").fetchone()[0]
+    if not exists:
+        return None
+    data = conn.execute("select public.get_snapshot_range(%s, %s)", [date_str, date_str]).fetchone()[0]
+    conn.commit()
+    return data if isinstance(data, dict) else json.loads(data)
+
+
+def _normalize(value):
+    # json_agg 与 Python isoformat 的时间格式不同 (T/空格，+00:00/+00)，统一为时间戳比较
+    if isinstance(value, str) and len(value) > 10 and value[4] == '-' and value[10] in 'T ':
+        try:
+            return datetime.fromisoformat(value.replace(' ', 'T')).timestamp()
+        except ValueError:
+            return value
+    return value
+
+
+def check_reads(backend, conn, date_str, page_size):
+    """
+    Returns: 不一致的表名列表
+    """
+    expected = rpc_rows(conn, date_str)
+    bad = []
+    for table, spec in DAY_READS.items():
+        pages = list(backend.iter_pages(table, date_str, date_str, list(spec['columns']), spec['order'], page_size=page_size))
+        rows = [row for page in pages for row in page]
+        if expected is None:
+            # 没有 RPC 时退回到按排序规则自行校验
+            order = spec['order']
+            reference = sorted(rows, key=lambda r: (r[order] is not None, r[order] or 0, r['id']), reverse=True)
+        else:
+            reference = expected[table]
+        got = [{k: _normalize(v) for k, v in row.items()} for row in rows]
+        want = [{k: _normalize(v) for k, v in row.items()} for row in reference]
+        if got != want or any(len(page) > page_size for page in pages):
+            bad.append(table)
+        print(f"  read {table:<20} {len(rows):>6} rows in {len(pages)} pages  "
+              f"{'ok' if table not in bad else 'MISMATCH'}")
+    return bad
+
+
+def json_upsert(conn, table, rows, key_cols):
+    # PostgREST 的写入方式：整批 JSON 交给 json_populate_recordset
+    columns = [col for col in rows[0]]
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col not in key_cols)
+    conn.execute(
+        f"insert into public.{table} ({column_list}) "
+        f"select {column_list} from json_populate_recordset(null::public.{table}, %s::json) "
+        f"on conflict ({', '.join(key_cols)}) do update set {updates}",
+        [json.dumps(rows, ensure_ascii=False)]
+    )
+    conn.commit()
+
+
+def run(dsn, row_count, page_size, init=False):
+    import psycopg
+    from pg_backend import PostgresBackend
+
+    backend = PostgresBackend(dsn)
+    conn = psycopg.connect(dsn, options="-c timezone=UTC")
+    if init:
+        init_schema(conn)
+    cleanup(conn, SCRATCH_DATE)
+
+    ok = True
+    try:
+        for table in DAY_READS:
+            rows = _dedupe_rows(make_rows(table, row_count, SCRATCH_DATE), NATURAL_KEYS[table])
+            first = backend.upsert(table, rows, NATURAL_KEYS[table])
+            # 与 JSON 写入对比时两者都是全部命中冲突、更新已有行
+            start = time.perf_counter()
+            second = backend.upsert(table, rows, NATURAL_KEYS[table])
+            copy_time = time.perf_counter() - start
+            counts_ok = first == {'inserted': len(rows), 'updated': 0} and second == {'inserted': 0, 'updated': len(rows)}
+            ok = ok and counts_ok
+
+            start = time.perf_counter()
+            json_upsert(conn, table, rows, NATURAL_KEYS[table])
+            json_time = time.perf_counter() - start
+            print(f"{table:<20} COPY upsert {copy_time * 1000:>8.1f} ms   JSON upsert {json_time * 1000:>8.1f} ms   "
+                  f"counts {'ok' if counts_ok else f'MISMATCH {first} {second}'}")
+
+        bad = check_reads(backend, conn, SCRATCH_DATE, page_size)
+        ok = ok and not bad
+
+        run = {'source': 'bench', 'fetched_date': SCRATCH_DATE, 'item_count': 1,
+               'finished_at': datetime.now(timezone.utc).isoformat()}
+        backend.upsert('fetch_runs', [run], ('source', 'fetched_date'))
+        fetched = backend.get_fetch_run('bench', SCRATCH_DATE)
+        run_ok = fetched is not None and fetched['item_count'] == 1 and fetched['fetched_date'] == SCRATCH_DATE
+        ok = ok and run_ok
+        print(f"fetch_runs round trip {'ok' if run_ok else 'MISMATCH'}")
+
+        backend.delete_day('xiaohongshu_trends', SCRATCH_DATE)
+        left = sum(len(page) for page in backend.iter_pages('xiaohongshu_trends', SCRATCH_DATE, SCRATCH_DATE, ['id'], 'id'))
+        ok = ok and left == 0
+        print(f"delete day {'ok' if left == 0 else f'MISMATCH ({left} rows left)'}")
+    finally:
+        cleanup(conn, SCRATCH_DATE)
+        conn.close()
+        backend.close()
+    return 0 if ok else 1
+
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Direct Postgres backend smoke test")
+    arg_parser.add_argument("--dsn", default=os.environ.get("CROW_DATABASE_URL"))
+    arg_parser.add_argument("--rows", type=int, default=5000, help="每张表的行数")
+    arg_parser.add_argument("--page-size", type=int, default=1000)
+    arg_parser.add_argument("--init", action="store_true", help="创建 Supabase 角色并执行 schema.sql (表不存在时)")
+    arg_parser.add_argument("--throwaway", action="store_true", help="启动临时的嵌入式 Postgres (pgserver) 并在其上运行")
+    args = arg_parser.parse_args()
+    if args.throwaway:
+        with tempfile.TemporaryDirectory(prefix="crow-pg-") as tmp:
+            import pgserver
+            server = pgserver.get_server(tmp, cleanup_mode='stop')
+            try:
+                return run(server.get_uri(), args.rows, args.page_size, init=True)
+            finally:
+                server.cleanup()
+    if not args.dsn:
+        arg_parser.error("CROW_DATABASE_URL, --dsn or --throwaway is required")
+    return run(args.dsn, args.rows, args.page_size, init=args.init)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+本地 SQLite 存储后端基准
+
+在临时数据库中写入多天的生成样本，测量按天读取 (与 db_utils.read_day 相同的列和排序) 的延迟，
+校验 upsert 的新增/更新计数、排序 (nulls last、id 作为第二排序键) 和分页。
+提供 --dsn 时把同样的数据写入 Postgres 直连后端，逐行比对两边的读取结果。
+
+用法:
+    python -m benchmarks.bench_sqlite_backend
+    python -m benchmarks.bench_sqlite_backend --rows 2000 --days 30 --dsn postgresql://...
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_pg_backend import make_rows, _normalize
+from db_utils import DAY_READS, NATURAL_KEYS, _dedupe_rows
+
+
+def read_rows(backend, table, date_str, page_size=1000):
+    spec = DAY_READS[table]
+    return [
+        row
+        for page in backend.iter_pages(table, date_str, date_str, list(spec['columns']), spec['order'], page_size=page_size)
+        for row in page
+    ]
+
+
+def reference_order(rows, order_col):
+    # Postgres 的排序规则：order_col desc nulls last, id desc
+    return sorted(rows, key=lambda r: (r[order_col] is not None, r[order_col] or 0, r['id']), reverse=True)
+
+
+def _comparable(rows):
+    # 两个数据库分配的 id 不同，比较除 id 外的内容和顺序
+    return [{k: _normalize(v) for k, v in row.items() if k != 'id'} for row in rows]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Embedded SQLite storage backend benchmark")
+    arg_parser.add_argument("--rows", type=int, default=500, help="每张表每天的行数")
+    arg_parser.add_argument("--days", type=int, default=30)
+    arg_parser.add_argument("--reads", type=int, default=200, help="测量读取延迟的次数")
+    arg_parser.add_argument("--dsn", default=None, help="同时写入该 Postgres 并比对读取结果")
+    args = arg_parser.parse_args()
+
+    from sqlite_backend import SQLiteBackend
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "crow.sqlite3"))
+        pg = None
+        if args.dsn:
+            from pg_backend import PostgresBackend
+            pg = PostgresBackend(args.dsn)
+
+        first_day = date(1999, 1, 1)
+        dates = [(first_day + timedelta(days=i)).isoformat() for i in range(args.days)]
+        write_time = 0
+        for i, date_str in enumerate(dates):
+            for table in DAY_READS:
+                rows = _dedupe_rows(make_rows(table, args.rows, date_str, seed=i), NATURAL_KEYS[table])
+                start = time.perf_counter()
+                first = backend.upsert(table, rows, NATURAL_KEYS[table])
+                write_time += time.perf_counter() - start
+                if i == 0:
+                    second = backend.upsert(table, rows, NATURAL_KEYS[table])
+                    if first != {'inserted': len(rows), 'updated': 0} or second != {'inserted': 0, 'updated': len(rows)}:
+                        print(f"upsert counts MISMATCH for {table}: {first} {second}")
+                        ok = False
+                if pg is not None:
+                    pg.upsert(table, rows, NATURAL_KEYS[table])
+        total_rows = args.rows * args.days * len(DAY_READS)
+        print(f"wrote {total_rows} rows in {write_time * 1000:.0f} ms ({total_rows / write_time:,.0f} rows/s)")
+
+        try:
+            for table, spec in DAY_READS.items():
+                rows = read_rows(backend, table, dates[0])
+                paged = read_rows(backend, table, dates[0], page_size=37)
+                table_ok = rows == reference_order(rows, spec['order']) and paged == rows and len(rows) == args.rows
+                if pg is not None:
+                    table_ok = table_ok and _comparable(rows) == _comparable(read_rows(pg, table, dates[0]))
+
+                latencies = []
+                for n in range(args.reads):
+                    start = time.perf_counter()
+                    read_rows(backend, table, dates[n % len(dates)])
+                    latencies.append(time.perf_counter() - start)
+                ok = ok and table_ok
+                print(f"{table:<20} read day ({args.rows} rows) p50 {statistics.median(latencies) * 1000:>7.2f} ms  "
+                      f"p95 {sorted(latencies)[int(len(latencies) * 0.95)] * 1000:>7.2f} ms  "
+                      f"{'ok' if table_ok else 'MISMATCH'}")
+
+            run = {'source': 'bench', 'fetched_date': dates[0], 'item_count': 3, 'finished_at': '1999-01-01T08:00:00+00:00'}
+            backend.upsert('fetch_runs', [run], ('source', 'fetched_date'))
+            start = time.perf_counter()
+            fetched = backend.get_fetch_run('bench', dates[0])
+            lookup = time.perf_counter() - start
+            run_ok = fetched is not None and fetched['item_count'] == 3 and fetched['finished_at'] == run['finished_at']
+            ok = ok and run_ok
+            print(f"fetch_runs lookup {lookup * 1000:.3f} ms  {'ok' if run_ok else 'MISMATCH'}")
+        finally:
+            backend.close()
+            if pg is not None:
+                for table in list(DAY_READS) + ['fetch_runs']:
+                    with pg.pool.connection() as conn:
+                        conn.execute(f"delete from public.{table} where fetched_date between %s and %s", [dates[0], dates[-1]])
+                pg.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
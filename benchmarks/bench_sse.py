@@ -0,0 +1,139 @@
+"""
+流式回答解析基准
+
+在合成的方舟 (OpenAI 兼容) SSE 响应上比较原来的 iter_lines + 逐行 json.loads 与 sse.CompletionStream：
+解析耗时、交给界面的分块数，并校验任意切分字节块时输出文本与元数据一致。
+
+用法:
+    python -m benchmarks.bench_sse
+    python -m benchmarks.bench_sse --deltas 20000 --splits 500
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+DELTA_POOL = ["大", "模型", "的", "推理", "成本", "正在", "下降", "，", "。", " agent", " RAG", "\n- ", "**", "趋势"]
+
+
+def make_stream(deltas=5000, seed=0, crlf=False):
+    rng = random.Random(seed)
+    events = []
+    for _ in range(deltas):
+        chunk = {"choices": [{"index": 0, "delta": {"content": rng.choice(DELTA_POOL)}}]}
+        events.append("data: " + json.dumps(chunk, ensure_ascii=False))
+    events.append("data: " + json.dumps({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+    events.append("data: " + json.dumps({"choices": [], "usage": {"completion_tokens": deltas}}))
+    events.append("data: [DONE]")
+    sep = "\r\n\r\n" if crlf else "\n\n"
+    return (sep.join(events) + sep).encode("utf-8")
+
+
+def split_bytes(raw, seed=0, low=64, high=2048):
+    # 模拟网络块：随机长度，会切断 UTF-8 字符和行
+    rng = random.Random(seed)
+    parts = []
+    i = 0
+    while i < len(raw):
+        j = min(len(raw), i + rng.randint(low, high))
+        parts.append(raw[i:j])
+        i = j
+    return parts
+
+
+def legacy_parse(chunks):
+    # 优化前 generate_summary 的逻辑，iter_lines 的按行切分用同样的缓冲方式模拟
+    output = []
+    pending = b""
+    lines = []
+    for chunk in chunks:
+        pending += chunk
+        split = pending.split(b"\n")
+        pending = split.pop()
+        lines.extend(split)
+    if pending:
+        lines.append(pending)
+    for line in lines:
+        line = line.rstrip(b"\r")
+        if line:
+            line = line.decode('utf-8')
+            if line.startswith("data: "):
+                data_str = line[6:]
+                if data_str.strip() == "[DONE]":
+                    break
+                try:
+                    json_data = json.loads(data_str)
+                    choices = json_data.get('choices') or []
+                    content = choices[0]['delta'].get('content', '') if choices else ''
+                    if content:
+                        output.append(content)
+                except json.JSONDecodeError:
+                    continue
+    return output
+
+
+def new_parse(chunks, flush_ms):
+    from sse import CompletionStream
+
+    stream = CompletionStream(iter(chunks), flush_ms=flush_ms)
+    output = list(stream)
+    return output, stream
+
+
+def check(raw, splits):
+    """
+    Returns: 不一致的切分种子列表
+    """
+    expected, reference = new_parse([raw], 0)
+    expected_text = "".join(expected)
+    bad = []
+    for seed in range(splits):
+        chunks = split_bytes(raw, seed=seed, low=1, high=257)
+        output, stream = new_parse(chunks, 0)
+        if "".join(output) != expected_text or stream.usage != reference.usage \
+                or stream.finish_reason != reference.finish_reason or not stream.completed:
+            bad.append(seed)
+    if "".join(legacy_parse([raw])) != expected_text:
+        bad.append("legacy")
+    return bad
+
+
+def _best_of(func, iterations):
+    best = None
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="SSE stream parsing benchmark")
+    arg_parser.add_argument("--deltas", type=int, default=5000)
+    arg_parser.add_argument("--splits", type=int, default=200, help="随机切分校验的次数")
+    arg_parser.add_argument("--iterations", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    ok = True
+    for crlf in (False, True):
+        raw = make_stream(args.deltas, crlf=crlf)
+        bad = check(raw, args.splits)
+        ok = ok and not bad
+        print(f"{'CRLF' if crlf else 'LF':<5} {len(raw) / 1024:>8.1f} KB  random splits {args.splits}  mismatches {len(bad)}")
+
+    raw = make_stream(args.deltas)
+    chunks = split_bytes(raw)
+    legacy_time, legacy_out = _best_of(lambda: legacy_parse(chunks), args.iterations)
+    print(f"{'legacy':<18} {legacy_time * 1000:>8.1f} ms  chunks to UI {len(legacy_out)}")
+    for flush_ms in (0, 50):
+        new_time, (new_out, _) = _best_of(lambda: new_parse(chunks, flush_ms), args.iterations)
+        print(f"{f'sse flush={flush_ms}ms':<18} {new_time * 1000:>8.1f} ms  chunks to UI {len(new_out)}  "
+              f"({legacy_time / new_time:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
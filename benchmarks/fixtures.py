@@ -0,0 +1,241 @@
+"""
+基准测试用的 HTTP 响应样本
+
+优先使用 benchmarks/fixtures/ 下录制的真实响应 (python -m benchmarks.fixtures --record 录制)，
+没有录制文件时按固定随机种子生成结构一致的样本，保证不联网也能跑。
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 录制时抓取的真实地址
+RECORD_SOURCES = {
+    'rss_generic.xml': "https://techcrunch.com/category/artificial-intelligence/feed/",
+    'rss_hn.xml': "https://news.ycombinator.com/rss",
+    'rss_reddit.xml': "https://www.reddit.com/r/LocalLLaMA/top/.rss?t=day",
+    'reddit_top.json': "https://www.reddit.com/r/SaaS/top.json?t=day&limit=30",
+    'github_trending.html': "https://github.com/trending",
+    'xhs_explore.html': "https://www.xiaohongshu.com/explore"
+}
+
+AI_TITLES = [
+    "OpenAI ships a new GPT model for agents",
+    "Anthropic's Claude gets longer context",
+    "Why RAG pipelines fail in production",
+    "Hugging Face releases an open diffusion model",
+    "Mistral raises a new round for LLM research",
+    "Building a coding agent with Cursor and Cline",
+    "Generative AI in the enterprise: a survey",
+    "DeepMind's Gemini learns to plan"
+]
+OTHER_TITLES = [
+    "The 500-mile email (2002)",
+    "Show HN: A tiny static site generator",
+    "Maine passes new broadband law",
+    "Help: my laptop is stuck on a spinning wheel",
+    "How SQLite handles concurrent writes",
+    "A history of the email protocol"
+]
+XHS_WORDS = ["美妆", "拍照", "穿搭", "护肤", "Plog", "好物", "发型", "旅行", "美食", "数码", "宠物", "健身"]
+
+
+def _fixture_file(name):
+    path = os.path.join(FIXTURE_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def _read(name):
+    with open(_fixture_file(name), 'rb') as f:
+        return f.read()
+
+
+def make_rss(kind="generic", items=30, seed=0):
+    """
+    生成 RSS 2.0 样本，发布时间相对当前时间，保证能通过时间窗口过滤
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    parts = []
+    for i in range(items):
+        if kind == "hn":
+            title = rng.choice(AI_TITLES + OTHER_TITLES * 2)
+            summary = '<a href="https://news.ycombinator.com/item?id=%d">Comments</a>' % (40000000 + i)
+        else:
+            title = rng.choice(AI_TITLES)
+            summary = (
+                "<p>%s &amp; more: <b>new</b> results from the lab.</p>"
+                "<p>In this post we look at <a href='https://example.com/%d'>benchmarks</a>, "
+                "scaling laws &mdash; and what comes next for open models. %s</p>"
+            ) % (title, i, "Lorem ipsum dolor sit amet. " * rng.randint(2, 12))
+        pub = now - timedelta(minutes=rng.randint(5, 60 * 60))
+        parts.append(
+            "<item><title>%s</title><link>https://example.com/%s/%d</link>"
+            "<description><![CDATA[%s]]></description><pubDate>%s</pubDate></item>"
+            % (title.replace("&", "&amp;"), kind, i, summary, format_datetime(pub))
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        "<title>%s</title>%s</channel></rss>" % (kind, "".join(parts))
+    ).encode("utf-8")
+
+
+def make_reddit_json(posts=30, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).timestamp()
+    children = []
+    for i in range(posts):
+        children.append({'data': {
+            'title': f"{rng.choice(AI_TITLES)} #{i}",
+            'score': rng.randint(1, 2000),
+            'num_comments': rng.randint(0, 300),
+            'url': f"https://example.com/post/{i}",
+            'permalink': f"/r/SaaS/comments/{i:06x}/post_{i}/",
+            'created_utc': now - rng.randint(60, 20 * 3600)
+        }})
+    return json.dumps({'data': {'children': children}}).encode("utf-8")
+
+
+def make_github_trending(rows=25, seed=0):
+    rng = random.Random(seed)
+    articles = []
+    for i in range(rows):
+        owner, repo = f"owner{i}", f"project-{rng.randint(100, 999)}"
+        articles.append(f"""
+<article class="Box-row">
+  <div class="float-right d-flex"><span>Star</span></div>
+  <h2 class="h3 lh-condensed">
+    <a href="/{owner}/{repo}" class="Link">
+      <svg aria-hidden="true"></svg>
+      <span class="text-normal">{owner} /</span>
+      {repo}
+    </a>
+  </h2>
+  <p class="col-9 color-fg-muted my-1 pr-4">An open source {rng.choice(AI_TITLES).lower()} toolkit.</p>
+  <div class="f6 color-fg-muted mt-2">
+    <span class="d-inline-block ml-0 mr-3">
+      <span class="repo-language-color"></span>
+      <span itemprop="programmingLanguage">{rng.choice(['Python', 'TypeScript', 'Rust', 'Go'])}</span>
+    </span>
+    <a href="/{owner}/{repo}/stargazers" class="Link d-inline-block mr-3"><svg></svg> {rng.randint(1000, 90000):,}</a>
+    <a href="/{owner}/{repo}/forks" class="Link d-inline-block mr-3"><svg></svg> {rng.randint(10, 9000):,}</a>
+    <span class="d-inline-block mr-3">Built by <img class="avatar mb-1" alt="@{owner}"></span>
+    <span class="d-inline-block float-sm-right"><svg></svg> {rng.randint(10, 3000):,} stars today</span>
+  </div>
+</article>""")
+    page = "<html><head><title>Trending</title></head><body>%s%s</body></html>"
+    # 真实页面有大量与榜单无关的导航/脚本，用填充内容模拟页面体积
+    filler = "<div class='nav'>" + "<a href='#'>nav</a>" * 2000 + "</div>"
+    return (page % (filler, "".join(articles))).encode("utf-8")
+
+
+def make_xhs_explore(notes=40, padding_kb=0, seed=0):
+    """
+    生成带 window.__INITIAL_STATE__ 的探索页，padding_kb 用于模拟多 MB 的真实页面
+    状态中包含 JS 的 undefined 值，以及字符串里出现的 "undefined"
+    """
+    rng = random.Random(seed)
+    feeds = []
+    for i in range(notes):
+        word = rng.choice(XHS_WORDS)
+        feeds.append({
+            'id': f"6{i:023x}",
+            'modelType': 'note',
+            'noteCard': {
+                'displayTitle': f"{word} 分享 {i} \"undefined\" 不是 bug",
+                'desc': f"今天的{word}记录 {'~' * rng.randint(0, 50)}",
+                'cover': {'urlDefault': f"https://sns-img.example.com/{i}.jpg"},
+                'interactInfo': {'likedCount': str(rng.randint(0, 99999))},
+                'user': {'nickname': f"user{i}", 'avatar': None}
+            },
+            'trackId': None
+        })
+    state = {
+        'global': {'appSettings': {'notificationInterval': 30}},
+        'user': {'loggedIn': False, 'userInfo': None},
+        'feed': {'query': '', 'feeds': feeds, 'padding': 'x' * (padding_kb * 1024)}
+    }
+    raw = json.dumps(state, ensure_ascii=False)
+    # 还原真实页面中的 JS 字面量 undefined
+    raw = raw.replace('"avatar": null', '"avatar": undefined').replace('"trackId": null', '"trackId": undefined')
+    html = (
+        "<!doctype html><html><head><title>小红书</title></head><body><div id=\"app\"></div>"
+        f"<script>window.__INITIAL_STATE__={raw}</script>"
+        "<script src=\"/static/app.js\"></script></body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def make_serper_json(results=10, seed=0):
+    rng = random.Random(seed)
+    organic = []
+    for i in range(results):
+        word = rng.choice(XHS_WORDS)
+        organic.append({
+            'title': f"{word} 经验分享 {i} - 小红书",
+            'link': f"https://www.xiaohongshu.com/explore/{seed:04x}{i:020x}",
+            'snippet': f"{rng.randint(1, 6)} days ago ... {word} 真的太好用了",
+        })
+    return json.dumps({'organic': organic}, ensure_ascii=False).encode("utf-8")
+
+
+def load_fixture(name, **kwargs):
+    """
+    读取样本：有录制文件用录制文件，否则生成
+    """
+    if _fixture_file(name):
+        return _read(name)
+    if name == 'rss_generic.xml':
+        return make_rss("generic", **kwargs)
+    if name == 'rss_hn.xml':
+        return make_rss("hn", **kwargs)
+    if name == 'rss_reddit.xml':
+        return make_rss("reddit", **kwargs)
+    if name == 'reddit_top.json':
+        return make_reddit_json(**kwargs)
+    if name == 'github_trending.html':
+        return make_github_trending(**kwargs)
+    if name == 'xhs_explore.html':
+        return make_xhs_explore(**kwargs)
+    if name == 'serper.json':
+        return make_serper_json(**kwargs)
+    if name == 'douyin_hot.json':
+        # 仓库根目录的 douyin.json 就是一份录制的热榜接口响应 (末尾带有多余字节)
+        with open(os.path.join(REPO_DIR, "douyin.json"), 'rb') as f:
+            return f.read()
+    raise KeyError(f"Unknown fixture: {name}")
+
+
+def record_fixtures():
+    """
+    从线上录制真实响应到 benchmarks/fixtures/
+    """
+    from http_client import http_get
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, url in RECORD_SOURCES.items():
+        try:
+            response = http_get(url, timeout=15)
+            if response.status_code != 200:
+                print(f"Skip {name}: HTTP {response.status_code}")
+                continue
+            with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+                f.write(response.content)
+            print(f"Recorded {name} ({len(response.content)} bytes)")
+        except Exception as e:
+            print(f"Failed to record {name}: {e}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark fixtures")
+    arg_parser.add_argument("--record", action="store_true", help="从线上录制真实响应")
+    args = arg_parser.parse_args()
+    if args.record:
+        record_fixtures()
+    else:
+        arg_parser.print_help()
@@ -0,0 +1,135 @@
+"""
+本地回放服务器
+
+在本机启动一个 HTTP 服务返回录制的响应，并在共享会话 (http_client) 上挂载一个适配器，
+把所有发往外网的请求改写到这个服务，抓取函数本身无需任何修改。
+"""
+import hashlib
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+from benchmarks.fixtures import load_fixture
+
+
+def route_fixture(host, path):
+    """
+    按原始 host/path 选择样本
+    Returns: (fixture 名称, Content-Type)
+    """
+    if host == "news.ycombinator.com":
+        return 'rss_hn.xml', "application/rss+xml"
+    if host == "www.reddit.com":
+        if ".json" in path:
+            return 'reddit_top.json', "application/json"
+        return 'rss_reddit.xml', "application/rss+xml"
+    if host == "github.com":
+        return 'github_trending.html', "text/html; charset=utf-8"
+    if host == "www.xiaohongshu.com":
+        return 'xhs_explore.html', "text/html; charset=utf-8"
+    if host == "google.serper.dev":
+        return 'serper.json', "application/json"
+    if host == "v.api.aa1.cn":
+        return 'douyin_hot.json', "application/json"
+    return 'rss_generic.xml', "application/rss+xml"
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文分两次写出，不关闭 Nagle 会被延迟 ACK 拖慢约 40ms
+    disable_nagle_algorithm = True
+
+    def _serve(self):
+        # 路径格式: /<原始 host>/<原始 path>
+        _, _, rest = self.path.partition("/")
+        host, _, path = rest.partition("/")
+        name, content_type = route_fixture(host, "/" + path)
+        body = self.server.get_body(name)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        self.server.count_request()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _serve
+    do_POST = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixture_overrides=None):
+        super().__init__(("127.0.0.1", 0), ReplayHandler)
+        self._bodies = dict(fixture_overrides or {})
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def get_body(self, name):
+        with self._lock:
+            if name not in self._bodies:
+                self._bodies[name] = load_fixture(name)
+            return self._bodies[name]
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    把 https://host/path 改写为 http://127.0.0.1:port/host/path 后再发送
+    """
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        if not request.url.startswith(self.base_url):
+            request.url = f"{self.base_url}/{parts.netloc}{parts.path or '/'}"
+            if parts.query:
+                request.url += "?" + parts.query
+        return super().send(request, **kwargs)
+
+
+def install_replay(session, server):
+    """
+    在共享会话上挂载回放适配器 (重建会话即可恢复)
+    """
+    adapter = ReplayAdapter(server.base_url, pool_connections=8, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
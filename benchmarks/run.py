@@ -0,0 +1,244 @@
+"""
+抓取/解析性能基准
+
+所有 HTTP 请求都由本地回放服务器返回录制的响应，不需要联网。
+每个阶段输出吞吐量、p50/p95 延迟和峰值内存，结果写入 JSON 文件，方便在不同提交之间对比。
+
+用法:
+    python -m benchmarks.run                           # 全部阶段，结果写入 bench_results.json
+    python -m benchmarks.run --only rss,github --iterations 50
+    python -m benchmarks.run --compare old_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+
+def _prepare_env(tmp_dir):
+    # 必须在导入项目模块之前设置：缓存写到临时目录，不连接数据库，Serper 请求走回放服务器
+    os.environ["CROW_CACHE_DIR"] = tmp_dir
+    os.environ["SUPABASE_URL"] = ""
+    os.environ["SUPABASE_KEY"] = ""
+    # 没有 Supabase 时 auto 会使用本地 SQLite：固定为 supabase (即不保存)，每轮都测抓取路径；
+    # 数据库文件也指向临时目录，避免写入真实的 data/crow.sqlite3
+    os.environ["CROW_DB_BACKEND"] = "supabase"
+    os.environ["CROW_SQLITE_PATH"] = os.path.join(tmp_dir, "crow.sqlite3")
+    os.environ["SERPER_API_KEY"] = "benchmark"
+    os.environ["CROW_SERPER_RATE"] = "100000"
+    os.environ["CROW_SERPER_BURST"] = "100000"
+    os.environ["CROW_FETCH_BACKEND"] = "thread"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func, iterations, setup=None, warmup=1):
+    """
+    Returns: (每次耗时列表 (秒), 最后一次的返回值, 峰值内存 (字节))
+    """
+    result = None
+    for _ in range(warmup):
+        if setup:
+            setup()
+        result = func()
+
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    # 单独跑一次统计内存，避免 tracemalloc 的开销影响计时
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, result, peak
+
+
+def _count_items(result):
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        return sum(_count_items(r) for r in result if not isinstance(r, dict))
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+
+def build_stages(server):
+    """
+    Returns: {阶段名: (func, setup)}
+    """
+    import feed_cache
+    import utils
+    from benchmarks.fixtures import load_fixture
+    from github_parser import parse_trending_html
+    from embedded_json import extract_js_object
+    from benchmarks.fixtures import make_xhs_explore
+    from page_data import load_page_data
+
+    generic_feed = {'name': 'TechCrunch AI', 'url': 'https://techcrunch.com/category/artificial-intelligence/feed/'}
+    hn_feed = {'name': 'Hacker News', 'url': 'https://news.ycombinator.com/rss'}
+    generic_rss = load_fixture('rss_generic.xml')
+    hn_rss = load_fixture('rss_hn.xml')
+    reddit_json = json.loads(load_fixture('reddit_top.json'))
+    github_html = load_fixture('github_trending.html')
+    # 接近真实探索页体积的多 MB 页面
+    xhs_large_html = make_xhs_explore(notes=400, padding_kb=4096).decode('utf-8')
+    parsed_generic = utils.parse_rss_entries(generic_feed, generic_rss)
+    cache_dir = os.environ["CROW_CACHE_DIR"]
+    counter = {'n': 0}
+
+    def cold_cache():
+        # 每次使用全新的校验缓存，模拟第一次抓取
+        counter['n'] += 1
+        feed_cache._feed_cache = feed_cache.FeedValidatorCache(
+            path=os.path.join(cache_dir, f"rss_cold_{counter['n']}.json")
+        )
+
+    def warm_cache():
+        feed_cache._feed_cache = warm
+
+    warm = feed_cache.FeedValidatorCache(path=os.path.join(cache_dir, "rss_warm.json"))
+    feed_cache._feed_cache = warm
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.fetch_rss_feed(generic_feed)
+
+    def no_ddg():
+        # DuckDuckGo 使用自己的 HTTP 客户端，无法回放，基准中关闭
+        utils.HAS_DDGS = False
+        cold_cache()
+
+    return {
+        'rss.parse': (lambda: utils.parse_rss_entries(generic_feed, generic_rss), None),
+        'rss.parse_hn_filter': (lambda: utils.parse_rss_entries(hn_feed, hn_rss), None),
+        'rss.time_filter': (lambda: utils.filter_recent_entries(generic_feed, parsed_generic), None),
+        'rss.fetch_cold': (lambda: utils.fetch_rss_feed(generic_feed), cold_cache),
+        'rss.fetch_304': (lambda: utils.fetch_rss_feed(generic_feed), warm_cache),
+        'reddit.parse_json': (lambda: utils.parse_reddit_json('SaaS', reddit_json), None),
+        'github.parse': (lambda: parse_trending_html(github_html), None),
+        'github.fetch_parse': (utils.fetch_github_trending_raw, None),
+        'github.fetch_all': (utils.fetch_github_trending_all, None),
+        'xhs.explore': (lambda: utils.fetch_xhs_explore_hot(limit=30), None),
+        'xhs.state_4mb': (lambda: utils.find_xhs_notes(extract_js_object(xhs_large_html, "__INITIAL_STATE__=")), None),
+        'douyin.hot': (utils.get_douyin_hot, None),
+        'page.load_data': (lambda: load_page_data(date.today()), no_ddg)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(only=None, iterations=20):
+    from http_client import get_session
+    from benchmarks.replay_server import ReplayServer, install_replay
+
+    server = ReplayServer().start()
+    install_replay(get_session(), server)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations
+        },
+        'stages': {}
+    }
+
+    try:
+        stages = build_stages(server)
+        for name, (func, setup) in stages.items():
+            if only and not any(name == o or name.startswith(o + ".") for o in only):
+                continue
+            # page.load_data 一次要跑完所有数据源，减少迭代次数
+            n = max(3, iterations // 5) if name.startswith("page.") else iterations
+            requests_before = server.requests
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings, result, peak = measure(func, n, setup=setup)
+            total = sum(timings)
+            items = _count_items(result)
+            report['stages'][name] = {
+                'iterations': n,
+                'items': items,
+                'mean_ms': round(total / n * 1000, 3),
+                'p50_ms': round(percentile(timings, 50) * 1000, 3),
+                'p95_ms': round(percentile(timings, 95) * 1000, 3),
+                'ops_per_sec': round(n / total, 2) if total else None,
+                'items_per_sec': round(items * n / total, 1) if total else None,
+                'peak_mem_kb': round(peak / 1024, 1),
+                'http_requests': server.requests - requests_before
+            }
+            stage = report['stages'][name]
+            print(f"{name:<22} p50 {stage['p50_ms']:>9.3f} ms  p95 {stage['p95_ms']:>9.3f} ms  "
+                  f"{stage['ops_per_sec'] or 0:>9.1f} ops/s  peak {stage['peak_mem_kb']:>9.1f} KB  items {items}")
+    finally:
+        server.stop()
+    return report
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for name, stage in report['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if not old or not old.get('p50_ms'):
+            print(f"{name:<22} (new)")
+            continue
+        ratio = stage['p50_ms'] / old['p50_ms']
+        print(f"{name:<22} p50 {old['p50_ms']:>9.3f} -> {stage['p50_ms']:>9.3f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Daily AI Crow fetcher benchmarks")
+    arg_parser.add_argument("--iterations", type=int, default=20)
+    arg_parser.add_argument("--only", default="", help="逗号分隔的阶段或阶段前缀，例如 rss,xhs.explore")
+    arg_parser.add_argument("--output", default="bench_results.json")
+    arg_parser.add_argument("--compare", default=None, help="与之前的结果文件对比")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="crow-bench-") as tmp_dir:
+        _prepare_env(tmp_dir)
+        only = [o.strip() for o in args.only.split(",") if o.strip()]
+        report = run(only=only, iterations=args.iterations)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+# 项目级配置
+# 密钥按以下顺序解析：Streamlit Secrets (仅在 Streamlit 进程中) > 环境变量 / .env
+# 不会主动 import streamlit，抓取进程、命令行脚本导入本模块几乎没有开销。
+# 数值配置用 get_int / get_float 读取，与密钥一样可以写在 Streamlit Secrets、环境变量或 .env 中。
+# 导入本模块时即加载 .env，各模块在导入时读取的配置也能取到 .env 中的值。
+
+_dotenv_loaded = False
+_dotenv_lock = threading.Lock()
+
+
+def _ensure_dotenv():
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            if load_dotenv:
+                # 加载 .env 文件 (不覆盖已存在的环境变量)
+                load_dotenv()
+            _dotenv_loaded = True
+
+
+_ensure_dotenv()
+
+
+def _streamlit_secrets():
+    # 只有 Streamlit 已经被加载 (即运行在 streamlit run 中) 时才读取 st.secrets
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+    try:
+        return st.secrets
+    except Exception:
+        return None
+
+
+def _lookup_secrets(secrets, name):
+    # 支持 "doubao.api_key" 形式访问 secrets.toml 中的分组
+    try:
+        value = secrets
+        for part in name.split("."):
+            if part not in value:
+                return None
+            value = value[part]
+        return value
+    except Exception:
+        # 本地运行时可能没有 secrets.toml，访问会抛出 FileNotFoundError，忽略
+        return None
+
+
+def get_secret(*names, default=None):
+    """
+    按顺序尝试多个候选名称，返回第一个找到的配置值
+    例如 get_secret("doubao.api_key", "DOUBAO_API_KEY")
+    带 "." 的名称只在 Streamlit Secrets 中查找
+    """
+    secrets = _streamlit_secrets()
+    if secrets is not None:
+        for name in names:
+            value = _lookup_secrets(secrets, name)
+            # secrets.toml 中的 0 / false 也是有效的配置值
+            if value is not None and value != "":
+                return value
+
+    _ensure_dotenv()
+    for name in names:
+        if "." in name:
+            continue
+        value = os.environ.get(name)
+        if value:
+            return value
+    return default
+
+
+def get_flag(name, default=False):
+    """
+    读取布尔开关，支持 true/1/yes
+    """
+    value = get_secret(name)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_int(name, default):
+    """
+    读取整数配置，未配置或无法解析时返回 default
+    """
+    try:
+        return int(get_secret(name, default=default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float(name, default):
+    """
+    读取浮点数配置，未配置或无法解析时返回 default
+    """
+    try:
+        return float(get_secret(name, default=default))
+    except (TypeError, ValueError):
+        return default
+
+
+# 本地缓存目录 (RSS 校验缓存等)，可通过 CROW_CACHE_DIR 覆盖
+CACHE_DIR = get_secret(
+    "CROW_CACHE_DIR",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+
+def cache_path(filename):
+    """
+    返回缓存目录下的文件路径，目录不存在时自动创建
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
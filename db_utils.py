@@ -1,62 +1,521 @@
 import os
-import streamlit as st
-try:
-    from supabase import create_client, Client
-except ImportError:
-    create_client = None
-    Client = None
-from dotenv import load_dotenv
-import pandas as pd
-from datetime import datetime
-
-# 加载 .env 文件
-load_dotenv()
-
-# 初始化 Supabase 客户端
-# 优先尝试从 Streamlit Secrets 读取，方便云端部署
-url = None
-key = None
-
-try:
-    if "SUPABASE_URL" in st.secrets:
-        url = st.secrets["SUPABASE_URL"]
-    if "SUPABASE_KEY" in st.secrets:
-        key = st.secrets["SUPABASE_KEY"]
-except FileNotFoundError:
-    # 本地运行时可能没有 secrets.toml，忽略错误
-    pass
-except Exception:
-    pass
-
-# 如果 Secrets 里没有，再尝试从环境变量读取
-if not url:
-    url = os.environ.get("SUPABASE_URL")
-if not key:
-    key = os.environ.get("SUPABASE_KEY")
-
-supabase = None
-
-if create_client and url and key:
+import threading
+from datetime import datetime, timezone
+
+from config import get_secret, get_flag
+from history_cache import get_history_cache
+from write_queue import get_write_queue, OP_UPSERT, OP_FETCH_RUN
+
+# Supabase 客户端懒加载：第一次访问数据库时才导入 supabase 并创建客户端，
+# 导入本模块不会产生网络连接或重量级依赖的开销
+_supabase = None
+_supabase_initialized = False
+_supabase_lock = threading.Lock()
+
+def get_supabase():
+    """
+    获取 Supabase 客户端；未安装或未配置时返回 None
+    """
+    global _supabase, _supabase_initialized
+    if _supabase_initialized:
+        return _supabase
+
+    with _supabase_lock:
+        if _supabase_initialized:
+            return _supabase
+
+        try:
+            from supabase import create_client
+        except ImportError:
+            create_client = None
+
+        # 优先从 Streamlit Secrets 读取 (方便云端部署)，其次是环境变量 / .env
+        url = get_secret("SUPABASE_URL")
+        key = get_secret("SUPABASE_KEY")
+
+        if create_client and url and key:
+            try:
+                _supabase = create_client(url, key)
+            except Exception as e:
+                print(f"Failed to initialize Supabase client: {e}")
+        else:
+            if not create_client:
+                print("Warning: 'supabase' library not found.")
+            else:
+                print("Warning: SUPABASE_URL or SUPABASE_KEY not found in environment variables or secrets.")
+
+        _supabase_initialized = True
+    return _supabase
+
+# 存储后端 (CROW_DB_BACKEND)，接口见 storage.py：
+# auto (默认): 配置了 Supabase 时通过 Supabase 客户端 (PostgREST)，否则使用本地 SQLite (sqlite_backend.py)
+# supabase: 只使用 Supabase 客户端，未配置时不保存数据
+# postgres: 用 CROW_DATABASE_URL 直连 Postgres (pg_backend.py，二进制 COPY 写入、服务端游标读取)
+# sqlite: 总是使用本地 SQLite
+DB_BACKENDS = ('auto', 'supabase', 'postgres', 'sqlite')
+DB_BACKEND = str(get_secret("CROW_DB_BACKEND") or "auto").strip().lower()
+_backend = None
+_backend_initialized = False
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    获取存储后端对象；使用 Supabase 客户端 (或没有可用的数据库) 时返回 None
+    """
+    global _backend, _backend_initialized
+    if _backend_initialized:
+        return _backend
+
+    with _backend_lock:
+        if _backend_initialized:
+            return _backend
+
+        mode = DB_BACKEND
+        if mode not in DB_BACKENDS:
+            print(f"Warning: unknown CROW_DB_BACKEND '{mode}', using auto.")
+            mode = 'auto'
+        if mode == 'postgres':
+            try:
+                from pg_backend import get_pg_backend
+                _backend = get_pg_backend()
+            except Exception as e:
+                # 回退到 Supabase 或本地 SQLite
+                print(f"Failed to initialize Postgres backend: {e}")
+                mode = 'auto'
+        if mode == 'sqlite' or (mode == 'auto' and get_supabase() is None):
+            try:
+                from sqlite_backend import get_sqlite_backend
+                _backend = get_sqlite_backend()
+            except Exception as e:
+                print(f"Failed to open local SQLite database: {e}")
+        _backend_initialized = True
+    return _backend
+
+def _embedded_backend():
+    backend = get_backend()
+    return backend is not None and backend.embedded
+
+def db_available():
+    """
+    是否有可用的数据库 (直连后端或 Supabase)
+    """
+    return get_backend() is not None or get_supabase() is not None
+
+# 各表的自然键，与 schema.sql 中的唯一约束保持一致
+# 同一天重复抓取时按自然键 upsert，而不是追加重复行
+NATURAL_KEYS = {
+    'ai_news': ('fetched_date', 'link'),
+    'reddit_demands': ('fetched_date', 'permalink'),
+    'github_trending': ('fetched_date', 'since', 'lang', 'repo_name'),
+    'xiaohongshu_trends': ('fetched_date', 'link')
+}
+
+# fetch_runs 的自然键 (每个数据源每天一行)
+FETCH_RUN_KEY = ('source', 'fetched_date')
+
+# fetch_runs 中的数据源对应的数据表：写入队列保证新鲜度记录在对应数据写入成功之后才写
+FETCH_RUN_TABLES = {
+    'ai_news': 'ai_news',
+    'reddit': 'reddit_demands',
+    'github': 'github_trending',
+    'xhs': 'xiaohongshu_trends'
+}
+
+# 单次 upsert 请求的最大行数，避免请求体过大
+UPSERT_CHUNK_SIZE = 500
+
+def _dedupe_rows(rows, key_cols):
+    """
+    同一批数据内按自然键去重 (保留最后一次出现的值)
+    Postgres 不允许一条 upsert 语句内多次更新同一行
+    """
+    unique = {}
+    for row in rows:
+        key = tuple(row.get(col) for col in key_cols)
+        if any(v is None for v in key):
+            # 自然键不完整的行无法去重，原样插入
+            key = ('__row__', len(unique))
+        unique[key] = row
+    return list(unique.values())
+
+def _count_rows_for_dates(table, dates):
+    supabase = get_supabase()
+    response = supabase.table(table).select('id', count='exact').in_('fetched_date', dates).limit(1).execute()
+    return response.count or 0
+
+def bulk_upsert(table, rows, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    按自然键批量 upsert，重复执行是幂等的
+    Returns: {'inserted': 新增行数, 'updated': 更新行数}
+    """
+    stats = {'inserted': 0, 'updated': 0}
+    if not rows or not db_available():
+        return stats
+
+    key_cols = NATURAL_KEYS[table]
+    rows = _dedupe_rows(rows, key_cols)
+    dates = sorted({row['fetched_date'] for row in rows})
+
+    backend = get_backend()
+    if backend is not None:
+        # 一次 COPY + 一条 INSERT ... ON CONFLICT，不需要分块
+        stats = backend.upsert(table, rows, key_cols)
+    else:
+        supabase = get_supabase()
+        # 通过 upsert 前后的行数差计算新增/更新数量 (两次轻量的 count 请求)
+        before = _count_rows_for_dates(table, dates)
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            supabase.table(table).upsert(chunk, on_conflict=",".join(key_cols)).execute()
+        after = _count_rows_for_dates(table, dates)
+
+        stats['inserted'] = max(after - before, 0)
+        stats['updated'] = len(rows) - stats['inserted']
+    # 补录历史日期时，本地缓存的旧快照失效
+    _invalidate_history(table, dates)
+    return stats
+
+# 按天读取时各表默认返回的列 (页面用到的列，不含 created_at 等) 和排序列
+# 分页按 (排序列 desc, id desc) 做 keyset，每页一个请求，不依赖 offset
+DAY_READS = {
+    'ai_news': {
+        'columns': ('id', 'source', 'title', 'link', 'summary', 'published', 'published_str', 'fetched_date'),
+        'order': 'published'
+    },
+    'reddit_demands': {
+        'columns': ('id', 'source', 'title', 'score', 'comments', 'url', 'permalink', 'created_utc', 'fetched_date'),
+        'order': 'score'
+    },
+    'github_trending': {
+        'columns': ('id', 'repo_name', 'description', 'language', 'stars_today', 'total_stars', 'url', 'since', 'lang', 'fetched_date'),
+        'order': 'stars_today'
+    },
+    'xiaohongshu_trends': {
+        'columns': ('id', 'title', 'link', 'snippet', 'keyword', 'fetched_date'),
+        'order': 'id'
+    }
+}
+
+# 每页行数，不超过 PostgREST 默认的 max-rows (1000)，否则单次请求会被静默截断
+DEFAULT_PAGE_SIZE = 1000
+
+def _postgrest_value(value):
+    # or=() 过滤条件中，含有 , . : ( ) 等保留字符的值需要加双引号
+    text = str(value)
+    if any(c in text for c in ',.:()" '):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+def _keyset_filter(order_col, last_row):
+    """
+    下一页的条件：排在上一页最后一行之后 (order_col desc nulls last, id desc)
+    """
+    last_id = last_row['id']
+    if order_col == 'id':
+        return None, last_id
+    value = last_row.get(order_col)
+    if value is None:
+        # 已经进入排序列为空的部分
+        return f"and({order_col}.is.null,id.lt.{last_id})", None
+    value = _postgrest_value(value)
+    return f"{order_col}.lt.{value},and({order_col}.eq.{value},id.lt.{last_id}),{order_col}.is.null", None
+
+def _iter_pages(table, start_str, end_str, columns=None, limit=None, page_size=DEFAULT_PAGE_SIZE):
+    # 读取 fetched_date 在 [start_str, end_str] 内的行；其余见 iter_day_pages
+    spec = DAY_READS[table]
+    order_col = spec['order']
+    columns = list(columns or spec['columns'])
+    for col in ('id', order_col):
+        if col not in columns:
+            columns.append(col)
+
+    backend = get_backend()
+    if backend is not None:
+        yield from backend.iter_pages(table, start_str, end_str, columns, order_col, limit=limit, page_size=page_size)
+        return
+
+    supabase = get_supabase()
+    if not supabase:
+        return
+
+    def date_filter(query):
+        if start_str == end_str:
+            return query.eq('fetched_date', start_str)
+        return query.gte('fetched_date', start_str).lte('fetched_date', end_str)
+
+    select = ",".join(columns)
+
+    remaining = limit
+    last_row = None
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        query = date_filter(supabase.table(table).select(select))
+        if last_row is not None:
+            condition, before_id = _keyset_filter(order_col, last_row)
+            query = query.or_(condition) if condition else query.lt('id', before_id)
+        if order_col != 'id':
+            query = query.order(order_col, desc=True, nullsfirst=False)
+        rows = query.order('id', desc=True).limit(size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        if len(rows) < size:
+            return
+        last_row = rows[-1]
+        if remaining is not None:
+            remaining -= len(rows)
+
+def iter_day_pages(table, date_str, columns=None, limit=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    按页读取某天的数据，每页是一个行列表，按 DAY_READS 中的排序列倒序
+    columns: 需要的列 (默认 DAY_READS 中的列，id 和排序列总会包含)
+    limit: 最多返回的行数
+    """
+    yield from _iter_pages(table, date_str, date_str, columns=columns, limit=limit, page_size=page_size)
+
+def read_day(table, date_str, columns=None, limit=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    读取某天的全部数据 (分页拼接)；使用默认列且不限行数时，历史日期走本地快照缓存
+    """
+    def query():
+        rows = []
+        for page in iter_day_pages(table, date_str, columns=columns, limit=limit, page_size=page_size):
+            rows.extend(page)
+        return rows
+
+    if columns is None and limit is None:
+        return _read_day(table, date_str, query)
+    return query()
+
+def iter_day_frames(table, date_str, columns=None, limit=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    逐页返回累计到当前页的 DataFrame，调用方可以先渲染第一页，再随后续页面刷新
+    """
+    import pandas as pd
+
+    pages = []
+    for page in iter_day_pages(table, date_str, columns=columns, limit=limit, page_size=page_size):
+        pages.append(pd.DataFrame(page))
+        yield pd.concat(pages, ignore_index=True) if len(pages) > 1 else pages[0]
+
+# 一次请求读取多天、多张表的 RPC (定义见 schema.sql)
+SNAPSHOT_RANGE_RPC = 'get_snapshot_range'
+SNAPSHOT_TABLES = tuple(DAY_READS)
+# 数据库中还没有创建 RPC 时记住结果，不再重复尝试
+_rpc_available = True
+
+def _date_str(value):
+    return value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+
+def _fetch_range_rows(start_str, end_str, tables, rpc_only=False):
+    """
+    Returns: {table: [row, ...]}，没有数据库 (或 rpc_only 时 RPC 不可用) 时返回 None
+    """
+    global _rpc_available
+    backend = get_backend()
+    supabase = None if backend is not None else get_supabase()
+    if backend is None and not supabase:
+        return None
+
+    # 直连后端在同一个连接上逐表读取，不需要 RPC
+    if supabase and _rpc_available:
+        try:
+            response = supabase.rpc(SNAPSHOT_RANGE_RPC, {
+                'start_date': start_str,
+                'end_date': end_str,
+                'tables': list(tables)
+            }).execute()
+            data = response.data or {}
+            return {table: data.get(table) or [] for table in tables}
+        except Exception as e:
+            # PGRST202: 数据库中没有这个函数 (还没执行 schema.sql 中创建 RPC 的语句)，之后不再尝试
+            # 其他错误只在这一次回退到逐表查询
+            if getattr(e, 'code', None) == 'PGRST202':
+                _rpc_available = False
+            print(f"Snapshot RPC failed: {e}")
+
+    if rpc_only and backend is None:
+        return None
+    result = {}
+    for table in tables:
+        rows = []
+        for page in _iter_pages(table, start_str, end_str):
+            rows.extend(page)
+        result[table] = rows
+    return result
+
+def get_snapshot_range(start_date, end_date, tables=None, rpc_only=False):
+    """
+    读取 [start_date, end_date] 内各表的数据，优先一次 RPC 返回全部，否则每张表一次分页查询
+    已完整缓存的历史日期不会重复请求；读到的历史日期顺便写入本地快照缓存
+    rpc_only: RPC 不可用时不回退到逐表查询 (此时只返回缓存中已有的数据)
+    Returns: {table: {'YYYY-MM-DD': DataFrame}}，没有数据的日期不出现
+    """
+    import pandas as pd
+
+    tables = tuple(tables or SNAPSHOT_TABLES)
+    start_str, end_str = _date_str(start_date), _date_str(end_date)
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range(start_str, end_str)]
+
+    # 先查本地快照缓存：只请求有日期未命中的表，全部命中时不发请求
+    cache = _history_cache()
+    rows_by_table = {table: {} for table in tables}
+    missing = {}
+    for table in tables:
+        for date_str in dates:
+            rows = cache.get(table, date_str) if cache is not None and _is_historical(date_str) else None
+            if rows is None:
+                missing.setdefault(table, []).append(date_str)
+            else:
+                rows_by_table[table][date_str] = rows
+
+    if missing:
+        try:
+            fetched = _fetch_range_rows(start_str, end_str, tuple(missing), rpc_only=rpc_only)
+        except Exception as e:
+            print(f"Error fetching snapshot range from DB: {e}")
+            fetched = None
+        if fetched is not None:
+            for table, rows in fetched.items():
+                by_date = {}
+                for row in rows:
+                    by_date.setdefault(str(row['fetched_date'])[:10], []).append(row)
+                rows_by_table[table] = by_date
+                if cache is not None:
+                    for date_str in missing[table]:
+                        if _is_historical(date_str):
+                            # 没有数据的日期也缓存 (空列表)，之后不再为它重新请求
+                            cache.put(table, date_str, by_date.get(date_str, []))
+
+    return {
+        table: {date_str: pd.DataFrame(rows) for date_str, rows in sorted(by_date.items()) if rows}
+        for table, by_date in rows_by_table.items()
+    }
+
+def prefetch_snapshot(date_str, tables=None):
+    """
+    历史日期：如果本地快照缓存缺少某些表，用一次请求取回该日所有表的数据写入缓存，
+    之后各个 get_*_from_db 直接命中缓存 (一次往返代替每张表一次)
+    RPC 不可用时什么也不做，由各数据源照常并发读取
+    """
+    if not _is_historical(date_str) or not db_available() or _history_cache() is None:
+        return
+    if get_backend() is None and not _rpc_available:
+        return
     try:
-        supabase = create_client(url, key)
+        get_snapshot_range(date_str, date_str, tables, rpc_only=True)
     except Exception as e:
-        print(f"Failed to initialize Supabase client: {e}")
-else:
-    if not create_client:
-        print("Warning: 'supabase' library not found.")
-    else:
-        print("Warning: SUPABASE_URL or SUPABASE_KEY not found in environment variables or secrets.")
+        print(f"Error prefetching snapshot for {date_str}: {e}")
+
+def _history_cache():
+    # 本地嵌入式数据库的读取本来就不经过网络，不需要再缓存一份快照
+    return None if _embedded_backend() else get_history_cache()
+
+def _is_historical(date_str):
+    # 与 utils 中判断"今天"的方式一致 (本地时间)
+    return date_str < datetime.now().strftime('%Y-%m-%d')
+
+def _invalidate_history(table, dates):
+    cache = _history_cache()
+    if cache is None:
+        return
+    for date_str in dates:
+        if _is_historical(date_str):
+            cache.invalidate(table, date_str)
+
+def _read_day(table, date_str, query):
+    """
+    读取某天的数据：历史日期优先读本地快照缓存，未命中时执行 query() 并写入缓存
+    今天的数据还在变化，总是执行 query()
+    """
+    cache = _history_cache() if _is_historical(date_str) else None
+    if cache is not None:
+        rows = cache.get(table, date_str)
+        if rows is not None:
+            return rows
+
+    rows = query()
+    if cache is not None:
+        cache.put(table, date_str, rows)
+    return rows
+
+# 写入方式：默认交给 write-behind 队列 (write_queue.py) 在后台批量写入，抓取函数不再等待网络写入；
+# CROW_DB_WRITE_BEHIND=0 时恢复为同步写入
+WRITE_BEHIND = get_flag("CROW_DB_WRITE_BEHIND", True)
+
+def _write_ops(op, table, rows):
+    """
+    write-behind 队列的写入函数：一次写入同一张表的一组行 (队列已把同一批中同一张表的行合并)
+    失败时抛出异常，这一组留在队列中重试 (upsert 是幂等的)，不影响其他表
+    """
+    if not db_available():
+        raise RuntimeError("No database is configured")
+
+    if op == OP_FETCH_RUN:
+        # 同一数据源同一天只保留最后一次
+        runs = {(row['source'], row['fetched_date']): row for row in rows}
+        _upsert_fetch_runs(list(runs.values()))
+        return
+    stats = bulk_upsert(table, rows)
+    print(f"Flushed {len(rows)} rows to {table} ({stats['inserted']} inserted, {stats['updated']} updated)")
+
+_write_queue_failed = False
+
+def _get_write_queue():
+    global _write_queue_failed
+    # 本地嵌入式数据库写入只需几毫秒，直接同步写入
+    if not WRITE_BEHIND or _write_queue_failed or _embedded_backend():
+        return None
+    try:
+        return get_write_queue(writer=_write_ops)
+    except OSError as e:
+        # spool 目录不可用时退回同步写入
+        print(f"Write-behind queue unavailable, writing synchronously: {e}")
+        _write_queue_failed = True
+        return None
+
+def _save_rows(table, rows, date_str, label):
+    queue = _get_write_queue()
+    if queue is not None:
+        queue.enqueue(OP_UPSERT, table, rows)
+        print(f"Queued {len(rows)} {label} items for DB write for {date_str}")
+        return {'queued': len(rows)}
+
+    # 按自然键批量 upsert，重复刷新不会产生重复行
+    stats = bulk_upsert(table, rows)
+    print(f"Saved {len(rows)} {label} items to DB for {date_str} ({stats['inserted']} inserted, {stats['updated']} updated)")
+    return stats
+
+def start_write_queue():
+    """
+    提前启动写入队列，接管之前退出的进程没有写完的 spool
+    """
+    if db_available():
+        _get_write_queue()
+
+def flush_writes(timeout=30):
+    """
+    等待队列中的写入完成 (队列未启动或同步写入时直接返回 True)
+    """
+    queue = get_write_queue()
+    return queue.flush(timeout) if queue is not None else True
+
+def get_write_stats():
+    """
+    写入队列的状态：queue_depth (待写入行数)、last_flush_latency (秒) 等；队列未启动时返回 None
+    """
+    queue = get_write_queue()
+    return queue.get_stats() if queue is not None else None
 
 def get_news_from_db(date_str):
     """
     从 Supabase 获取指定日期的 AI 新闻
     """
-    if not supabase:
+    if not db_available():
         return []
     
     try:
-        response = supabase.table('ai_news').select("*").eq('fetched_date', date_str).order('published', desc=True).execute()
-        return response.data
+        return read_day('ai_news', date_str)
     except Exception as e:
         print(f"Error fetching news from DB: {e}")
         return []
@@ -65,7 +524,7 @@ def save_news_to_db(news_items, date_str):
     """
     保存 AI 新闻到 Supabase
     """
-    if not supabase or not news_items:
+    if not db_available() or not news_items:
         return
     
     try:
@@ -82,9 +541,7 @@ def save_news_to_db(news_items, date_str):
                 'fetched_date': date_str
             })
             
-        # 批量插入
-        supabase.table('ai_news').insert(data_to_insert).execute()
-        print(f"Saved {len(data_to_insert)} news items to DB for {date_str}")
+        return _save_rows('ai_news', data_to_insert, date_str, 'news')
     except Exception as e:
         print(f"Error saving news to DB: {e}")
 
@@ -92,12 +549,11 @@ def get_reddit_from_db(date_str):
     """
     从 Supabase 获取指定日期的 Reddit 热门
     """
-    if not supabase:
+    if not db_available():
         return []
     
     try:
-        response = supabase.table('reddit_demands').select("*").eq('fetched_date', date_str).order('score', desc=True).execute()
-        return response.data
+        return read_day('reddit_demands', date_str)
     except Exception as e:
         print(f"Error fetching reddit data from DB: {e}")
         return []
@@ -106,7 +562,7 @@ def save_reddit_to_db(reddit_items, date_str):
     """
     保存 Reddit 热门数据到 Supabase
     """
-    if not supabase or not reddit_items:
+    if not db_available() or not reddit_items:
         return
     
     try:
@@ -124,9 +580,7 @@ def save_reddit_to_db(reddit_items, date_str):
                 'fetched_date': date_str
             })
             
-        # 批量插入
-        supabase.table('reddit_demands').insert(data_to_insert).execute()
-        print(f"Saved {len(data_to_insert)} reddit items to DB for {date_str}")
+        return _save_rows('reddit_demands', data_to_insert, date_str, 'reddit')
     except Exception as e:
         print(f"Error saving reddit data to DB: {e}")
 
@@ -134,12 +588,11 @@ def get_github_trending_from_db(date_str):
     """
     从 Supabase 获取指定日期的 GitHub 热榜
     """
-    if not supabase:
+    if not db_available():
         return []
     
     try:
-        response = supabase.table('github_trending').select("*").eq('fetched_date', date_str).order('stars_today', desc=True).execute()
-        return response.data
+        return read_day('github_trending', date_str)
     except Exception as e:
         print(f"Error fetching github trending from DB: {e}")
         return []
@@ -148,7 +601,7 @@ def save_github_trending_to_db(items, date_str):
     """
     保存 GitHub 热榜数据到 Supabase
     """
-    if not supabase or not items:
+    if not db_available() or not items:
         return
     
     try:
@@ -162,12 +615,12 @@ def save_github_trending_to_db(items, date_str):
                 'stars_today': item['stars_today'],
                 'total_stars': item['total_stars'],
                 'url': item['url'],
+                'since': item.get('since', 'daily'),
+                'lang': item.get('lang', 'all'),
                 'fetched_date': date_str
             })
             
-        # 批量插入
-        supabase.table('github_trending').insert(data_to_insert).execute()
-        print(f"Saved {len(data_to_insert)} github items to DB for {date_str}")
+        return _save_rows('github_trending', data_to_insert, date_str, 'github')
     except Exception as e:
         print(f"Error saving github data to DB: {e}")
 
@@ -175,11 +628,16 @@ def delete_xhs_for_date(date_str):
     """
     删除指定日期的小红书数据 (用于清理脏数据)
     """
-    if not supabase:
+    if not db_available():
         return
         
     try:
-        supabase.table('xiaohongshu_trends').delete().eq('fetched_date', date_str).execute()
+        backend = get_backend()
+        if backend is not None:
+            backend.delete_day('xiaohongshu_trends', date_str)
+        else:
+            get_supabase().table('xiaohongshu_trends').delete().eq('fetched_date', date_str).execute()
+        _invalidate_history('xiaohongshu_trends', [date_str])
         print(f"Deleted XHS data for {date_str}")
     except Exception as e:
         print(f"Error deleting XHS data: {e}")
@@ -188,12 +646,11 @@ def get_xhs_from_db(date_str):
     """
     从 Supabase 获取指定日期的小红书热点
     """
-    if not supabase:
+    if not db_available():
         return []
     
     try:
-        response = supabase.table('xiaohongshu_trends').select("*").eq('fetched_date', date_str).order('id', desc=True).execute()
-        return response.data
+        return read_day('xiaohongshu_trends', date_str)
     except Exception as e:
         print(f"Error fetching xhs from DB: {e}")
         return []
@@ -202,7 +659,7 @@ def save_xhs_to_db(items, date_str):
     """
     保存小红书热点数据到 Supabase
     """
-    if not supabase or not items:
+    if not db_available() or not items:
         return
     
     try:
@@ -217,8 +674,53 @@ def save_xhs_to_db(items, date_str):
                 'fetched_date': date_str
             })
             
-        # 批量插入
-        supabase.table('xiaohongshu_trends').insert(data_to_insert).execute()
-        print(f"Saved {len(data_to_insert)} xhs items to DB for {date_str}")
+        return _save_rows('xiaohongshu_trends', data_to_insert, date_str, 'xhs')
     except Exception as e:
         print(f"Error saving xhs data to DB: {e}")
+
+def record_fetch_run(source, date_str, item_count):
+    """
+    记录某个数据源完成一次抓取 (每个数据源每天一行，重复抓取时更新完成时间)
+    """
+    if not db_available():
+        return
+
+    row = {
+        'source': source,
+        'fetched_date': date_str,
+        'item_count': item_count,
+        'finished_at': datetime.now(timezone.utc).isoformat()
+    }
+    try:
+        queue = _get_write_queue()
+        if queue is not None:
+            # 排在同一次抓取的数据之后写入
+            queue.enqueue(OP_FETCH_RUN, 'fetch_runs', [row], after=FETCH_RUN_TABLES.get(source))
+            return
+        _upsert_fetch_runs([row])
+    except Exception as e:
+        print(f"Error recording fetch run for {source}: {e}")
+
+def _upsert_fetch_runs(rows):
+    backend = get_backend()
+    if backend is not None:
+        backend.upsert('fetch_runs', rows, FETCH_RUN_KEY)
+    else:
+        get_supabase().table('fetch_runs').upsert(rows, on_conflict=",".join(FETCH_RUN_KEY)).execute()
+
+def get_last_fetch_run(source, date_str):
+    """
+    获取某个数据源指定日期最近一次抓取的记录，没有时返回 None
+    """
+    if not db_available():
+        return None
+
+    try:
+        backend = get_backend()
+        if backend is not None:
+            return backend.get_fetch_run(source, date_str)
+        response = get_supabase().table('fetch_runs').select("*").eq('source', source).eq('fetched_date', date_str).limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        print(f"Error fetching last run for {source}: {e}")
+        return None
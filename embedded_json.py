@@ -0,0 +1,101 @@
+import json
+import re
+
+# 提取页面中内嵌的 JS 状态对象，例如 <script>window.__INITIAL_STATE__={...}</script>
+# 边界查找和解析都交给 C 实现 (str.find / re / json 扫描器)，不在 Python 中逐字符循环：
+# 1. 从标记后的第一个 '{' 开始，截取到所在 <script> 结束为止
+# 2. 只把字符串字面量之外的 JS undefined 改写为 null，字符串中的 "undefined" 保持原样
+# 3. json.JSONDecoder.raw_decode 解析第一个完整的对象，自动忽略其后的 ';' 等内容
+
+_DECODER = json.JSONDecoder()
+
+# 反斜杠转义 (\" \\ \n ...) 整体替换成两个普通字符，偏移量不变，之后字符串内不再有转义的引号
+_ESCAPE_RE = re.compile(r'\\.', re.S)
+UNDEFINED = "undefined"
+
+
+def _is_identifier_char(c):
+    return c.isalnum() or c == "_" or c == "$"
+
+
+def rewrite_undefined(text):
+    """
+    把字符串字面量之外的 undefined 改写为 null
+    """
+    pos = text.find(UNDEFINED)
+    if pos == -1:
+        return text
+
+    masked = _ESCAPE_RE.sub("__", text) if "\\" in text else text
+    n = len(masked)
+    parts = []
+    last = 0
+    quotes = 0
+    counted_to = 0
+    # 用 str.find 跳到每个候选位置，比逐位置尝试单词边界的正则快一个数量级
+    while pos != -1:
+        end = pos + len(UNDEFINED)
+        if (pos == 0 or not _is_identifier_char(masked[pos - 1])) and (end >= n or not _is_identifier_char(masked[end])):
+            # 之前的双引号个数为奇数时位于字符串内
+            quotes += masked.count('"', counted_to, pos)
+            counted_to = pos
+            if quotes % 2 == 0:
+                parts.append(text[last:pos])
+                parts.append("null")
+                last = end
+        pos = masked.find(UNDEFINED, end)
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+def extract_js_object(html, marker):
+    """
+    提取 marker 之后的第一个 JS 对象并解析为 Python 对象，找不到或无法解析时返回 None
+    """
+    idx = html.find(marker)
+    if idx == -1:
+        return None
+    start = html.find("{", idx + len(marker))
+    if start == -1:
+        return None
+
+    # 内联脚本中的字符串不会包含未转义的 </script>，状态对象一定在它之前结束
+    end = html.find("</script>", start)
+    raw = html[start:end] if end != -1 else html[start:]
+
+    try:
+        data, _ = _DECODER.raw_decode(rewrite_undefined(raw))
+    except ValueError as e:
+        print(f"Failed to decode embedded state after {marker}: {e}")
+        return None
+    return data
+
+
+def unwrap(value):
+    """
+    Vue 的 ref/reactive 序列化后会包一层 {"_rawValue": ..., "_value": ...}
+    """
+    if isinstance(value, dict):
+        if "_rawValue" in value:
+            return value["_rawValue"]
+        if "_value" in value:
+            return value["_value"]
+    return value
+
+
+def get_path(data, path):
+    """
+    按键路径取值 (每一层都会解开 Vue 的包装)，路径不存在时返回 None
+    """
+    value = unwrap(data)
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and isinstance(key, int) and -len(value) <= key < len(value):
+            value = value[key]
+        else:
+            return None
+        value = unwrap(value)
+    return value
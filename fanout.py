@@ -0,0 +1,84 @@
+import time
+import concurrent.futures
+
+# 数据源并发调度 (fan-out)
+# 所有数据源同时启动，每个源有自己的截止时间，整页还有一个总预算。
+# 超时的源直接标记为 timeout 并返回部分结果，不再等待最慢的那个。
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+
+def run_fanout(sources, timeouts=None, default_timeout=20, total_budget=30):
+    """
+    并发执行多个数据源函数。
+
+    sources: {name: callable}，callable 接收一个参数 deadline (time.monotonic() 下该数据源的截止时间)，
+             数据源可以把它传给 fetch_many，到期时取消仍在进行的请求
+    timeouts: {name: seconds}，单个数据源的截止时间，未配置的使用 default_timeout
+    total_budget: 整个页面的总时间预算 (秒)，任何数据源都不会超过它
+
+    Returns: (results, statuses)
+        results: {name: 返回值}，超时或出错的数据源为 None
+        statuses: {name: {'status': ok/timeout/error, 'elapsed': 秒, 'error': 错误信息}}
+    """
+    timeouts = timeouts or {}
+    results = {name: None for name in sources}
+    statuses = {}
+
+    if not sources:
+        return results, statuses
+
+    start = time.monotonic()
+    budget_deadline = start + total_budget
+    deadlines = {
+        name: min(start + timeouts.get(name, default_timeout), budget_deadline)
+        for name in sources
+    }
+
+    # 每个数据源一个线程，保证所有源同时开始计时，不会因为排队而吃掉自己的预算
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(sources))
+    pending = {executor.submit(func, deadlines[name]): name for name, func in sources.items()}
+
+    try:
+        while pending:
+            now = time.monotonic()
+
+            # 1. 先处理已经超过截止时间的数据源
+            for future, name in list(pending.items()):
+                if now >= deadlines[name]:
+                    future.cancel()
+                    del pending[future]
+                    statuses[name] = {
+                        'status': STATUS_TIMEOUT,
+                        'elapsed': round(now - start, 2),
+                        'error': f"超过 {round(deadlines[name] - start, 1)}s 截止时间"
+                    }
+                    print(f"Source {name} timed out after {now - start:.1f}s")
+
+            if not pending:
+                break
+
+            # 2. 等待到下一个最近的截止时间，或任一数据源完成
+            next_deadline = min(deadlines[name] for name in pending.values())
+            done, _ = concurrent.futures.wait(
+                list(pending.keys()),
+                timeout=max(0, next_deadline - now),
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                name = pending.pop(future)
+                elapsed = round(time.monotonic() - start, 2)
+                try:
+                    results[name] = future.result()
+                    statuses[name] = {'status': STATUS_OK, 'elapsed': elapsed, 'error': None}
+                except Exception as exc:
+                    print(f"Source {name} generated an exception: {exc}")
+                    statuses[name] = {'status': STATUS_ERROR, 'elapsed': elapsed, 'error': str(exc)}
+    finally:
+        # 不等待超时的线程结束 (线程无法被强制终止，它们会在后台跑完并自行写库)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, statuses
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from config import cache_path
+
+# RSS 条件请求缓存
+# 记录每个 feed 的 ETag / Last-Modified，下次请求时带上 If-None-Match / If-Modified-Since。
+# 源站返回 304 时直接复用上一次解析好的条目，跳过下载、feedparser 解析和 HTML 清洗。
+# 命中统计：self.stats 是进程内的累计值；每次抓取另外传入自己的 stats (new_stats())，
+# 并发的多次抓取互不覆盖。
+
+
+def new_stats():
+    return {'hits': 0, 'misses': 0, 'bytes': 0}
+
+
+def _count(stats_list, key, value):
+    for stats in stats_list:
+        if stats is not None:
+            stats[key] += value
+
+
+class FeedValidatorCache:
+    def __init__(self, path=None):
+        self.path = path or cache_path("rss_feed_cache.json")
+        self._lock = threading.Lock()
+        self._feeds = self._load()
+        self.reset_stats()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Failed to load RSS cache, starting empty: {e}")
+            return {}
+
+    def _save(self):
+        # 先写临时文件再替换，避免并发抓取时留下半截 JSON
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._feeds, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url):
+        """
+        返回该 feed 的条件请求头 (没有缓存时返回空字典)
+        """
+        with self._lock:
+            cached = self._feeds.get(url)
+        if not cached or cached.get('entries') is None:
+            return {}
+
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def get_entries(self, url, stats=None):
+        """
+        304 时调用：返回上一次解析的条目，并计入命中
+        """
+        with self._lock:
+            cached = self._feeds.get(url)
+            if not cached or cached.get('entries') is None:
+                return None
+            _count((self.stats, stats), 'hits', 1)
+
+        entries = []
+        for item in cached['entries']:
+            item = dict(item)
+            item['published'] = datetime.fromisoformat(item['published'])
+            entries.append(item)
+        return entries
+
+    def store(self, url, response_headers, entries, size=0, stats=None):
+        """
+        200 时调用：保存新的校验值与解析结果，并计入未命中
+        """
+        serializable = []
+        for item in entries:
+            item = dict(item)
+            item['published'] = item['published'].isoformat()
+            serializable.append(item)
+
+        with self._lock:
+            _count((self.stats, stats), 'misses', 1)
+            _count((self.stats, stats), 'bytes', size)
+
+            etag = response_headers.get('ETag')
+            last_modified = response_headers.get('Last-Modified')
+            if not etag and not last_modified:
+                # 源站不支持条件请求，缓存也没有意义
+                self._feeds.pop(url, None)
+                return
+
+            self._feeds[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'entries': serializable
+            }
+            try:
+                self._save()
+            except Exception as e:
+                print(f"Failed to persist RSS cache: {e}")
+
+    def record_not_modified(self, size=0, stats=None):
+        with self._lock:
+            _count((self.stats, stats), 'bytes', size)
+
+    def reset_stats(self):
+        self.stats = new_stats()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+_feed_cache = None
+_feed_cache_lock = threading.Lock()
+
+
+def get_feed_cache():
+    global _feed_cache
+    if _feed_cache is None:
+        with _feed_cache_lock:
+            if _feed_cache is None:
+                _feed_cache = FeedValidatorCache()
+    return _feed_cache
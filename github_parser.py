@@ -0,0 +1,187 @@
+import importlib.util
+import re
+
+from config import get_secret
+
+# GitHub Trending 页面解析
+# 按可用性依次选择 selectolax (Lexbor，C 实现) > lxml > BeautifulSoup (html.parser)，三种后端输出相同的字段。
+# 可通过 CROW_GITHUB_PARSER=selectolax|lxml|bs4 指定，指定的后端未安装时自动回退。
+
+PARSER_AUTO = "auto"
+PARSER_SELECTOLAX = "selectolax"
+PARSER_LXML = "lxml"
+PARSER_BS4 = "bs4"
+
+HAS_SELECTOLAX = importlib.util.find_spec("selectolax") is not None
+HAS_LXML = importlib.util.find_spec("lxml") is not None
+
+DEFAULT_PARSER = get_secret("CROW_GITHUB_PARSER", default=PARSER_AUTO)
+
+_AVAILABLE = {
+    PARSER_SELECTOLAX: HAS_SELECTOLAX,
+    PARSER_LXML: HAS_LXML,
+    PARSER_BS4: True
+}
+
+
+def resolve_parser(parser=None):
+    """
+    确定实际使用的解析后端
+    """
+    parser = parser or DEFAULT_PARSER
+    if parser not in _AVAILABLE and parser != PARSER_AUTO:
+        raise ValueError(f"Unknown GitHub parser: {parser}")
+    if parser != PARSER_AUTO:
+        if _AVAILABLE[parser]:
+            return parser
+        print(f"{parser} not installed, picking another GitHub parser.")
+    for candidate in (PARSER_SELECTOLAX, PARSER_LXML, PARSER_BS4):
+        if _AVAILABLE[candidate]:
+            return candidate
+
+
+def _build_item(repo_text, href, description, language, total_stars_text, stars_period_text):
+    if not href:
+        return None
+    repo_name = repo_text.strip().replace('\n', '').replace(' ', '')
+
+    total_stars = 0
+    if total_stars_text is not None:
+        try:
+            total_stars = int(total_stars_text.strip().replace(',', ''))
+        except ValueError:
+            pass
+
+    # "123 stars today" / "1,234 stars this week"
+    stars_today = 0
+    if stars_period_text:
+        match = re.search(r'(\d+)', stars_period_text.strip().replace(',', ''))
+        if match:
+            stars_today = int(match.group(1))
+
+    return {
+        'repo_name': repo_name,
+        'description': description.strip() if description is not None else "",
+        'language': language.strip() if language is not None else "Unknown",
+        'stars_today': stars_today,
+        'total_stars': total_stars,
+        'url': f"https://github.com{href}"
+    }
+
+
+def _parse_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    items = []
+    for row in LexborHTMLParser(html).css('.Box-row'):
+        try:
+            h2_a = row.css_first('h2 a')
+            if h2_a is None:
+                continue
+            p_desc = row.css_first('p')
+            lang_span = row.css_first('span[itemprop="programmingLanguage"]')
+            footer_links = row.css('div.f6 a')
+            stars_span = row.css_first('span.d-inline-block.float-sm-right')
+            item = _build_item(
+                h2_a.text(),
+                h2_a.attributes.get('href'),
+                p_desc.text() if p_desc is not None else None,
+                lang_span.text() if lang_span is not None else None,
+                footer_links[0].text() if footer_links else None,
+                stars_span.text() if stars_span is not None else None
+            )
+            if item:
+                items.append(item)
+        except Exception as e:
+            print(f"Error parsing a GitHub row: {e}")
+    return items
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# lxml 不依赖 cssselect，直接使用与 CSS 选择器等价的 XPath
+_LXML_ROWS = f"//*[{_has_class('Box-row')}]"
+_LXML_REPO_LINK = ".//h2//a"
+_LXML_DESC = ".//p"
+_LXML_LANG = ".//span[@itemprop='programmingLanguage']"
+_LXML_FOOTER_LINKS = f".//div[{_has_class('f6')}]//a"
+_LXML_STARS = f".//span[{_has_class('d-inline-block')} and {_has_class('float-sm-right')}]"
+
+
+def _parse_lxml(html):
+    import lxml.html
+
+    def first(row, path):
+        found = row.xpath(path)
+        return found[0] if found else None
+
+    items = []
+    for row in lxml.html.document_fromstring(html).xpath(_LXML_ROWS):
+        try:
+            h2_a = first(row, _LXML_REPO_LINK)
+            if h2_a is None:
+                continue
+            p_desc = first(row, _LXML_DESC)
+            lang_span = first(row, _LXML_LANG)
+            footer_link = first(row, _LXML_FOOTER_LINKS)
+            stars_span = first(row, _LXML_STARS)
+            item = _build_item(
+                h2_a.text_content(),
+                h2_a.get('href'),
+                p_desc.text_content() if p_desc is not None else None,
+                lang_span.text_content() if lang_span is not None else None,
+                footer_link.text_content() if footer_link is not None else None,
+                stars_span.text_content() if stars_span is not None else None
+            )
+            if item:
+                items.append(item)
+        except Exception as e:
+            print(f"Error parsing a GitHub row: {e}")
+    return items
+
+
+def _parse_bs4(html):
+    from bs4 import BeautifulSoup
+
+    items = []
+    for row in BeautifulSoup(html, 'html.parser').select('.Box-row'):
+        try:
+            h2_a = row.select_one('h2 a')
+            if not h2_a:
+                continue
+            p_desc = row.select_one('p')
+            lang_span = row.select_one('span[itemprop="programmingLanguage"]')
+            footer_links = row.select('div.f6 a')
+            stars_span = row.select_one('span.d-inline-block.float-sm-right')
+            item = _build_item(
+                h2_a.text,
+                h2_a.get('href'),
+                p_desc.text if p_desc else None,
+                lang_span.text if lang_span else None,
+                footer_links[0].text if footer_links else None,
+                stars_span.text if stars_span else None
+            )
+            if item:
+                items.append(item)
+        except Exception as e:
+            print(f"Error parsing a GitHub row: {e}")
+    return items
+
+
+_PARSERS = {
+    PARSER_SELECTOLAX: _parse_selectolax,
+    PARSER_LXML: _parse_lxml,
+    PARSER_BS4: _parse_bs4
+}
+
+
+def parse_trending_html(content, parser=None):
+    """
+    解析 Trending 页面，content 可以是 bytes (按 UTF-8 解码) 或 str
+    Returns: [{'repo_name', 'description', 'language', 'stars_today', 'total_stars', 'url'}]
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    return _PARSERS[resolve_parser(parser)](content)
@@ -0,0 +1,114 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import get_int, cache_path
+from sqlite_cache import SQLiteLRUCache
+
+# 历史快照的本地缓存
+# 过去日期的数据抓取完成后不会再变化，第一次从 Supabase 读取后按 (表, 日期) 保存在本地 SQLite 中，
+# 之后翻看日历直接读本地，不再经过网络。行数据以压缩后的 JSON 保存，按总大小 LRU 淘汰。
+# 空结果也会缓存 (某张表当天没有数据是常态，例如小红书)，避免每次都重新查询；
+# 补录或删除某天数据时由 db_utils 调用 invalidate。
+
+
+# max_bytes: 压缩后的总大小上限，0 表示关闭缓存
+HISTORY_CACHE_CONFIG = {
+    'max_bytes': get_int("CROW_HISTORY_CACHE_MAX_MB", 256) * 1024 * 1024
+}
+
+
+class HistoryCache(SQLiteLRUCache):
+    TABLE = "snapshots"
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            table_name TEXT NOT NULL,
+            fetched_date TEXT NOT NULL,
+            rows BLOB NOT NULL,
+            row_count INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (table_name, fetched_date)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS snapshots_accessed_at ON snapshots (accessed_at)"
+    )
+
+    def __init__(self, path=None, max_bytes=None):
+        super().__init__(
+            path or cache_path("history_cache.sqlite3"),
+            max_bytes=HISTORY_CACHE_CONFIG['max_bytes'] if max_bytes is None else max_bytes
+        )
+
+    def get(self, table, date_str):
+        """
+        返回缓存的行列表 (当天没有数据时为空列表)，未缓存时返回 None
+        """
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT rows FROM snapshots WHERE table_name = ? AND fetched_date = ?", (table, date_str)
+                ).fetchone()
+                if row is None:
+                    self.stats['misses'] += 1
+                    return None
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE snapshots SET accessed_at = ? WHERE table_name = ? AND fetched_date = ?",
+                        (time.time(), table, date_str)
+                    )
+            except sqlite3.Error as e:
+                print(f"History cache read failed: {e}")
+                return None
+            self.stats['hits'] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, table, date_str, rows):
+        if rows is None or self.max_bytes <= 0:
+            return
+        blob = zlib.compress(json.dumps(rows, ensure_ascii=False, default=str).encode('utf-8'))
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO snapshots (table_name, fetched_date, rows, row_count, size, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (table, date_str, blob, len(rows), len(blob), time.time())
+                    )
+                self._added(1, len(blob))
+            except sqlite3.Error as e:
+                print(f"Failed to persist history cache: {e}")
+
+    def invalidate(self, table, date_str):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM snapshots WHERE table_name = ? AND fetched_date = ?", (table, date_str)
+                    )
+                self._entries, self._bytes = self._totals()
+            except sqlite3.Error as e:
+                print(f"Failed to invalidate history cache: {e}")
+
+
+_history_cache = None
+_history_cache_lock = threading.Lock()
+
+
+def get_history_cache():
+    """
+    获取全局共享的 HistoryCache；缓存关闭或无法打开时返回 None
+    """
+    global _history_cache
+    if _history_cache is None and HISTORY_CACHE_CONFIG['max_bytes'] > 0:
+        with _history_cache_lock:
+            if _history_cache is None:
+                try:
+                    _history_cache = HistoryCache()
+                except sqlite3.Error as e:
+                    print(f"History cache unavailable: {e}")
+                    HISTORY_CACHE_CONFIG['max_bytes'] = 0
+    return _history_cache
@@ -0,0 +1,268 @@
+import re
+from html.entities import html5
+
+from config import get_secret
+
+# HTML 摘要转纯文本
+# 对每条 RSS 摘要构建完整的 BeautifulSoup 树只是为了 get_text()，在解析阶段占了大部分 CPU。
+# 这里用一次正则扫描去掉标签、解码实体，收集到足够字符后立即停止，
+# 输出与 BeautifulSoup(html, 'html.parser').get_text(separator=' ').strip() 一致
+# (包括 html.parser 对残缺标签、未闭合注释、无分号实体等的容错行为)。
+# 唯一的已知差异是属性里引号不配对的标签，feedparser 清洗过的摘要不会出现这种写法。
+
+EXTRACTOR_FAST = "fast"
+EXTRACTOR_BS4 = "bs4"
+
+# 可通过 CROW_SUMMARY_EXTRACTOR=bs4 切回 BeautifulSoup
+DEFAULT_EXTRACTOR = get_secret("CROW_SUMMARY_EXTRACTOR", default=EXTRACTOR_FAST)
+
+# 与 BeautifulSoup 相同的实体表：html5 表去掉末尾分号，同名时取排序后的第一个
+ENTITIES = {}
+for _name, _char in sorted(html5.items()):
+    ENTITIES.setdefault(_name[:-1] if _name.endswith(";") else _name, _char)
+
+# 内容不计入文本的标签 (script/style 的内容不解析标签，单独处理)
+RAW_TEXT_TAGS = ("script", "style")
+EXCLUDED_TAGS = ("rt", "rp", "template")
+# 这些标签内的纯空白文本保持原样，其他地方的纯空白文本折叠为一个空格或换行
+PRESERVE_WHITESPACE_TAGS = ("pre", "textarea")
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# 空元素不入栈
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer'
+])
+
+_START_TAG_RE = re.compile(r'<([a-zA-Z][^\t\n\r\f />\x00]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+_END_TAG_RE = re.compile(r'</([a-zA-Z][^\t\n\r\f />\x00]*)?[^>]*>')
+_COMMENT_CLOSE_RE = re.compile(r'--\s*>')
+_CDATA_RE = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.S)
+_DECL_RE = re.compile(r'<[!?][^>]*>')
+_RAW_TEXT_END_RE = {tag: re.compile(r'</\s*%s\s*>' % tag, re.I) for tag in RAW_TEXT_TAGS}
+# 与 html.parser 相同：实体名/编号后必须跟一个终止字符，终止字符是 ';' 时一并吞掉
+# 无法解析的 "&#..."：html.parser 在 feed() 阶段只输出 "&#" 并转入 close() 阶段，
+# 在 close() 阶段再次遇到时把剩余全部内容当作原始文本
+_BAD_CHARREF_RE = re.compile(r'&#(?![xX][0-9a-fA-F]+[^0-9a-fA-F]|[0-9]+[^0-9a-fA-F])')
+_REF_RE = re.compile(r'&(?:#([xX][0-9a-fA-F]+|[0-9]+)(?=[^0-9a-fA-F])|([a-zA-Z][-.a-zA-Z0-9]*)(?=[^a-zA-Z0-9]));?')
+
+
+def _charref(value):
+    # 与 BeautifulSoup 的数值实体处理一致，0x80-0x9F 按 Windows-1252 解释
+    if value == 0 or value > 0x10FFFF or 0xD800 <= value <= 0xDFFF:
+        return "�"
+    if 0x80 <= value <= 0x9F:
+        try:
+            return bytes([value]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(value)
+
+
+def _replace_ref(match):
+    number, name = match.groups()
+    if number is not None:
+        if number[0] in "xX":
+            return _charref(int(number[1:], 16))
+        return _charref(int(number))
+    char = ENTITIES.get(name)
+    # 未知实体保留为 "&name" (BeautifulSoup 的行为)
+    return char if char is not None else "&" + name
+
+
+def decode_entities(text, terminated=False):
+    """
+    解码文本中的实体引用
+    terminated: 文本后面紧跟着标签，末尾的实体也算有终止字符
+    """
+    if "&" not in text:
+        return text
+    if terminated:
+        return _REF_RE.sub(_replace_ref, text + "<")[:-1]
+    return _REF_RE.sub(_replace_ref, text)
+
+
+def _close_segment(parts, preserve):
+    # BeautifulSoup 结束文本节点时会把纯 ASCII 空白折叠成一个换行或空格
+    segment = "".join(parts)
+    if not preserve and not segment.strip(ASCII_SPACES):
+        return "\n" if "\n" in segment else " "
+    return segment
+
+
+def fast_html_to_text(html, max_chars=None):
+    """
+    流式提取纯文本，等价于 BeautifulSoup(html, 'html.parser').get_text(separator=' ').strip()
+    max_chars: 收集到超过 max_chars 个字符后提前返回，此时结果的前 max_chars 个字符
+               与完整文本一致，且长度一定大于 max_chars
+    """
+    if not html:
+        return ""
+
+    segments = []   # 每段对应 BeautifulSoup 中的一个文本节点
+    current = []    # 当前文本节点的片段 (字面量 '<' 不会切断文本节点)
+    # 打开的标签栈：结束标签会一直弹出到同名标签，与 BeautifulSoup 建树时的行为一致
+    stack = []
+    excluded = 0
+    preserve = 0
+    # 是否已进入 html.parser 的 close() 阶段 (遇到过不完整的结构)
+    closing = False
+    total = 0
+    check_at = max_chars if max_chars is not None else None
+
+    n = len(html)
+    i = 0
+    while i < n:
+        j = html.find("<", i)
+        if j < 0:
+            j = n
+        if i < j:
+            if "&#" in html[i:j]:
+                bad = _BAD_CHARREF_RE.search(html, i)
+                if bad and bad.start() < j:
+                    b = bad.start()
+                    if not excluded:
+                        current.append(decode_entities(html[i:b], terminated=True))
+                    if not closing and html.find(";", b) >= 0:
+                        if not excluded:
+                            current.append("&#")
+                        closing = True
+                        i = b + 2
+                        continue
+                    if not excluded:
+                        current.append(html[b:])
+                    break
+            if not excluded:
+                current.append(decode_entities(html[i:j], terminated=j < n))
+            i = j
+            if i >= n:
+                break
+
+        # boundary: 标签/注释等结束当前文本节点
+        # incomplete: 以标签开头但不完整，按 html.parser 的容错规则作为原始文本
+        boundary = True
+        incomplete = False
+        # 文本节点在遇到标签时结束，是否保留空白取决于标签之前的状态
+        preserve_text = preserve
+        m = _START_TAG_RE.match(html, i)
+        if m:
+            tag = m.group(1).lower()
+            self_closing = m.group(0).endswith("/>")
+            if tag in RAW_TEXT_TAGS and not self_closing:
+                end = _RAW_TEXT_END_RE[tag].search(html, m.end())
+                # 未闭合的 script/style 吞掉剩余全部内容
+                i = end.end() if end else n
+            else:
+                if not self_closing and tag not in VOID_TAGS:
+                    stack.append(tag)
+                    if tag in EXCLUDED_TAGS:
+                        excluded += 1
+                    elif tag in PRESERVE_WHITESPACE_TAGS:
+                        preserve += 1
+                i = m.end()
+        elif html.startswith("</", i):
+            if html.startswith("</>", i):
+                # html.parser 直接丢弃 "</>"，不切断文本节点
+                i += 3
+                continue
+            m = _END_TAG_RE.match(html, i)
+            if m:
+                # 没有标签名的 "</ x>" 按注释处理
+                tag = (m.group(1) or "").lower()
+                if tag and tag in stack:
+                    while True:
+                        popped = stack.pop()
+                        if popped in EXCLUDED_TAGS:
+                            excluded -= 1
+                        elif popped in PRESERVE_WHITESPACE_TAGS:
+                            preserve -= 1
+                        if popped == tag:
+                            break
+                i = m.end()
+            else:
+                incomplete = True
+        elif html.startswith("<!--", i):
+            m = _COMMENT_CLOSE_RE.search(html, i + 4)
+            if m:
+                i = m.end()
+            else:
+                incomplete = True
+        elif html.startswith("<![CDATA[", i):
+            m = _CDATA_RE.match(html, i)
+            if m:
+                # CDATA 自成一个文本节点
+                if current:
+                    segments.append(_close_segment(current, preserve))
+                    current = []
+                # CDATA 不受 rt/template 等容器影响
+                if m.group(1):
+                    current.append(m.group(1))
+                i = m.end()
+            else:
+                incomplete = True
+        elif html.startswith("<!", i) or html.startswith("<?", i):
+            m = _DECL_RE.match(html, i)
+            if m:
+                # DOCTYPE / 条件注释 / 处理指令，不计入文本
+                i = m.end()
+            else:
+                incomplete = True
+        elif html[i + 1:i + 2].isalpha() and html[i + 1].isascii():
+            incomplete = True
+        else:
+            boundary = False
+
+        if incomplete:
+            closing = True
+            # 原样保留到下一个 '>' (含)，没有 '>' 时保留到下一个 '<' 之前
+            k = html.find(">", i + 1)
+            if k >= 0:
+                k += 1
+            else:
+                k = html.find("<", i + 1)
+                if k < 0:
+                    k = i + 1
+            if not excluded:
+                current.append(html[i:k])
+            i = k
+            continue
+
+        if not boundary:
+            # 其他的 '<' 按普通字符处理
+            if not excluded:
+                current.append("<")
+            i += 1
+            continue
+
+        if current:
+            segment = _close_segment(current, preserve_text)
+            current = []
+            segments.append(segment)
+            total += len(segment) + 1
+            if check_at is not None and total > check_at:
+                text = " ".join(segments).strip()
+                if len(text) > max_chars:
+                    return text
+                check_at = total + max_chars
+
+    if current:
+        segments.append(_close_segment(current, preserve))
+    return " ".join(segments).strip()
+
+
+def bs4_html_to_text(html, max_chars=None):
+    """
+    原实现：构建完整的 BeautifulSoup 树后取文本
+    """
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser').get_text(separator=' ').strip()
+
+
+def html_to_text(html, max_chars=None, extractor=None):
+    """
+    HTML 转纯文本 (已 strip)，extractor 为 None 时使用 CROW_SUMMARY_EXTRACTOR 指定的实现
+    max_chars 只是提示，调用方仍需自行截断
+    """
+    if (extractor or DEFAULT_EXTRACTOR) == EXTRACTOR_BS4:
+        return bs4_html_to_text(html, max_chars)
+    return fast_html_to_text(html, max_chars)
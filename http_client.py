@@ -0,0 +1,115 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import get_int, get_float
+
+# 共享 HTTP 会话层
+# 所有抓取函数通过同一个 requests.Session 发请求，按 host 复用连接池 (keep-alive)，
+# 避免每次请求都重新进行 TCP + TLS 握手。
+
+# 只有安装了 brotli 解码库时才声明支持 br，否则 urllib3 无法解压
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+# 连接池配置，可通过环境变量调整
+# pool_connections: 缓存多少个 host 的连接池
+# pool_maxsize: 每个 host 最多保持多少条连接 (应不小于并发线程数)
+HTTP_CONFIG = {
+    'pool_connections': get_int("CROW_HTTP_POOL_CONNECTIONS", 32),
+    'pool_maxsize': get_int("CROW_HTTP_POOL_MAXSIZE", 16),
+    'retries': get_int("CROW_HTTP_RETRIES", 2),
+    'backoff_factor': get_float("CROW_HTTP_BACKOFF", 0.3)
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session(config):
+    retry = Retry(
+        total=config['retries'],
+        connect=config['retries'],
+        # 读超时不重试：源站响应慢时重试只会成倍拉长等待时间
+        read=0,
+        status=config['retries'],
+        backoff_factor=config['backoff_factor'],
+        status_forcelist=(429, 500, 502, 503, 504),
+        # 只对幂等请求自动重试；POST (Serper 等付费 API) 不重试，避免重复计费
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        # 不按 Retry-After 长时间等待，否则会拖垮整页的加载预算
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['pool_connections'],
+        pool_maxsize=config['pool_maxsize'],
+        max_retries=retry,
+        # 连接池满时阻塞等待，而不是创建无法复用的临时连接
+        pool_block=True
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive'
+    })
+    return session
+
+
+def get_session():
+    """
+    获取全局共享的 Session (线程安全的懒加载)
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(HTTP_CONFIG)
+    return _session
+
+
+def configure_http(**overrides):
+    """
+    调整连接池/重试配置并重建会话，例如 configure_http(pool_maxsize=32, retries=3)
+    """
+    global _session
+    unknown = set(overrides) - set(HTTP_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown HTTP config keys: {sorted(unknown)}")
+
+    with _session_lock:
+        HTTP_CONFIG.update(overrides)
+        old_session = _session
+        _session = _build_session(HTTP_CONFIG)
+    if old_session is not None:
+        old_session.close()
+
+
+def http_request(method, url, **kwargs):
+    """
+    通过共享会话发送请求，参数与 requests.request 相同
+    """
+    return get_session().request(method, url, **kwargs)
+
+
+def http_get(url, **kwargs):
+    return http_request("GET", url, **kwargs)
+
+
+def http_post(url, **kwargs):
+    return http_request("POST", url, **kwargs)
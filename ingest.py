@@ -0,0 +1,120 @@
+"""
+独立的数据抓取进程，与 Streamlit 页面解耦
+
+按固定间隔运行所有数据源的抓取并写入数据库，页面只需要读取库中的快照。
+即使当天没有人访问页面，历史数据也会被完整记录。
+
+用法:
+    python ingest.py                      # 每 15 分钟抓取一次
+    python ingest.py --once               # 只抓取一次 (适合 cron / GitHub Actions)
+    python ingest.py --interval 1800
+    python ingest.py --sources ai_news,github_trending
+"""
+import argparse
+import time
+from datetime import datetime
+
+from db_utils import flush_writes, get_write_stats, start_write_queue
+from fanout import run_fanout, STATUS_OK
+from utils import get_ai_news, get_reddit_hot, get_github_trending, get_xhs_trends
+
+# 会写入数据库的数据源 (联网搜索和抖音热榜没有对应的表，仍由页面实时获取)
+INGEST_SOURCES = {
+    'ai_news': get_ai_news,
+    'reddit_hot': get_reddit_hot,
+    'github_trending': get_github_trending,
+    'xhs_trends': get_xhs_trends
+}
+
+# 后台任务不影响页面响应，给每个数据源更宽松的时间
+INGEST_TIMEOUT = 300
+
+DEFAULT_INTERVAL = 15 * 60
+
+# 退出前等待写入队列写完的时间 (秒)，没写完的行留在本地 spool 中，下次启动时继续写入
+FLUSH_TIMEOUT = 120
+
+
+def run_once(source_names=None):
+    """
+    抓取一轮 (各数据源的新鲜度策略仍然生效，未过期的数据源不会重复抓取)
+    Returns: {name: status}
+    """
+    source_names = source_names or list(INGEST_SOURCES)
+    sources = {name: (lambda deadline, func=INGEST_SOURCES[name]: func(deadline=deadline)) for name in source_names}
+
+    started = datetime.now()
+    print(f"[{started:%Y-%m-%d %H:%M:%S}] Ingest run started: {', '.join(sources)}")
+    results, statuses = run_fanout(
+        sources,
+        default_timeout=INGEST_TIMEOUT,
+        total_budget=INGEST_TIMEOUT
+    )
+
+    for name in sources:
+        info = statuses.get(name, {})
+        df = results.get(name)
+        rows = len(df) if df is not None else 0
+        if info.get('status') == STATUS_OK:
+            print(f"  {name}: ok, {rows} rows in {info['elapsed']}s")
+        else:
+            print(f"  {name}: {info.get('status')} ({info.get('error')})")
+
+    print(f"Ingest run finished in {(datetime.now() - started).total_seconds():.1f}s")
+    _print_write_stats()
+    return statuses
+
+
+def _print_write_stats():
+    stats = get_write_stats()
+    if stats:
+        latency = stats['last_flush_latency']
+        print(f"Write queue: {stats['queue_depth']} rows pending, {stats['flushed_rows']} flushed, "
+              f"{stats['failures']} failed flushes, last flush {latency if latency is not None else '-'}s")
+
+
+def flush_on_exit():
+    if not flush_writes(FLUSH_TIMEOUT):
+        print("Write queue not drained before exit; remaining rows stay in the local spool.")
+        _print_write_stats()
+        return False
+    _print_write_stats()
+    return True
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Daily AI Crow ingestion worker")
+    arg_parser.add_argument("--once", action="store_true", help="只运行一轮后退出")
+    arg_parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help="两轮抓取之间的间隔 (秒)")
+    arg_parser.add_argument("--sources", default="", help=f"逗号分隔的数据源，可选: {','.join(INGEST_SOURCES)}")
+    args = arg_parser.parse_args()
+
+    source_names = [name.strip() for name in args.sources.split(",") if name.strip()]
+    unknown = [name for name in source_names if name not in INGEST_SOURCES]
+    if unknown:
+        arg_parser.error(f"Unknown sources: {', '.join(unknown)}")
+
+    start_write_queue()
+
+    if args.once:
+        statuses = run_once(source_names)
+        flushed = flush_on_exit()
+        failed = [name for name, info in statuses.items() if info['status'] != STATUS_OK]
+        raise SystemExit(1 if failed or not flushed else 0)
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                run_once(source_names)
+            except Exception as e:
+                print(f"Ingest run failed: {e}")
+            # 以开始时间对齐，避免抓取耗时累积造成漂移
+            time.sleep(max(0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        flush_on_exit()
+        print("Ingest worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import re
+
+# 关键词匹配引擎
+# 把一组关键词编译成一个正则 (单个交替分支)，一次扫描就能判断标题是否命中任意关键词，
+# 代替对每个关键词分别 re.search / `in` 的循环。编译只在模块加载时进行一次。
+
+# 单词边界规则
+BOUNDARY_NONE = "none"      # 子串匹配，等价于 `keyword in text`
+BOUNDARY_PREFIX = "prefix"  # 只要求前边界，'transformer' 可以匹配 'transformers'
+BOUNDARY_BOTH = "both"      # 前后都要求边界，'ai' 不会匹配 'Maine' 或 'email'
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, boundary=BOUNDARY_NONE, boundaries=None, ignore_case=False):
+        """
+        keywords: 关键词列表
+        boundary: 默认的边界规则
+        boundaries: {keyword: 边界规则}，单独覆盖某些关键词
+        ignore_case: 是否忽略大小写
+        """
+        self.keywords = list(dict.fromkeys(keywords))
+        boundaries = boundaries or {}
+        modes = {k: boundaries.get(k, boundary) for k in self.keywords}
+
+        # 纯子串匹配时先把文本转小写再做区分大小写的匹配，
+        # 比 re.IGNORECASE 快，且与原来的 `k.lower() in text.lower()` 语义完全一致
+        self._lower_text = ignore_case and all(m == BOUNDARY_NONE for m in modes.values())
+
+        alternatives = []
+        # 长关键词放在前面，保证 find() 返回最具体的关键词
+        for keyword in sorted(self.keywords, key=len, reverse=True):
+            mode = modes[keyword]
+            pattern = re.escape(keyword.lower() if self._lower_text else keyword)
+            if mode in (BOUNDARY_PREFIX, BOUNDARY_BOTH):
+                pattern = r'\b' + pattern
+            if mode == BOUNDARY_BOTH:
+                pattern = pattern + r'\b'
+            alternatives.append(pattern)
+
+        flags = re.IGNORECASE if ignore_case and not self._lower_text else 0
+        # 空关键词列表编译成永远不匹配的正则
+        self.regex = re.compile("|".join(alternatives) if alternatives else r'(?!)', flags)
+
+    def _search(self, text):
+        if self._lower_text:
+            text = text.lower()
+        return self.regex.search(text)
+
+    def search(self, text):
+        """
+        文本中是否包含任意关键词
+        """
+        if not text:
+            return False
+        return self._search(text) is not None
+
+    def find(self, text):
+        """
+        返回文本中第一个命中的关键词，没有命中时返回 None
+        """
+        if not text:
+            return None
+        match = self._search(text)
+        return match.group(0) if match else None
+
+    def filter(self, texts):
+        """
+        返回命中关键词的文本列表
+        """
+        return [text for text in texts if self.search(text)]
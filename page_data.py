@@ -0,0 +1,58 @@
+import pandas as pd
+
+from db_utils import prefetch_snapshot
+from fanout import run_fanout
+from utils import get_reddit_hot, get_ai_news, get_github_trending, get_xhs_trends, get_web_ai_news, get_douyin_hot, get_douyin_creators
+
+# 页面数据加载：所有数据源并发抓取，总耗时取决于最慢的源 (且不超过 PAGE_BUDGET)，而不是所有源之和
+
+# 各数据源的截止时间 (秒)，超时的源会以空数据返回，不阻塞整个页面
+SOURCE_TIMEOUTS = {
+    'ai_news': 20,
+    'reddit_hot': 20,
+    'github_trending': 15,
+    'xhs_trends': 30,
+    'web_ai_news': 20,
+    'douyin_hot': 10,
+    'douyin_creators': 5
+}
+# 整页加载的总预算 (秒)
+PAGE_BUDGET = 35
+
+SOURCE_LABELS = {
+    'ai_news': "每日 AI 动态",
+    'reddit_hot': "Reddit 独立开发热门",
+    'github_trending': "GitHub 热榜",
+    'xhs_trends': "小红书热点",
+    'web_ai_news': "联网 AI 新闻",
+    'douyin_hot': "抖音热榜",
+    'douyin_creators': "ODD博主"
+}
+
+
+def load_page_data(target_date, allow_scrape=True):
+    """
+    加载页面所需的全部数据
+    Returns: (ai_news, reddit_hot, github_trending, xhs_trends, web_ai_news, douyin_hot, douyin_creators, statuses)
+    """
+    # 历史日期先用一次请求取回当天所有表的快照 (写入本地缓存)，各数据源随后直接命中缓存
+    if target_date is not None:
+        prefetch_snapshot(target_date.strftime('%Y-%m-%d'))
+
+    sources = {
+        'ai_news': lambda deadline: get_ai_news(target_date, allow_scrape=allow_scrape, deadline=deadline),
+        'reddit_hot': lambda deadline: get_reddit_hot(target_date, allow_scrape=allow_scrape, deadline=deadline),
+        'github_trending': lambda deadline: get_github_trending(target_date, allow_scrape=allow_scrape, deadline=deadline),
+        'xhs_trends': lambda deadline: get_xhs_trends(target_date, allow_scrape=allow_scrape, deadline=deadline),
+        # Web AI News (实时搜索，不一定非要缓存很久，但为了性能还是缓存一下)
+        'web_ai_news': lambda deadline: get_web_ai_news(target_date, deadline=deadline),
+        'douyin_hot': lambda deadline: get_douyin_hot(target_date),
+        'douyin_creators': lambda deadline: get_douyin_creators(target_date)
+    }
+    results, statuses = run_fanout(sources, timeouts=SOURCE_TIMEOUTS, total_budget=PAGE_BUDGET)
+
+    frames = []
+    for name in sources:
+        df = results.get(name)
+        frames.append(df if isinstance(df, pd.DataFrame) else pd.DataFrame())
+    return (*frames, statuses)
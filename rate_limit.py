@@ -0,0 +1,77 @@
+import threading
+import time
+
+from config import get_float
+
+# 令牌桶限流
+# 每个搜索服务 (Serper / DuckDuckGo) 一个全局令牌桶，所有线程、所有会话共享，
+# 并发查询时也不会超过服务商的配额。
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        """
+        rate: 每秒补充的令牌数
+        capacity: 桶容量，即允许的最大突发请求数
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """
+        获取一个令牌，令牌不足时阻塞等待
+        Returns: 成功返回 True；超过 timeout 仍未拿到令牌返回 False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# 各服务的配额，可通过环境变量调整
+# Serper 免费额度本身没有严格的 QPS 限制，但仍然控制突发，避免额度被瞬间耗尽
+# DuckDuckGo 对频繁请求非常敏感 (会返回 202 Ratelimit)，需要更保守
+RATE_LIMITS = {
+    'serper': {
+        'rate': get_float("CROW_SERPER_RATE", 5),
+        'capacity': get_float("CROW_SERPER_BURST", 5)
+    },
+    'ddg': {
+        'rate': get_float("CROW_DDG_RATE", 0.5),
+        'capacity': get_float("CROW_DDG_BURST", 2)
+    }
+}
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """
+    获取某个服务的全局令牌桶
+    """
+    with _buckets_lock:
+        if provider not in _buckets:
+            config = RATE_LIMITS[provider]
+            _buckets[provider] = TokenBucket(config['rate'], config['capacity'])
+        return _buckets[provider]
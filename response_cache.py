@@ -0,0 +1,166 @@
+import collections
+import hashlib
+import json
+import threading
+import time
+
+from config import get_int
+
+# 大模型流式回答的缓存
+# 以 (提示词哈希, 模型, temperature) 为键，保存完整输出的分块序列，命中时按原来的分块重新流式输出。
+# Streamlit 的所有会话在同一个进程里，同一天同一份数据的总结只需要生成一次。
+# 相同请求同时到达时只发起一次上游调用 (single-flight)：上游流由后台线程读取到共享缓冲区，
+# 所有请求方各自从缓冲区跟读，某个请求方中途离开不会影响其他人，也不会中断缓存写入。
+
+
+# ttl: 缓存有效期 (秒)，0 表示关闭缓存 (仍然合并同时到达的相同请求)
+# max_entries: 最多保存的回答数，超出时淘汰最久未使用的
+RESPONSE_CACHE_CONFIG = {
+    'ttl': get_int("CROW_AI_CACHE_TTL", 1800),
+    'max_entries': get_int("CROW_AI_CACHE_MAX_ENTRIES", 256)
+}
+
+# 请求方的来源：命中缓存 / 跟读其他请求发起的上游流 / 自己发起上游调用
+SOURCE_CACHE = "cache"
+SOURCE_SHARED = "shared"
+SOURCE_UPSTREAM = "upstream"
+
+
+def response_key(messages, model, temperature):
+    prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return (prompt_hash, model, float(temperature))
+
+
+class _Flight:
+    """
+    一次进行中的上游调用：后台线程写入分块，请求方按下标跟读
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.outcome = {}
+        self.condition = threading.Condition()
+
+    def append(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def follow(self):
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.chunks) and not self.done:
+                    self.condition.wait()
+                if index >= len(self.chunks):
+                    return
+                pending = self.chunks[index:]
+            index += len(pending)
+            yield from pending
+
+
+class ResponseCache:
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = RESPONSE_CACHE_CONFIG['ttl'] if ttl is None else ttl
+        self.max_entries = max_entries or RESPONSE_CACHE_CONFIG['max_entries']
+        self._lock = threading.Lock()
+        # key -> (过期时间, 分块元组)，按访问顺序排列
+        self._entries = collections.OrderedDict()
+        self._inflight = {}
+        self.reset_stats()
+
+    def _get(self, key):
+        # 调用方持有 self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, chunks = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return chunks
+
+    def _store(self, key, chunks):
+        if self.ttl <= 0 or not chunks:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, tuple(chunks))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stream(self, key, producer, info=None):
+        """
+        返回 key 对应回答的分块生成器
+        producer(outcome): 发起上游调用的生成器函数，结束时在 outcome['status'] 写入 "ok" 才会缓存
+        info: 可选的字典，写入 'source' (SOURCE_*) 以及上游调用的 outcome
+        """
+        info = info if info is not None else {}
+        with self._lock:
+            chunks = self._get(key)
+            if chunks is not None:
+                self.stats['hits'] += 1
+                info['source'] = SOURCE_CACHE
+                return iter(chunks)
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.stats['shared'] += 1
+                info['source'] = SOURCE_SHARED
+            else:
+                self.stats['misses'] += 1
+                info['source'] = SOURCE_UPSTREAM
+                flight = _Flight()
+                self._inflight[key] = flight
+                threading.Thread(target=self._pump, args=(key, flight, producer), daemon=True).start()
+
+        info['outcome'] = flight.outcome
+        return flight.follow()
+
+    def _pump(self, key, flight, producer):
+        try:
+            for chunk in producer(flight.outcome):
+                flight.append(chunk)
+        except Exception as e:
+            flight.outcome['status'] = "error"
+            flight.append(f"Request Error: {str(e)}")
+        finally:
+            if flight.outcome.get('status') == "ok":
+                self._store(key, flight.chunks)
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.finish()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            return stats
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
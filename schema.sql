@@ -1,3 +1,5 @@
+-- 本地 SQLite 后端 (sqlite_backend.py) 中有对应的表结构，修改表或索引时需要同步
+
 -- 创建 AI 新闻表
 create table public.ai_news (
   id bigint generated by default as identity primary key,
@@ -8,7 +10,8 @@ create table public.ai_news (
   published timestamp with time zone,
   published_str text,
   fetched_date date, -- 用于日历查询的关键字段
-  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  constraint ai_news_fetched_date_link_key unique (fetched_date, link) -- 自然键，用于 upsert 去重
 );
 
 -- 创建 Reddit 热门表
@@ -22,7 +25,8 @@ create table public.reddit_demands (
   permalink text,
   created_utc text,
   fetched_date date, -- 用于日历查询的关键字段
-  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  constraint reddit_demands_fetched_date_permalink_key unique (fetched_date, permalink)
 );
 
 -- 创建索引以加速按日期查询
@@ -43,7 +47,13 @@ create policy "Enable read access for all users" on public.reddit_demands for se
 create policy "Enable insert for all users" on public.ai_news for insert with check (true);
 create policy "Enable insert for all users" on public.reddit_demands for insert with check (true);
 
+-- upsert 在自然键冲突时会执行 update，需要开放 update 策略
+create policy "Enable update for all users" on public.ai_news for update using (true);
+create policy "Enable update for all users" on public.reddit_demands for update using (true);
+
 -- 创建 GitHub 热榜表
+-- since: 榜单时间范围 (daily/weekly/monthly)，stars_today 为该范围内新增的 star 数
+-- lang: 榜单语言 (GitHub URL 写法)，all 表示不限语言
 create table public.github_trending (
   id bigint generated by default as identity primary key,
   repo_name text,
@@ -52,14 +62,18 @@ create table public.github_trending (
   stars_today int,
   total_stars int,
   url text,
+  since text not null default 'daily',
+  lang text not null default 'all',
   fetched_date date,
-  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  constraint github_trending_fetched_date_since_lang_repo_name_key unique (fetched_date, since, lang, repo_name)
 );
 
 create index github_trending_fetched_date_idx on public.github_trending (fetched_date);
 alter table public.github_trending enable row level security;
 create policy "Enable read access for all users" on public.github_trending for select using (true);
 create policy "Enable insert for all users" on public.github_trending for insert with check (true);
+create policy "Enable update for all users" on public.github_trending for update using (true);
 
 -- 创建小红书热点表
 create table public.xiaohongshu_trends (
@@ -69,10 +83,109 @@ create table public.xiaohongshu_trends (
   snippet text,
   keyword text,
   fetched_date date,
-  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  constraint xiaohongshu_trends_fetched_date_link_key unique (fetched_date, link)
 );
 
 create index xiaohongshu_trends_fetched_date_idx on public.xiaohongshu_trends (fetched_date);
 alter table public.xiaohongshu_trends enable row level security;
 create policy "Enable read access for all users" on public.xiaohongshu_trends for select using (true);
-create policy "Enable insert for all users" on public.xiaohongshu_trends for insert with check (true);
\ No newline at end of file
+create policy "Enable insert for all users" on public.xiaohongshu_trends for insert with check (true);
+create policy "Enable update for all users" on public.xiaohongshu_trends for update using (true);
+
+-- 抓取记录表：每个数据源每天最近一次抓取的完成时间
+-- 页面加载时据此判断今天的快照是否过期，未过期直接读库，不重新抓取
+create table public.fetch_runs (
+  id bigint generated by default as identity primary key,
+  source text not null,
+  fetched_date date not null,
+  item_count int,
+  finished_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  constraint fetch_runs_source_fetched_date_key unique (source, fetched_date)
+);
+
+alter table public.fetch_runs enable row level security;
+create policy "Enable read access for all users" on public.fetch_runs for select using (true);
+create policy "Enable insert for all users" on public.fetch_runs for insert with check (true);
+create policy "Enable update for all users" on public.fetch_runs for update using (true);
+
+-- 一次请求读取 [start_date, end_date] 内多张表的数据 (db_utils.get_snapshot_range)
+-- 每张表返回一个 JSON 数组，列和排序与 db_utils.DAY_READS 一致；未请求的表返回空数组
+create or replace function public.get_snapshot_range(
+  start_date date,
+  end_date date,
+  tables text[] default array['ai_news', 'reddit_demands', 'github_trending', 'xiaohongshu_trends']
+)
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'ai_news', (
+      select coalesce(json_agg(t order by t.published desc nulls last, t.id desc), '[]'::json)
+      from (
+        select id, source, title, link, summary, published, published_str, fetched_date
+        from public.ai_news
+        where 'ai_news' = any(tables) and fetched_date between start_date and end_date
+      ) t
+    ),
+    'reddit_demands', (
+      select coalesce(json_agg(t order by t.score desc nulls last, t.id desc), '[]'::json)
+      from (
+        select id, source, title, score, comments, url, permalink, created_utc, fetched_date
+        from public.reddit_demands
+        where 'reddit_demands' = any(tables) and fetched_date between start_date and end_date
+      ) t
+    ),
+    'github_trending', (
+      select coalesce(json_agg(t order by t.stars_today desc nulls last, t.id desc), '[]'::json)
+      from (
+        select id, repo_name, description, language, stars_today, total_stars, url, since, lang, fetched_date
+        from public.github_trending
+        where 'github_trending' = any(tables) and fetched_date between start_date and end_date
+      ) t
+    ),
+    'xiaohongshu_trends', (
+      select coalesce(json_agg(t order by t.id desc), '[]'::json)
+      from (
+        select id, title, link, snippet, keyword, fetched_date
+        from public.xiaohongshu_trends
+        where 'xiaohongshu_trends' = any(tables) and fetched_date between start_date and end_date
+      ) t
+    )
+  );
+$$;
+
+grant execute on function public.get_snapshot_range(date, date, text[]) to anon, authenticated;
+
+-- ============================================================
+-- 迁移：已有数据库添加自然键唯一约束 (新建库无需执行)
+-- 先删除同一天内的重复行 (保留 id 最大、即最新的一条)，再添加约束
+-- ============================================================
+-- delete from public.ai_news a using public.ai_news b
+--   where a.fetched_date = b.fetched_date and a.link = b.link and a.id < b.id;
+-- delete from public.reddit_demands a using public.reddit_demands b
+--   where a.fetched_date = b.fetched_date and a.permalink = b.permalink and a.id < b.id;
+-- delete from public.github_trending a using public.github_trending b
+--   where a.fetched_date = b.fetched_date and a.repo_name = b.repo_name and a.id < b.id;
+-- delete from public.xiaohongshu_trends a using public.xiaohongshu_trends b
+--   where a.fetched_date = b.fetched_date and a.link = b.link and a.id < b.id;
+--
+-- alter table public.ai_news add constraint ai_news_fetched_date_link_key unique (fetched_date, link);
+-- alter table public.reddit_demands add constraint reddit_demands_fetched_date_permalink_key unique (fetched_date, permalink);
+-- alter table public.github_trending add constraint github_trending_fetched_date_repo_name_key unique (fetched_date, repo_name);
+-- alter table public.xiaohongshu_trends add constraint xiaohongshu_trends_fetched_date_link_key unique (fetched_date, link);
+--
+-- create policy "Enable update for all users" on public.ai_news for update using (true);
+-- create policy "Enable update for all users" on public.reddit_demands for update using (true);
+-- create policy "Enable update for all users" on public.github_trending for update using (true);
+-- create policy "Enable update for all users" on public.xiaohongshu_trends for update using (true);
+
+-- ============================================================
+-- 迁移：GitHub 热榜支持多个时间范围和语言 (新建库无需执行)
+-- 已有数据都是当日、不限语言的榜单，由列默认值补齐
+-- ============================================================
+-- alter table public.github_trending add column since text not null default 'daily';
+-- alter table public.github_trending add column lang text not null default 'all';
+-- alter table public.github_trending drop constraint github_trending_fetched_date_repo_name_key;
+-- alter table public.github_trending add constraint github_trending_fetched_date_since_lang_repo_name_key unique (fetched_date, since, lang, repo_name);
@@ -0,0 +1,230 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from config import get_secret
+from storage import TABLE_COLUMNS, convert_row
+
+# 本地嵌入式存储后端 (SQLite，WAL 模式)
+# 没有配置 Supabase 时 (或 CROW_DB_BACKEND=sqlite) 使用：抓取结果和 fetch_runs 保存在本地文件中，
+# 离线运行也能积累历史、按新鲜度策略跳过重复抓取，读取不经过网络。
+# 表结构与 schema.sql 一致 (自然键唯一约束、fetched_date 索引)，修改 schema.sql 时需要同步这里。
+# 每个线程使用自己的连接，WAL 模式下并发读取互不阻塞。后端接口见 storage.py。
+
+# path: 数据库文件位置 (数据而不是缓存，不放在 .cache 中)
+SQLITE_CONFIG = {
+    'path': get_secret("CROW_SQLITE_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "crow.sqlite3"
+    )
+}
+
+# 与 schema.sql 对应：identity 主键 -> AUTOINCREMENT (id 不复用，保证与 Postgres 一样单调递增)，
+# timestamptz 以 UTC ISO 字符串保存 (字符串顺序即时间顺序)，date 以 YYYY-MM-DD 保存
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_news (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  source TEXT,
+  title TEXT,
+  link TEXT,
+  summary TEXT,
+  published TEXT,
+  published_str TEXT,
+  fetched_date TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CONSTRAINT ai_news_fetched_date_link_key UNIQUE (fetched_date, link)
+);
+
+CREATE TABLE IF NOT EXISTS reddit_demands (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  source TEXT,
+  title TEXT,
+  score INTEGER,
+  comments INTEGER,
+  url TEXT,
+  permalink TEXT,
+  created_utc TEXT,
+  fetched_date TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CONSTRAINT reddit_demands_fetched_date_permalink_key UNIQUE (fetched_date, permalink)
+);
+
+CREATE INDEX IF NOT EXISTS ai_news_fetched_date_idx ON ai_news (fetched_date);
+CREATE INDEX IF NOT EXISTS reddit_demands_fetched_date_idx ON reddit_demands (fetched_date);
+
+CREATE TABLE IF NOT EXISTS github_trending (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  repo_name TEXT,
+  description TEXT,
+  language TEXT,
+  stars_today INTEGER,
+  total_stars INTEGER,
+  url TEXT,
+  since TEXT NOT NULL DEFAULT 'daily',
+  lang TEXT NOT NULL DEFAULT 'all',
+  fetched_date TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CONSTRAINT github_trending_fetched_date_since_lang_repo_name_key UNIQUE (fetched_date, since, lang, repo_name)
+);
+
+CREATE INDEX IF NOT EXISTS github_trending_fetched_date_idx ON github_trending (fetched_date);
+
+CREATE TABLE IF NOT EXISTS xiaohongshu_trends (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT,
+  link TEXT,
+  snippet TEXT,
+  keyword TEXT,
+  fetched_date TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CONSTRAINT xiaohongshu_trends_fetched_date_link_key UNIQUE (fetched_date, link)
+);
+
+CREATE INDEX IF NOT EXISTS xiaohongshu_trends_fetched_date_idx ON xiaohongshu_trends (fetched_date);
+
+CREATE TABLE IF NOT EXISTS fetch_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  source TEXT NOT NULL,
+  fetched_date TEXT NOT NULL,
+  item_count INTEGER,
+  finished_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CONSTRAINT fetch_runs_source_fetched_date_key UNIQUE (source, fetched_date)
+);
+"""
+
+
+def _sqlite_value(value):
+    # 时间统一转为 UTC，与 PostgREST 返回的格式一致，同时保证按字符串排序即按时间排序
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    embedded = True
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_CONFIG['path']
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: 自行控制事务 (写入使用 BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        # 立即取得写锁，upsert 前后的计数不会混入其他进程的写入
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def upsert(self, table, rows, key_cols):
+        """
+        按自然键批量 upsert (调用方已按自然键去重)
+        Returns: {'inserted': 新增行数, 'updated': 更新行数}
+        """
+        stats = {'inserted': 0, 'updated': 0}
+        if not rows:
+            return stats
+
+        columns = TABLE_COLUMNS[table]
+        names = [name for name, _ in columns]
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names if name not in key_cols)
+        statement = (
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT ({', '.join(key_cols)}) DO UPDATE SET {updates}"
+        )
+        values = [[_sqlite_value(value) for value in convert_row(row, columns)] for row in rows]
+        date_index = names.index('fetched_date')
+        dates = sorted({value[date_index] for value in values if value[date_index] is not None})
+        count_sql = f"SELECT COUNT(*) FROM {table} WHERE fetched_date IN ({', '.join('?' * len(dates))})"
+
+        with self._transaction() as conn:
+            before = conn.execute(count_sql, dates).fetchone()[0]
+            conn.executemany(statement, values)
+            after = conn.execute(count_sql, dates).fetchone()[0]
+        stats['inserted'] = max(after - before, 0)
+        stats['updated'] = len(rows) - stats['inserted']
+        return stats
+
+    def iter_pages(self, table, start_str, end_str, columns, order_col, limit=None, page_size=1000):
+        """
+        按 (order_col desc nulls last, id desc) 逐页读取 fetched_date 在 [start_str, end_str] 内的行
+        """
+        # (col IS NULL) 在前：等价于 Postgres 的 nulls last，且不依赖 SQLite 3.30+ 的 NULLS LAST 语法
+        order = "id DESC" if order_col == 'id' else f"({order_col} IS NULL), {order_col} DESC, id DESC"
+        query = f"SELECT {', '.join(columns)} FROM {table} WHERE fetched_date BETWEEN ? AND ? ORDER BY {order}"
+        params = [start_str, end_str]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        cursor = self._connect().execute(query, params)
+        names = [d[0] for d in cursor.description]
+        try:
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    return
+                # 普通元组再组装成 dict 比 sqlite3.Row 快
+                yield [dict(zip(names, row)) for row in rows]
+                if len(rows) < page_size:
+                    return
+        finally:
+            cursor.close()
+
+    def delete_day(self, table, date_str):
+        with self._transaction() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE fetched_date = ?", [date_str])
+
+    def get_fetch_run(self, source, date_str):
+        cursor = self._connect().execute(
+            "SELECT * FROM fetch_runs WHERE source = ? AND fetched_date = ? LIMIT 1", [source, date_str]
+        )
+        row = cursor.fetchone()
+        return dict(zip([d[0] for d in cursor.description], row)) if row else None
+
+
+_sqlite_backend = None
+_sqlite_backend_lock = threading.Lock()
+
+
+def get_sqlite_backend():
+    """
+    获取全局共享的 SQLiteBackend；无法打开数据库文件时抛出异常
+    """
+    global _sqlite_backend
+    if _sqlite_backend is None:
+        with _sqlite_backend_lock:
+            if _sqlite_backend is None:
+                _sqlite_backend = SQLiteBackend()
+    return _sqlite_backend
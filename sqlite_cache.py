@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+
+# 本地 SQLite 缓存的公共部分 (译文缓存 translation_cache、历史快照缓存 history_cache)
+# 一个连接由锁串行化，WAL 模式下抓取进程和 Streamlit 进程可以同时读写。
+# 每条记录带 size 和 accessed_at 列，条目数或总字节数超过上限时按最近访问时间 (LRU)
+# 一次淘汰到上限的 90%，避免每次写入都触发淘汰。
+
+EVICT_RATIO = 0.9
+
+
+class SQLiteLRUCache:
+    """
+    子类提供 TABLE (表名) 和 SCHEMA (建表、建索引语句)，表中须有 size 和 accessed_at 列
+    max_entries / max_bytes 为 0 表示不限制
+    """
+    TABLE = None
+    SCHEMA = ()
+
+    def __init__(self, path, max_entries=0, max_bytes=0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 调用方在线程池中并发读写，共用一个连接
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._init_db()
+        self._entries, self._bytes = self._totals()
+        self.reset_stats()
+
+    def _init_db(self):
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+
+    def _totals(self):
+        row = self._conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()
+        return row[0], row[1]
+
+    def _over_limit(self):
+        return (self.max_entries and self._entries > self.max_entries) or \
+            (self.max_bytes and self._bytes > self.max_bytes)
+
+    def _added(self, count, size):
+        # 调用方持有 self._lock；覆盖写入或其他进程写入会让估算偏大，真正淘汰前会重新统计
+        self._entries += count
+        self._bytes += size
+        if self._over_limit():
+            self._evict()
+
+    def _evict(self):
+        # 调用方持有 self._lock
+        self._entries, self._bytes = self._totals()
+        if not self._over_limit():
+            return
+
+        remove_entries = max(0, self._entries - int(self.max_entries * EVICT_RATIO)) if self.max_entries else 0
+        remove_bytes = max(0, self._bytes - int(self.max_bytes * EVICT_RATIO)) if self.max_bytes else 0
+        # 按访问时间从旧到新累计需要删除的条数 (同一批写入的访问时间相同，不能按时间截断，否则会整批删除)
+        order = "ORDER BY accessed_at, rowid"
+        removed = 0
+        removed_bytes = 0
+        for (size,) in self._conn.execute(f"SELECT size FROM {self.TABLE} {order}"):
+            removed += 1
+            removed_bytes += size
+            if removed >= remove_entries and removed_bytes >= remove_bytes:
+                break
+
+        if removed:
+            before = self._entries
+            with self._conn:
+                self._conn.execute(
+                    f"DELETE FROM {self.TABLE} WHERE rowid IN (SELECT rowid FROM {self.TABLE} {order} LIMIT ?)", (removed,)
+                )
+            self._entries, self._bytes = self._totals()
+            self.stats['evicted'] += before - self._entries
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {self.TABLE}")
+            self._entries, self._bytes = 0, 0
+
+    def reset_stats(self):
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = self._entries
+            stats['bytes'] = self._bytes
+            return stats
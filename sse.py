@@ -0,0 +1,297 @@
+import codecs
+import json
+import queue
+import threading
+import time
+
+from config import get_int
+
+# Server-Sent Events 增量解码
+# 直接处理网络上到达的原始字节块：跨块的 UTF-8 字符和跨块的行都会正确拼接，
+# 支持 \r\n / \r / \n 三种换行、多行 data、注释行和 event/id 字段 (https://html.spec.whatwg.org/#event-stream-interpretation)。
+# 在此之上解析 OpenAI 兼容的 chat.completion.chunk，并把细碎的增量合并后再交给界面。
+
+
+# 增量合并的刷新间隔 (毫秒)：同一个网络块里的增量总是合并输出，
+# 此外距上次输出不足该间隔时继续累积，间隔到期时即使上游暂停也会输出已累积的部分；0 表示每个网络块输出一次
+DEFAULT_FLUSH_MS = get_int("CROW_AI_STREAM_FLUSH_MS", 50)
+
+DONE = "[DONE]"
+
+
+class SSEDecoder:
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._first = True
+        # 上一块以 \r 结尾：如果下一块以 \n 开头，两者是同一个 \r\n
+        self._skip_lf = False
+        self._reset_event()
+
+    def _reset_event(self):
+        self._event = None
+        self._data = []
+        self._id = None
+
+    def feed(self, chunk):
+        """
+        送入一个字节块，返回其中已完整的事件 [{'event', 'data', 'id'}]
+        """
+        text = self._decoder.decode(chunk)
+        if not text:
+            return []
+        if self._first:
+            # 流开头的 BOM 需要忽略
+            text = text.lstrip("\ufeff")
+            self._first = False
+        if self._skip_lf:
+            self._skip_lf = False
+            if text.startswith("\n"):
+                text = text[1:]
+        if "\r" in text:
+            self._skip_lf = text.endswith("\r")
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return self._consume(text)
+
+    def flush(self):
+        """
+        流结束时调用，返回最后一个没有空行结尾的事件 (如果有)
+        """
+        text = self._decoder.decode(b"", final=True)
+        events = self._consume(text + "\n\n")
+        self._buffer = ""
+        return events
+
+    def _consume(self, text):
+        # 按行切分交给 C 实现；最后一段可能是半行，留到下一块
+        lines = (self._buffer + text).split("\n")
+        self._buffer = lines.pop()
+        events = []
+        data = self._data
+        for line in lines:
+            if line.startswith("data:"):
+                # 最常见的情况单独处理，避免逐行的通用字段解析
+                data.append(line[6:] if line.startswith("data: ") else line[5:])
+            elif not line:
+                # 空行：分发当前事件
+                if data:
+                    events.append({'event': self._event or "message", 'data': "\n".join(data), 'id': self._id})
+                    self._reset_event()
+                    data = self._data
+                else:
+                    self._event = None
+                    self._id = None
+            else:
+                self._field(line)
+        return events
+
+    def _field(self, line):
+        if line.startswith(":"):
+            return
+        field, sep, value = line.partition(":")
+        if sep and value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            self._id = value
+        # retry 等其他字段在这里没有意义，忽略
+
+
+def iter_events(byte_chunks):
+    """
+    把字节块序列解码为事件序列，每个网络块产出一个列表 (可能为空)
+    """
+    decoder = SSEDecoder()
+    for chunk in byte_chunks:
+        if chunk:
+            yield decoder.feed(chunk)
+    yield decoder.flush()
+
+
+_END = object()
+
+
+class _ReadAhead:
+    """
+    在后台线程中迭代 (读取网络块)，主线程可以带超时等待下一项
+    调用方关闭响应之前必须先调用 close()，等待读取线程退出
+    """
+
+    def __init__(self, iterable):
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name="sse-read-ahead", daemon=True)
+        self._thread.start()
+
+    def _run(self, iterable):
+        try:
+            for item in iterable:
+                if self._stop.is_set():
+                    break
+                self._queue.put((item, None))
+        except BaseException as e:
+            self._queue.put((_END, e))
+            return
+        finally:
+            # 在读取线程中结束底层的字节迭代器
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+        self._queue.put((_END, None))
+
+    def close(self):
+        """
+        通知读取线程停止并等待它退出 (当前这次网络读取返回后即退出)
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def get(self, timeout=None):
+        """
+        返回下一项；超时返回 None，迭代结束时抛出 StopIteration，读取出错时在这里重新抛出
+        """
+        try:
+            item, error = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if error is not None:
+            raise error
+        if item is _END:
+            raise StopIteration
+        return item
+
+
+class _Direct:
+    # 不需要超时 (flush_ms=0) 时直接在当前线程迭代
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+
+    def get(self, timeout=None):
+        return next(self._iterator)
+
+    def close(self):
+        pass
+
+
+class CompletionStream:
+    """
+    把 chat.completion.chunk 事件流转换成合并后的文本增量
+    结束后可读取：
+    finish_reason / usage: 最后一次出现的值
+    completed: 是否读到 [DONE]
+    error: 流中返回的错误信息 (没有则为 None)
+    invalid_events: 无法解析的事件数
+    提前停止迭代时，必须先调用 close() 再关闭底层响应
+    """
+
+    def __init__(self, byte_chunks, flush_ms=None):
+        self.byte_chunks = byte_chunks
+        self.flush_interval = (DEFAULT_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+        self.finish_reason = None
+        self.usage = None
+        self.completed = False
+        self.error = None
+        self.invalid_events = 0
+        self._reader = None
+
+    def _parse(self, events):
+        """
+        解析一个网络块中的所有事件，返回 JSON 对象列表
+        一个块里通常有几十个细碎的增量，先拼成一个 JSON 数组一次解析，失败时再逐条解析
+        """
+        datas = []
+        for event in events:
+            data = event['data']
+            if data.strip() == DONE:
+                self.completed = True
+                break
+            datas.append(data)
+        if not datas:
+            return []
+        if len(datas) > 1:
+            try:
+                payloads = json.loads("[" + ",".join(datas) + "]")
+                if len(payloads) == len(datas):
+                    return payloads
+            except json.JSONDecodeError:
+                pass
+        payloads = []
+        for data in datas:
+            try:
+                payloads.append(json.loads(data))
+            except json.JSONDecodeError:
+                self.invalid_events += 1
+        return payloads
+
+    def _handle(self, payload, pending):
+        if not isinstance(payload, dict):
+            self.invalid_events += 1
+            return
+        if payload.get('error'):
+            error = payload['error']
+            self.error = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+            return
+        if payload.get('usage'):
+            self.usage = payload['usage']
+        for choice in payload.get('choices') or ():
+            delta = choice.get('delta')
+            if delta:
+                content = delta.get('content')
+                if content:
+                    pending.append(content)
+            if choice.get('finish_reason'):
+                self.finish_reason = choice['finish_reason']
+
+    def __iter__(self):
+        events_source = iter_events(self.byte_chunks)
+        # 有刷新间隔时在后台读取网络块，累积的增量到期后不必等下一个网络块到达
+        reader = self._reader = _ReadAhead(events_source) if self.flush_interval > 0 else _Direct(events_source)
+        try:
+            yield from self._merge(reader)
+        finally:
+            reader.close()
+
+    def close(self):
+        """
+        停止后台读取并等待读取线程退出，之后调用方才能关闭响应 (避免在另一个线程读取时关闭连接)
+        """
+        if self._reader is not None:
+            self._reader.close()
+
+    def _merge(self, reader):
+        pending = []
+        last_flush = None
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, last_flush + self.flush_interval - time.perf_counter())
+            try:
+                events = reader.get(timeout)
+            except StopIteration:
+                break
+            if events is None:
+                # 上游暂停，刷新间隔已到：先输出已经收到的部分
+                yield "".join(pending)
+                pending = []
+                last_flush = time.perf_counter()
+                continue
+            if events:
+                for payload in self._parse(events):
+                    self._handle(payload, pending)
+            if not pending:
+                if self.completed or self.error:
+                    break
+                continue
+            now = time.perf_counter()
+            # 第一段立即输出，保证首字延迟不受合并影响
+            if last_flush is None or now - last_flush >= self.flush_interval or self.completed:
+                yield "".join(pending)
+                pending = []
+                last_flush = now
+            if self.completed or self.error:
+                break
+        if pending:
+            yield "".join(pending)
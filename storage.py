@@ -0,0 +1,91 @@
+from datetime import date, datetime, timezone
+
+# 存储后端的公共定义
+# db_utils 中的读写函数把实际的存储操作交给后端对象 (db_utils.get_backend())，后端需要提供：
+#   name                                        后端名称，用于页面显示
+#   embedded                                    是否为本地嵌入式数据库 (本地读取无需快照缓存和写入队列)
+#   upsert(table, rows, key_cols)               按自然键批量 upsert (行已去重)，返回 {'inserted', 'updated'}
+#   iter_pages(table, start_str, end_str, columns, order_col, limit=None, page_size=1000)
+#                                               逐页读取 fetched_date 在区间内的行，按 (order_col desc nulls last, id desc) 排序
+#   delete_day(table, date_str)                 删除某天的数据
+#   get_fetch_run(source, date_str)             读取 fetch_runs 中的一行，没有时返回 None
+#   close()
+# 返回的行与 PostgREST 的 JSON 格式一致：日期为 YYYY-MM-DD，时间为带时区的 ISO 字符串。
+# 现有实现：pg_backend.PostgresBackend (直连 Postgres)、sqlite_backend.SQLiteBackend (本地 SQLite)；
+# 未配置直连后端时 db_utils 使用 Supabase 客户端 (PostgREST)。
+
+# 各表可写入的列和 Postgres 类型，与 schema.sql 一致
+TABLE_COLUMNS = {
+    'ai_news': (
+        ('source', 'text'), ('title', 'text'), ('link', 'text'), ('summary', 'text'),
+        ('published', 'timestamptz'), ('published_str', 'text'), ('fetched_date', 'date')
+    ),
+    'reddit_demands': (
+        ('source', 'text'), ('title', 'text'), ('score', 'int4'), ('comments', 'int4'), ('url', 'text'),
+        ('permalink', 'text'), ('created_utc', 'text'), ('fetched_date', 'date')
+    ),
+    'github_trending': (
+        ('repo_name', 'text'), ('description', 'text'), ('language', 'text'), ('stars_today', 'int4'),
+        ('total_stars', 'int4'), ('url', 'text'), ('since', 'text'), ('lang', 'text'), ('fetched_date', 'date')
+    ),
+    'xiaohongshu_trends': (
+        ('title', 'text'), ('link', 'text'), ('snippet', 'text'), ('keyword', 'text'), ('fetched_date', 'date')
+    ),
+    'fetch_runs': (
+        ('source', 'text'), ('fetched_date', 'date'), ('item_count', 'int4'), ('finished_at', 'timestamptz')
+    )
+}
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def to_timestamptz(value):
+    """
+    转为带时区的 datetime，无法解析时返回 None
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    # 与 PostgREST 写入时一致，不带时区的时间按 UTC 处理
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+CONVERTERS = {
+    'text': str,
+    'int4': to_int,
+    'date': to_date,
+    'timestamptz': to_timestamptz
+}
+
+
+def convert_row(row, columns):
+    """
+    按列类型转换一行，返回与 columns 顺序一致的值列表
+    """
+    return [
+        None if row.get(name) is None else CONVERTERS[pg_type](row.get(name))
+        for name, pg_type in columns
+    ]
+
+
+def jsonable(row):
+    # 与 PostgREST 返回的 JSON 保持一致：日期、时间转为 ISO 字符串
+    for key, value in row.items():
+        if isinstance(value, (date, datetime)):
+            row[key] = value.isoformat()
+    return row
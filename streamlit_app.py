@@ -1,27 +1,35 @@
 import streamlit as st
 import pandas as pd
-import os
-from utils import get_reddit_hot, get_ai_news, get_github_trending, get_xhs_trends, get_web_ai_news, get_douyin_hot, get_douyin_creators
-from db_utils import supabase
+from db_utils import get_supabase, get_backend, get_write_stats
 from ai_helper import get_doubao_client
+from fanout import STATUS_OK, STATUS_TIMEOUT
+from page_data import load_page_data, SOURCE_LABELS
+from config import get_secret, get_flag
 from datetime import datetime, date
 
-# AI 配置 (从 Secrets 获取)
-try:
-    DOUBAO_API_KEY = st.secrets["doubao"]["api_key"]
-    DOUBAO_MODEL_ID = st.secrets["doubao"]["model_id"]
-except (FileNotFoundError, KeyError):
-    # 本地开发如果没有 secrets.toml，或者 secrets 中没有相关配置
-    DOUBAO_API_KEY = None
-    DOUBAO_MODEL_ID = None
-
-if not DOUBAO_API_KEY:
-    # 尝试从环境变量获取 (兼容性)
-    DOUBAO_API_KEY = os.environ.get("DOUBAO_API_KEY")
-    DOUBAO_MODEL_ID = os.environ.get("DOUBAO_MODEL_ID")
+# AI 配置 (从 Secrets 或环境变量获取)
+DOUBAO_API_KEY = get_secret("doubao.api_key", "DOUBAO_API_KEY")
+DOUBAO_MODEL_ID = get_secret("doubao.model_id", "DOUBAO_MODEL_ID")
 
 doubao_client = get_doubao_client(api_key=DOUBAO_API_KEY, model_id=DOUBAO_MODEL_ID)
 
+
+def show_ai_metrics():
+    """
+    在流式输出下方显示本次调用的首字延迟和输出速度
+    """
+    metrics = doubao_client.last_metrics
+    if not metrics or metrics['status'] != "ok":
+        return
+    speed = f" · {metrics['tokens_per_sec']:.0f} tokens/s" if metrics['tokens_per_sec'] else ""
+    # finish_reason 为 length 说明回答因长度上限被截断
+    truncated = " · ⚠️ 回答达到长度上限被截断" if metrics.get('finish_reason') == "length" else ""
+    st.caption(f"⏱️ 首字 {metrics['ttft']:.2f}s{speed} · 总耗时 {metrics['duration']:.1f}s{truncated}")
+
+
+# 只读模式：由独立的抓取进程 (python ingest.py) 负责写库，页面只读取库中的快照，不再实时抓取
+UI_READ_ONLY = get_flag("CROW_UI_READ_ONLY")
+
 # 设置页面配置
 st.set_page_config(
     page_title="AI & IndieDev Daily",
@@ -57,7 +65,7 @@ with st.sidebar:
         这个 Dashboard 聚合了：
         1. 每日 AI 最新动态 (RSS)
         2. Reddit 独立开发热门需求
-        3. GitHub 当日热榜
+        3. GitHub 热榜 (日/周/月，多语言)
         4. 小红书热点 (美妆/拍照需求)
         
         数据源：
@@ -80,117 +88,114 @@ with st.sidebar:
     enable_translation = st.toggle("🇨🇳 开启中文翻译 (AI Translate)", value=False, help="开启后将使用 AI 翻译所有英文内容，可能会增加加载时间。")
     
     st.divider()
-    # Supabase 状态指示器
-    if supabase:
+    # 数据库状态指示器
+    backend = get_backend()
+    if backend is not None and backend.embedded:
+        st.info(f"💾 数据保存在本地数据库 ({backend.name})，未连接 Supabase")
+    elif backend is not None:
+        st.success(f"✅ 数据库已连接 ({backend.name})")
+    elif get_supabase():
         st.success("✅ Supabase 数据库已连接")
     else:
         st.error("❌ Supabase 未连接 (数据无法保存)")
         st.caption("请检查 Streamlit Secrets 配置中是否包含 SUPABASE_URL 和 SUPABASE_KEY")
+    if UI_READ_ONLY:
+        st.caption("📖 只读模式：数据由后台抓取进程 (ingest.py) 定时写入")
+    write_stats = get_write_stats()
+    if write_stats and write_stats['queue_depth']:
+        st.caption(f"💾 {write_stats['queue_depth']} 条数据等待写入数据库 (已保存在本地，失败会自动重试)")
 
 # 标题
 st.title(f"🚀 AI & IndieDev Daily ({selected_date.strftime('%Y-%m-%d')})")
 
 # 加载数据函数
+# 完整的结果缓存一小时；有数据源超时或出错时，不完整的结果只保留一分钟：
+# 期间的重跑 (点击控件、AI 对话) 直接复用，不会每次都等满超时、重复消耗 Serper/抖音配额，过期后再重试
+class IncompleteData(Exception):
+    def __init__(self, result):
+        super().__init__("some sources failed")
+        self.result = result
+
+@st.cache_data(ttl=60)
+def load_recent_data(target_date):
+    return load_page_data(target_date, allow_scrape=not UI_READ_ONLY)
+
 @st.cache_data(ttl=3600)
+def load_complete_data(target_date):
+    result = load_recent_data(target_date)
+    if any(info['status'] != STATUS_OK for info in result[-1].values()):
+        # 抛出异常的调用不会被 st.cache_data 缓存
+        raise IncompleteData(result)
+    return result
+
 def load_data(target_date):
-    ai_news = get_ai_news(target_date)
-    reddit_hot = get_reddit_hot(target_date)
-    github_trending = get_github_trending(target_date)
-    xhs_trends = get_xhs_trends(target_date)
-    # Web AI News (实时搜索，不一定非要缓存很久，但为了性能还是缓存一下)
-    web_ai_news = get_web_ai_news(target_date)
-    douyin_hot = get_douyin_hot(target_date)
-    douyin_creators_data = get_douyin_creators(target_date)
-    return ai_news, reddit_hot, github_trending, xhs_trends, web_ai_news, douyin_hot, douyin_creators_data
+    try:
+        return load_complete_data(target_date)
+    except IncompleteData as e:
+        return e.result
 
 # 加载数据
 with st.spinner('正在获取最新数据...'):
-    ai_data, reddit_data, github_data, xhs_data, web_ai_data, douyin_data, douyin_creators = load_data(selected_date)
+    ai_data, reddit_data, github_data, xhs_data, web_ai_data, douyin_data, douyin_creators, source_statuses = load_data(selected_date)
+
+# 部分数据源超时或出错时，提示用户 (其余数据源正常展示)
+failed_sources = {name: info for name, info in source_statuses.items() if info['status'] != STATUS_OK}
+if failed_sources:
+    details = "、".join(
+        f"{SOURCE_LABELS.get(name, name)} ({'超时' if info['status'] == STATUS_TIMEOUT else '出错'})"
+        for name, info in failed_sources.items()
+    )
+    st.warning(f"⚠️ 部分数据源未能按时返回：{details}。已展示其余数据，稍后点击「🔄 刷新数据」可重试。")
 
 # 翻译处理逻辑
+# 不在会话中另存一份：batch_translate 按原文内容查持久化缓存，已翻译过的文本不会重复请求
 if enable_translation and doubao_client.api_key:
-    translate_cache_key = f"trans_{selected_date}_{len(ai_data)}_{len(reddit_data)}_{len(github_data)}_{len(web_ai_data)}_{len(douyin_data)}_{len(douyin_creators)}"
-    
-    if "translation_cache" not in st.session_state:
-        st.session_state["translation_cache"] = {}
+    with st.spinner("🇨🇳 正在进行 AI 智能翻译 (并行加速中)..."):
+        # 所有需要翻译的列合并为一次调用：batch_translate 内部去重、查缓存、分片并发
+        tasks = []
+        if not ai_data.empty:
+            tasks.append(("ai", "title", ai_data['title'].tolist()))
+            tasks.append(("ai", "summary", ai_data['summary'].tolist()))
+        if not reddit_data.empty:
+            tasks.append(("reddit", "title", reddit_data['title'].tolist()))
+        if not github_data.empty:
+            tasks.append(("github", "description", github_data['description'].fillna("").tolist()))
+        if not web_ai_data.empty:
+            tasks.append(("web", "title", web_ai_data['title'].tolist()))
+            tasks.append(("web", "snippet", web_ai_data['snippet'].tolist()))
+
+        all_texts = [text for _, _, texts in tasks for text in texts]
+        try:
+            all_translated = doubao_client.batch_translate(all_texts)
+        except Exception as e:
+            print(f"Translation task error: {e}")
+            all_translated = all_texts
+
+        # 按原顺序切回各列
+        results = {}
+        offset = 0
+        for key, col, texts in tasks:
+            results.setdefault(key, {})[col] = all_translated[offset:offset + len(texts)]
+            offset += len(texts)
+
+        # 应用结果到 DataFrame
+        if "ai" in results:
+            ai_data = ai_data.copy()
+            if "title" in results["ai"]: ai_data['title'] = results["ai"]["title"]
+            if "summary" in results["ai"]: ai_data['summary'] = results["ai"]["summary"]
         
-    if translate_cache_key not in st.session_state["translation_cache"]:
-        with st.spinner("🇨🇳 正在进行 AI 智能翻译 (并行加速中)..."):
-            import concurrent.futures
+        if "reddit" in results:
+            reddit_data = reddit_data.copy()
+            if "title" in results["reddit"]: reddit_data['title'] = results["reddit"]["title"]
             
-            # 定义并行任务函数
-            def exec_translation(key, col, texts, limit):
-                if not texts:
-                    return key, col, []
-                try:
-                    # 分片翻译
-                    part_to_trans = texts[:limit]
-                    rest_part = texts[limit:]
-                    if part_to_trans:
-                        trans_part = doubao_client.batch_translate(part_to_trans)
-                        return key, col, trans_part + rest_part
-                    return key, col, texts
-                except Exception as e:
-                    print(f"Translation task error ({key}-{col}): {e}")
-                    return key, col, texts
-
-            # 提交所有翻译任务
-            results = {}
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                futures = []
-                
-                # 1. AI News Tasks
-                if not ai_data.empty:
-                    futures.append(executor.submit(exec_translation, "ai", "title", ai_data['title'].tolist(), 20))
-                    futures.append(executor.submit(exec_translation, "ai", "summary", ai_data['summary'].tolist(), 20))
-                
-                # 2. Reddit Tasks
-                if not reddit_data.empty:
-                    futures.append(executor.submit(exec_translation, "reddit", "title", reddit_data['title'].tolist(), 20))
-                
-                # 3. GitHub Tasks
-                if not github_data.empty:
-                    futures.append(executor.submit(exec_translation, "github", "description", github_data['description'].fillna("").tolist(), 20))
-                
-                # 4. Web AI News Tasks
-                if not web_ai_data.empty:
-                    futures.append(executor.submit(exec_translation, "web", "title", web_ai_data['title'].tolist(), 10))
-                    futures.append(executor.submit(exec_translation, "web", "snippet", web_ai_data['snippet'].tolist(), 10))
-                
-                # 收集结果
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        key, col, res_list = future.result()
-                        if key not in results:
-                            results[key] = {}
-                        results[key][col] = res_list
-                    except Exception as e:
-                        print(f"Future result error: {e}")
-
-            # 应用结果到 DataFrame
-            if "ai" in results:
-                ai_data = ai_data.copy()
-                if "title" in results["ai"]: ai_data['title'] = results["ai"]["title"]
-                if "summary" in results["ai"]: ai_data['summary'] = results["ai"]["summary"]
+        if "github" in results:
+            github_data = github_data.copy()
+            if "description" in results["github"]: github_data['description'] = results["github"]["description"]
             
-            if "reddit" in results:
-                reddit_data = reddit_data.copy()
-                if "title" in results["reddit"]: reddit_data['title'] = results["reddit"]["title"]
-                
-            if "github" in results:
-                github_data = github_data.copy()
-                if "description" in results["github"]: github_data['description'] = results["github"]["description"]
-                
-            if "web" in results:
-                web_ai_data = web_ai_data.copy()
-                if "title" in results["web"]: web_ai_data['title'] = results["web"]["title"]
-                if "snippet" in results["web"]: web_ai_data['snippet'] = results["web"]["snippet"]
-
-            # Store in cache
-            st.session_state["translation_cache"][translate_cache_key] = (ai_data, reddit_data, github_data, web_ai_data, douyin_data, douyin_creators)
-    else:
-        # Load from cache
-        ai_data, reddit_data, github_data, web_ai_data, douyin_data, douyin_creators = st.session_state["translation_cache"][translate_cache_key]
+        if "web" in results:
+            web_ai_data = web_ai_data.copy()
+            if "title" in results["web"]: web_ai_data['title'] = results["web"]["title"]
+            if "snippet" in results["web"]: web_ai_data['snippet'] = results["web"]["snippet"]
 
 # 检查是否有数据
 if ai_data.empty and reddit_data.empty and github_data.empty and xhs_data.empty and web_ai_data.empty and douyin_data.empty and douyin_creators.empty:
@@ -235,16 +240,37 @@ else:
             st.info("暂无 Reddit 数据")
 
     with tab3:
-        st.header("GitHub 当日热榜")
+        st.header("GitHub 热榜")
+        # AI 分析只使用当前选中的榜单，避免多个时间范围/语言的结果混在一起
+        github_selected = github_data
         if not github_data.empty:
+            # 旧数据没有 since/lang 列，按当日、不限语言处理
+            github_view = github_data.copy()
+            if 'since' not in github_view:
+                github_view['since'] = 'daily'
+            if 'lang' not in github_view:
+                github_view['lang'] = 'all'
+
+            range_labels = {'daily': "今日", 'weekly': "本周", 'monthly': "本月"}
+            range_options = sorted(github_view['since'].unique(), key=lambda s: list(range_labels).index(s) if s in range_labels else len(range_labels))
+            lang_options = sorted(github_view['lang'].unique(), key=lambda l: (l != 'all', l))
+
+            col_since, col_lang = st.columns(2)
+            with col_since:
+                since = st.selectbox("时间范围", range_options, format_func=lambda s: range_labels.get(s, s))
+            with col_lang:
+                lang = st.selectbox("语言", lang_options, format_func=lambda l: "全部语言" if l == 'all' else l)
+
+            github_view = github_view[(github_view['since'] == since) & (github_view['lang'] == lang)]
+            github_selected = github_view
             st.dataframe(
-                github_data[['repo_name', 'description', 'language', 'stars_today', 'total_stars', 'url']],
+                github_view.sort_values('stars_today', ascending=False)[['repo_name', 'description', 'language', 'stars_today', 'total_stars', 'url']],
                 column_config={
                     "url": st.column_config.LinkColumn("链接"),
                     "repo_name": "项目名称",
                     "description": "简介",
                     "language": "语言",
-                    "stars_today": "今日 Star",
+                    "stars_today": f"{range_labels.get(since, since)} Star",
                     "total_stars": "总 Star"
                 },
                 hide_index=True,
@@ -275,7 +301,7 @@ else:
         else:
             st.info("暂无小红书数据")
             # 如果没有配置 Serper Key，才显示提示
-            if not st.secrets.get("SERPER_API_KEY") and not os.environ.get("SERPER_API_KEY"):
+            if not get_secret("SERPER_API_KEY"):
                 st.warning("⚠️ **抓取提示**：云端环境 (Streamlit Cloud) 可能会被 DuckDuckGo 拦截导致无数据。")
                 st.markdown("""
                 **建议解决方案 (一劳永逸)**：
@@ -338,7 +364,7 @@ else:
         data_options = {
             "每日 AI 动态": ai_data,
             "Reddit 独立开发热门": reddit_data,
-            "GitHub 热榜": github_data,
+            "GitHub 热榜": github_selected,
             "小红书热点": xhs_data,
             "抖音热榜": douyin_data,
             "ODD博主": douyin_creators
@@ -363,6 +389,7 @@ else:
                 with st.chat_message("assistant"):
                     stream = doubao_client.generate_summary(data_context, context_type=selected_option)
                     summary = st.write_stream(stream)
+                    show_ai_metrics()
                     
                     # Add to history
                     st.session_state["ai_chat_history"].append({"role": "user", "content": f"请总结一下 {selected_option} 的数据。"})
@@ -400,6 +427,7 @@ else:
                     try:
                         stream = doubao_client.chat(messages)
                         full_response = st.write_stream(stream)
+                        show_ai_metrics()
                     except Exception as e:
                         st.error(f"AI Error: {e}")
                         full_response = f"Error: {e}"
@@ -479,6 +507,7 @@ else:
                             try:
                                 stream = doubao_client.generate_summary(prompt, context_type="Topic Generation")
                                 st.write_stream(stream)
+                                show_ai_metrics()
                             except Exception as e:
                                 st.error(f"生成失败: {e}")
 
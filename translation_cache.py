@@ -0,0 +1,126 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from config import get_int, cache_path
+from sqlite_cache import SQLiteLRUCache
+
+# 翻译结果的持久化缓存
+# 以 (原文 SHA-256, 目标语言, 模型) 为键保存在本地 SQLite 中，进程内所有会话共享，重启后依然有效。
+# 同一条标题无论被多少访客、刷新多少次，只需要调用一次翻译接口。
+# 按最近访问时间 (LRU) 淘汰，条目数或总字节数超过上限时删除最久未使用的部分。
+
+
+# 条目数和总字节数上限 (淘汰方式见 sqlite_cache.py)
+CACHE_CONFIG = {
+    'max_entries': get_int("CROW_TRANSLATION_CACHE_MAX_ENTRIES", 50000),
+    'max_bytes': get_int("CROW_TRANSLATION_CACHE_MAX_MB", 64) * 1024 * 1024
+}
+# SQLite 单条语句的参数个数有上限，批量查询时分组
+_QUERY_CHUNK = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache(SQLiteLRUCache):
+    TABLE = "translations"
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS translations (
+            text_hash TEXT NOT NULL,
+            target_lang TEXT NOT NULL,
+            model TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (text_hash, target_lang, model)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS translations_accessed_at ON translations (accessed_at)"
+    )
+
+    def __init__(self, path=None, max_entries=None, max_bytes=None):
+        super().__init__(
+            path or cache_path("translation_cache.sqlite3"),
+            max_entries=max_entries or CACHE_CONFIG['max_entries'],
+            max_bytes=max_bytes or CACHE_CONFIG['max_bytes']
+        )
+
+    def get_many(self, texts, target_lang, model):
+        """
+        批量查询，返回 {原文: 译文}，只包含命中的条目
+        """
+        hashes = {}
+        for text in texts:
+            hashes.setdefault(text_hash(text), text)
+        if not hashes:
+            return {}
+
+        keys = list(hashes)
+        found = {}
+        with self._lock:
+            try:
+                for i in range(0, len(keys), _QUERY_CHUNK):
+                    chunk = keys[i:i + _QUERY_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, translation FROM translations "
+                        f"WHERE target_lang = ? AND model = ? AND text_hash IN ({placeholders})",
+                        [target_lang, model] + chunk
+                    ).fetchall()
+                    for key, translation in rows:
+                        found[hashes[key]] = translation
+
+                # 刷新访问时间，LRU 淘汰以此为准
+                if found:
+                    now = time.time()
+                    with self._conn:
+                        self._conn.executemany(
+                            "UPDATE translations SET accessed_at = ? WHERE text_hash = ? AND target_lang = ? AND model = ?",
+                            [(now, text_hash(text), target_lang, model) for text in found]
+                        )
+            except sqlite3.Error as e:
+                print(f"Translation cache read failed: {e}")
+
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, pairs, target_lang, model):
+        """
+        保存 [(原文, 译文)]
+        """
+        if not pairs:
+            return
+        now = time.time()
+        rows = []
+        for text, translation in pairs:
+            rows.append((text_hash(text), target_lang, model, translation, len(translation.encode('utf-8')), now))
+
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO translations "
+                        "(text_hash, target_lang, model, translation, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                self._added(len(rows), sum(row[4] for row in rows))
+            except sqlite3.Error as e:
+                print(f"Failed to persist translation cache: {e}")
+
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    global _translation_cache
+    if _translation_cache is None:
+        with _translation_cache_lock:
+            if _translation_cache is None:
+                _translation_cache = TranslationCache()
+    return _translation_cache
@@ -1,4 +1,3 @@
-import requests
 import feedparser
 import pandas as pd
 from datetime import datetime
@@ -6,41 +5,90 @@ import concurrent.futures
 from dateutil import parser
 import pytz
 import re
-import os
-import streamlit as st
-try:
-    import praw
-except ImportError:
-    praw = None
-try:
-    from duckduckgo_search import DDGS
-except ImportError:
-    DDGS = None
+import importlib.util
 
 from db_utils import (
     get_news_from_db, save_news_to_db, 
     get_reddit_from_db, save_reddit_to_db,
     get_github_trending_from_db, save_github_trending_to_db,
-    get_xhs_from_db, save_xhs_to_db, delete_xhs_for_date
+    get_xhs_from_db, save_xhs_to_db, delete_xhs_for_date,
+    record_fetch_run, get_last_fetch_run
 )
-from bs4 import BeautifulSoup
+from http_client import http_get, http_request
+from feed_cache import get_feed_cache, new_stats
+from async_fetch import fetch_many, resolve_backend, BACKEND_ASYNC
+from rate_limit import get_rate_limiter
+from config import get_secret
+from keyword_matcher import KeywordMatcher, BOUNDARY_PREFIX, BOUNDARY_BOTH
+from html_text import html_to_text
+from github_parser import parse_trending_html
+from embedded_json import extract_js_object, get_path, unwrap
 import urllib.parse
 
+# praw / duckduckgo_search 导入较慢，只在真正用到时才加载
+HAS_PRAW = importlib.util.find_spec("praw") is not None
+HAS_DDGS = importlib.util.find_spec("duckduckgo_search") is not None
+
+def get_ddgs():
+    """
+    返回 DuckDuckGo 搜索客户端类，未安装时返回 None
+    """
+    if not HAS_DDGS:
+        return None
+    from duckduckgo_search import DDGS
+    return DDGS
+
+# 今日快照的有效期 (秒)：最近一次抓取在有效期内时直接读库，过期才重新抓取
+FRESHNESS_TTL = {
+    'ai_news': 15 * 60,
+    'reddit': 30 * 60,
+    'github': 60 * 60
+}
+
+def get_fresh_snapshot(source, date_str, reader):
+    """
+    如果该数据源今天的快照还没过期，返回库中的数据；否则返回 None (需要重新抓取)
+    reader: 对应的 get_*_from_db 函数
+    """
+    run = get_last_fetch_run(source, date_str)
+    if not run:
+        return None
+
+    try:
+        finished_at = parser.parse(run['finished_at'])
+        if finished_at.tzinfo is None:
+            finished_at = finished_at.replace(tzinfo=pytz.utc)
+    except Exception:
+        return None
+
+    age = (datetime.now(pytz.utc) - finished_at).total_seconds()
+    if age >= FRESHNESS_TTL[source]:
+        print(f"Snapshot for {source} on {date_str} is stale ({int(age)}s old), re-fetching...")
+        return None
+
+    db_data = reader(date_str)
+    if not db_data:
+        return None
+    print(f"Serving {source} for {date_str} from DB (snapshot {int(age)}s old)")
+    return db_data
+
 def fetch_reddit_with_praw(subreddits_list, limit=10):
     """
     使用 PRAW (Reddit 官方 API) 获取数据，这是最可靠的方式。
     需要配置 REDDIT_CLIENT_ID 和 REDDIT_CLIENT_SECRET
     """
-    if not praw:
+    if not HAS_PRAW:
         print("PRAW not installed.")
         return []
 
+    import praw
+
     print("Using PRAW for Reddit fetching...")
     posts_list = []
     try:
         reddit = praw.Reddit(
-            client_id=st.secrets["REDDIT_CLIENT_ID"],
-            client_secret=st.secrets["REDDIT_CLIENT_SECRET"],
+            client_id=get_secret("REDDIT_CLIENT_ID"),
+            client_secret=get_secret("REDDIT_CLIENT_SECRET"),
             user_agent="streamlit:ai-indie-daily:v1.0 (by /u/anonymous)"
         )
         
@@ -72,7 +120,7 @@ def fetch_reddit_post_metrics(link, headers):
     post_id = post_id_match.group(1)
     json_url = f"https://www.reddit.com/comments/{post_id}.json?raw_json=1"
     try:
-        response = requests.get(json_url, headers=headers, timeout=5)
+        response = http_get(json_url, headers=headers, timeout=5)
         if response.status_code != 200:
             return None, None
         data = response.json()
@@ -80,49 +128,111 @@ def fetch_reddit_post_metrics(link, headers):
         return post_data.get('score'), post_data.get('num_comments')
     except Exception:
         return None, None
+REDDIT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
+}
+
+def reddit_json_url(sub, limit=10):
+    # 使用 top.json?t=day 获取过去 24 小时内热度最高的内容
+    return f"https://www.reddit.com/r/{sub}/top.json?t=day&limit={limit*3}"
+
+def reddit_rss_url(sub, limit=10):
+    return f"https://www.reddit.com/r/{sub}/top/.rss?t=day&limit={limit}"
+
+def parse_reddit_json(sub, data):
+    """
+    解析 Subreddit top.json 的返回数据
+    """
+    posts_list = []
+    posts = data.get('data', {}).get('children', [])
+    
+    # 获取当前时间戳
+    now_ts = datetime.now().timestamp()
+    # 放宽时间过滤到 48 小时，避免时区差异导致数据为空
+    # Reddit 的 t=day 其实已经做了一次过滤，这里的二次过滤是为了保险，但不能太严
+    cutoff_ts = now_ts - 48 * 3600 
+    
+    for post in posts:
+        p_data = post['data']
+        created_utc = p_data.get('created_utc', 0)
+        
+        if created_utc < cutoff_ts:
+            continue
+            
+        posts_list.append({
+            'source': f"r/{sub}",
+            'title': p_data.get('title'),
+            'score': p_data.get('score'),
+            'comments': p_data.get('num_comments'),
+            'url': p_data.get('url'),
+            'permalink': f"https://www.reddit.com{p_data.get('permalink')}",
+            'created_utc': datetime.fromtimestamp(created_utc).strftime('%Y-%m-%d %H:%M')
+        })
+    return posts_list
+
+def parse_reddit_rss(sub, content, limit=10):
+    """
+    解析 Subreddit RSS 的返回内容 (JSON API 失败时的回退方案)
+    """
+    posts_list = []
+    feed = feedparser.parse(content)
+    
+    for entry in feed.entries[:limit]:
+        # RSS 不容易直接拿到 score/comments，尝试从 summary 解析
+        # Reddit RSS summary 通常包含 HTML 表格，里边有 score/comments
+        summary = getattr(entry, 'summary', '')
+        
+        comments_count = 0
+        comments_match = re.search(r'>(\d+)\s+comments<', summary)
+        if not comments_match:
+             comments_match = re.search(r'(\d+)\s+comments', summary)
+        
+        if comments_match:
+            comments_count = int(comments_match.group(1))
+        
+        score_count = 0
+        score_match = re.search(r'(\d+)\s+points', summary)
+        if score_match:
+            score_count = int(score_match.group(1))
+        
+        # 解析时间
+        published_dt = datetime.now()
+        if hasattr(entry, 'updated_parsed'):
+            try:
+                 published_dt = datetime.fromtimestamp(datetime(*entry.updated_parsed[:6]).timestamp())
+            except:
+                pass
+        
+        # 尝试再次获取 metrics 如果 RSS 里没有 (可选，但这会增加请求量，容易被封，先注释掉)
+        # if (score_count == 0) or (comments_count == 0):
+        #    fetched_score, fetched_comments = fetch_reddit_post_metrics(entry.link, headers)
+        #    ...
+
+        posts_list.append({
+            'source': f"r/{sub}",
+            'title': entry.title,
+            'score': score_count, 
+            'comments': comments_count,
+            'url': entry.link,
+            'permalink': entry.link,
+            'created_utc': published_dt.strftime('%Y-%m-%d %H:%M')
+        })
+    return posts_list
+
 def fetch_reddit_subreddit(sub, limit=10):
     """
     单个 Subreddit 获取函数，用于并发执行
     优先尝试 JSON API，如果失败则回退到 RSS
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
-    }
     posts_list = []
     print(f"Fetching r/{sub}...")
     
     # --- 尝试 1: JSON API ---
     try:
-        # 使用 top.json?t=day 获取过去 24 小时内热度最高的内容
-        url = f"https://www.reddit.com/r/{sub}/top.json?t=day&limit={limit*3}"
-        response = requests.get(url, headers=headers, timeout=5)
+        response = http_get(reddit_json_url(sub, limit), headers=REDDIT_HEADERS, timeout=5)
         
         if response.status_code == 200:
-            data = response.json()
-            posts = data.get('data', {}).get('children', [])
-            
-            # 获取当前时间戳
-            now_ts = datetime.now().timestamp()
-            # 放宽时间过滤到 48 小时，避免时区差异导致数据为空
-            # Reddit 的 t=day 其实已经做了一次过滤，这里的二次过滤是为了保险，但不能太严
-            cutoff_ts = now_ts - 48 * 3600 
-            
-            for post in posts:
-                p_data = post['data']
-                created_utc = p_data.get('created_utc', 0)
-                
-                if created_utc < cutoff_ts:
-                    continue
-                    
-                posts_list.append({
-                    'source': f"r/{sub}",
-                    'title': p_data.get('title'),
-                    'score': p_data.get('score'),
-                    'comments': p_data.get('num_comments'),
-                    'url': p_data.get('url'),
-                    'permalink': f"https://www.reddit.com{p_data.get('permalink')}",
-                    'created_utc': datetime.fromtimestamp(created_utc).strftime('%Y-%m-%d %H:%M')
-                })
+            posts_list = parse_reddit_json(sub, response.json())
         else:
             print(f"JSON API failed for r/{sub}: {response.status_code}")
     except Exception as e:
@@ -132,53 +242,11 @@ def fetch_reddit_subreddit(sub, limit=10):
     if not posts_list:
         print(f"Falling back to RSS for r/{sub}...")
         try:
-            rss_url = f"https://www.reddit.com/r/{sub}/top/.rss?t=day&limit={limit}"
             # 使用 requests 获取内容，带上 User-Agent，避免 feedparser 默认 UA 被封
-            rss_response = requests.get(rss_url, headers=headers, timeout=5)
+            rss_response = http_get(reddit_rss_url(sub, limit), headers=REDDIT_HEADERS, timeout=5)
             
             if rss_response.status_code == 200:
-                feed = feedparser.parse(rss_response.content)
-                
-                for entry in feed.entries[:limit]:
-                    # RSS 不容易直接拿到 score/comments，尝试从 summary 解析
-                    # Reddit RSS summary 通常包含 HTML 表格，里边有 score/comments
-                    summary = getattr(entry, 'summary', '')
-                    
-                    comments_count = 0
-                    comments_match = re.search(r'>(\d+)\s+comments<', summary)
-                    if not comments_match:
-                         comments_match = re.search(r'(\d+)\s+comments', summary)
-                    
-                    if comments_match:
-                        comments_count = int(comments_match.group(1))
-                    
-                    score_count = 0
-                    score_match = re.search(r'(\d+)\s+points', summary)
-                    if score_match:
-                        score_count = int(score_match.group(1))
-                    
-                    # 解析时间
-                    published_dt = datetime.now()
-                    if hasattr(entry, 'updated_parsed'):
-                        try:
-                             published_dt = datetime.fromtimestamp(datetime(*entry.updated_parsed[:6]).timestamp())
-                        except:
-                            pass
-                    
-                    # 尝试再次获取 metrics 如果 RSS 里没有 (可选，但这会增加请求量，容易被封，先注释掉)
-                    # if (score_count == 0) or (comments_count == 0):
-                    #    fetched_score, fetched_comments = fetch_reddit_post_metrics(entry.link, headers)
-                    #    ...
-    
-                    posts_list.append({
-                        'source': f"r/{sub}",
-                        'title': entry.title,
-                        'score': score_count, 
-                        'comments': comments_count,
-                        'url': entry.link,
-                        'permalink': entry.link,
-                        'created_utc': published_dt.strftime('%Y-%m-%d %H:%M')
-                    })
+                posts_list = parse_reddit_rss(sub, rss_response.content, limit)
             else:
                 print(f"RSS fetch failed for r/{sub}: {rss_response.status_code}")
                 
@@ -187,12 +255,54 @@ def fetch_reddit_subreddit(sub, limit=10):
 
     return posts_list[:limit]
 
-def get_reddit_hot(target_date=None):
-    # 如果指定了日期且不是今天，尝试从数据库获取
+def fetch_reddit_subreddits_async(subreddits, limit=10, deadline=None):
+    """
+    asyncio 后端：所有 Subreddit 的 JSON 请求同时发出，失败的再统一走一轮 RSS 回退
+    """
+    results = {}
+    responses = fetch_many(
+        [{'url': reddit_json_url(sub, limit), 'headers': REDDIT_HEADERS, 'timeout': 5} for sub in subreddits],
+        per_host_limit=5,
+        deadline=deadline
+    )
+    for sub, response in zip(subreddits, responses):
+        results[sub] = []
+        if response.status_code == 200:
+            try:
+                results[sub] = parse_reddit_json(sub, response.json())
+            except Exception as e:
+                print(f"Error parsing JSON for r/{sub}: {e}")
+        else:
+            print(f"JSON API failed for r/{sub}: {response.error or response.status_code}")
+
+    fallback_subs = [sub for sub in subreddits if not results[sub]]
+    if fallback_subs:
+        print(f"Falling back to RSS for {len(fallback_subs)} subreddits...")
+        responses = fetch_many(
+            [{'url': reddit_rss_url(sub, limit), 'headers': REDDIT_HEADERS, 'timeout': 5} for sub in fallback_subs],
+            per_host_limit=5,
+            deadline=deadline
+        )
+        for sub, response in zip(fallback_subs, responses):
+            if response.status_code == 200:
+                try:
+                    results[sub] = parse_reddit_rss(sub, response.content, limit)
+                except Exception as e:
+                    print(f"Error parsing RSS for r/{sub}: {e}")
+            else:
+                print(f"RSS fetch failed for r/{sub}: {response.error or response.status_code}")
+
+    all_posts = []
+    for sub in subreddits:
+        all_posts.extend(results[sub][:limit])
+    return all_posts
+
+def get_reddit_hot(target_date=None, backend=None, allow_scrape=True, deadline=None):
+    # 如果指定了日期且不是今天 (或不允许抓取，例如只读 UI)，从数据库获取
     today_str = datetime.now().strftime('%Y-%m-%d')
     query_date = target_date.strftime('%Y-%m-%d') if target_date else today_str
     
-    if query_date != today_str:
+    if query_date != today_str or not allow_scrape:
         print(f"Querying DB for Reddit data on {query_date}...")
         db_data = get_reddit_from_db(query_date)
         if db_data:
@@ -200,25 +310,17 @@ def get_reddit_hot(target_date=None):
         else:
             return pd.DataFrame() # 如果是历史日期且无数据，返回空
             
-    # 如果是今天，先检查数据库有没有，没有再爬取
-    # (策略：为了保证实时性，今天的数据如果 DB 有，可以返回 DB 的，但用户可能想刷新。
-    # 这里我们简化逻辑：每次刷新都重新爬取并覆盖/追加？
-    # 更好的逻辑：如果是今天，优先爬取，然后保存到 DB (upsert 或 覆盖))
-    # 为简单起见，这里保持实时爬取，然后异步存入 DB
+    # 如果是今天，快照未过期时直接读库，过期才重新爬取
+    db_data = get_fresh_snapshot('reddit', today_str, get_reddit_from_db)
+    if db_data:
+        return pd.DataFrame(db_data)
     
     subreddits = ['indiehackers', 'SaaS', 'sideproject', 'entrepreneur', 'startups', 'AppIdeas', 'SomebodyMakeThis']
     all_posts = []
     
     # --- 优先尝试 PRAW (官方 API) ---
     # 检查 secrets 是否配置了 Reddit Key
-    has_reddit_secrets = False
-    try:
-        if "REDDIT_CLIENT_ID" in st.secrets and "REDDIT_CLIENT_SECRET" in st.secrets:
-            has_reddit_secrets = True
-    except FileNotFoundError:
-        pass # 本地如果没有 .streamlit/secrets.toml 会报错
-    except Exception:
-        pass
+    has_reddit_secrets = bool(get_secret("REDDIT_CLIENT_ID") and get_secret("REDDIT_CLIENT_SECRET"))
 
     if has_reddit_secrets:
         praw_posts = fetch_reddit_with_praw(subreddits)
@@ -230,14 +332,17 @@ def get_reddit_hot(target_date=None):
         if has_reddit_secrets:
             print("PRAW fetch returned empty, falling back to legacy fetcher...")
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_sub = {executor.submit(fetch_reddit_subreddit, sub): sub for sub in subreddits}
-            for future in concurrent.futures.as_completed(future_to_sub):
-                try:
-                    posts = future.result()
-                    all_posts.extend(posts)
-                except Exception as exc:
-                    print(f"Subreddit generated an exception: {exc}")
+        if resolve_backend(backend) == BACKEND_ASYNC:
+            all_posts = fetch_reddit_subreddits_async(subreddits, deadline=deadline)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+                future_to_sub = {executor.submit(fetch_reddit_subreddit, sub): sub for sub in subreddits}
+                for future in concurrent.futures.as_completed(future_to_sub):
+                    try:
+                        posts = future.result()
+                        all_posts.extend(posts)
+                    except Exception as exc:
+                        print(f"Subreddit generated an exception: {exc}")
     
     if not all_posts:
         # 如果获取失败，返回 Mock 数据用于演示
@@ -274,134 +379,207 @@ def get_reddit_hot(target_date=None):
         df = df.sort_values(by='created_utc', ascending=False)
     
     # 保存到数据库 (只保存今天的)
-    save_reddit_to_db(all_posts, today_str)
+    if save_reddit_to_db(all_posts, today_str) is not None:
+        record_fetch_run('reddit', today_str, len(all_posts))
     
     return df
 
-from bs4 import BeautifulSoup
+AI_KEYWORDS = [
+    'ai', 'gpt', 'llm', 'machine learning', 'neural', 'diffusion', 
+    'artificial intelligence', 'openai', 'anthropic', 'deepmind', 
+    'transformer', 'chatbot', 'copilot', 'gemini', 'claude', 'llama',
+    'rag', 'agent', 'generative', 'mistral', 'hugging face',
+    'cursor', 'trae', 'windsurf', 'bolt.new', 'lovable', 'vibe coding',
+    'cline', 'roocline', 'aider', 'devin', 'supermaven'
+]
 
-def fetch_rss_feed(feed):
-    # 单个 RSS 源获取函数，用于并发执行
+# 负面关键词：过滤掉报错、崩溃、求助等非资讯类内容
+NEGATIVE_KEYWORDS = [
+    'crash', 'error', 'bug', 'not working', 'fail', 'help', 'issue', 
+    'spinning wheel', 'frozen', 'stuck', 'glitch', 'broken'
+]
+
+# 使用单词边界，避免 'ai' 匹配到 'Maine' 或 'email'
+# 对于 'ai', 'gpt' 等短词，强制前后边界 \bkeyword\b
+# 对于 'transformer' 等可能复数的词，只强制前边界 \bkeyword
+AI_KEYWORD_MATCHER = KeywordMatcher(
+    AI_KEYWORDS,
+    boundary=BOUNDARY_PREFIX,
+    boundaries={k: BOUNDARY_BOTH for k in ['ai', 'gpt', 'llm', 'rag']},
+    ignore_case=True
+)
+NEGATIVE_KEYWORD_MATCHER = KeywordMatcher(NEGATIVE_KEYWORDS, ignore_case=True)
+
+# 摘要展示长度
+SUMMARY_MAX_CHARS = 200
+
+def parse_rss_entries(feed, content):
+    """
+    解析 RSS 内容，返回通过标题过滤的条目 (尚未按发布时间过滤)
+    结果与时间无关，因此可以在 304 时直接复用
+    """
     news_items = []
-    keywords = [
-        'ai', 'gpt', 'llm', 'machine learning', 'neural', 'diffusion', 
-        'artificial intelligence', 'openai', 'anthropic', 'deepmind', 
-        'transformer', 'chatbot', 'copilot', 'gemini', 'claude', 'llama',
-        'rag', 'agent', 'generative', 'mistral', 'hugging face',
-        'cursor', 'trae', 'windsurf', 'bolt.new', 'lovable', 'vibe coding',
-        'cline', 'roocline', 'aider', 'devin', 'supermaven'
-    ]
-    
-    # 负面关键词：过滤掉报错、崩溃、求助等非资讯类内容
-    negative_keywords = [
-        'crash', 'error', 'bug', 'not working', 'fail', 'help', 'issue', 
-        'spinning wheel', 'frozen', 'stuck', 'glitch', 'broken'
-    ]
-    
-    print(f"Fetching {feed['name']}...")
-    try:
-        # 更新 User-Agent 为较新的版本，避免被 Reddit 等站点拦截
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'}
-        response = requests.get(feed['url'], headers=headers, timeout=5)
-        if response.status_code != 200:
-            print(f"Failed to fetch {feed['name']}: {response.status_code}")
-            return []
+    parsed = feedparser.parse(content)
+    if not parsed.entries:
+        return []
+
+    for entry in parsed.entries[:10]: # 每个源取前10条
+        title = entry.title
+        link = entry.link
         
-        parsed = feedparser.parse(response.content)
-        if not parsed.entries:
-            return []
-            
-        # 获取当前时间（UTC）用于后续判断
-        now_utc = datetime.now(pytz.utc)
-    
-        for entry in parsed.entries[:10]: # 每个源取前10条
-            title = entry.title
-            link = entry.link
-            
-            # 0. 通用负面关键词过滤 (针对 Reddit/HN 等社区源)
-            # TechCrunch 等官方媒体通常不会有这类标题，为了保险起见全量过滤
-            title_lower = title.lower()
-            if any(nk in title_lower for nk in negative_keywords):
-                continue
+        # 0. 通用负面关键词过滤 (针对 Reddit/HN 等社区源)
+        # TechCrunch 等官方媒体通常不会有这类标题，为了保险起见全量过滤
+        if NEGATIVE_KEYWORD_MATCHER.search(title):
+            continue
 
-            # 0.5 过滤标题中显式标注旧年份的内容 (例如 "The 500-mile email (2002)")
-            # 如果标题包含 (YYYY) 且年份早于去年，则过滤
-            year_match = re.search(r'\((\d{4})\)', title)
-            if year_match:
-                year = int(year_match.group(1))
-                current_year = datetime.now().year
-                if year < current_year - 1:
-                    continue
-            
-            # 1. 针对 Hacker News 等综合源进行关键词过滤
-            if feed['name'] == 'Hacker News':
-                matched = False
-                for k in keywords:
-                    # 使用正则 \b 匹配单词边界，避免 'ai' 匹配到 'Maine' 或 'email'
-                    # 对于 'ai', 'gpt' 等短词，强制前后边界 \bkeyword\b
-                    # 对于 'transformer' 等可能复数的词，只强制前边界 \bkeyword
-                    if k in ['ai', 'gpt', 'llm', 'rag']:
-                         pattern = r'(?i)\b' + re.escape(k) + r'\b'
-                    else:
-                         pattern = r'(?i)\b' + re.escape(k)
-                         
-                    if re.search(pattern, title):
-                        matched = True
-                        break
-                
-                if not matched:
-                    continue
-            
-            # 解析时间
-            published_str = getattr(entry, 'published', getattr(entry, 'updated', str(datetime.now())))
-            try:
-                published_dt = parser.parse(published_str)
-                if published_dt.tzinfo is not None:
-                    published_dt = published_dt.astimezone(pytz.utc)
-                else:
-                    published_dt = published_dt.replace(tzinfo=pytz.utc)
-            except:
-                published_dt = datetime.now(pytz.utc)
-            
-            # 动态调整时间窗口
-            # 用户反馈希望严格看到“最新”日期，因此统一设置为 48 小时
-            # 这样可以容纳时区差异，但不会显示一周前的内容
-            # 如果是 Hacker News/Reddit 这种高频源，依然保持 24 小时
-            is_high_freq = any(n in feed['name'] for n in ['Hacker News', 'Reddit'])
-            time_window_hours = 24 if is_high_freq else 48
-            
-            if (now_utc - published_dt).total_seconds() > time_window_hours * 3600:
+        # 0.5 过滤标题中显式标注旧年份的内容 (例如 "The 500-mile email (2002)")
+        # 如果标题包含 (YYYY) 且年份早于去年，则过滤
+        year_match = re.search(r'\((\d{4})\)', title)
+        if year_match:
+            year = int(year_match.group(1))
+            current_year = datetime.now().year
+            if year < current_year - 1:
+                continue
+        
+        # 1. 针对 Hacker News 等综合源进行关键词过滤
+        if feed['name'] == 'Hacker News':
+            if not AI_KEYWORD_MATCHER.search(title):
                 continue
+        
+        # 解析时间
+        published_str = getattr(entry, 'published', getattr(entry, 'updated', str(datetime.now())))
+        try:
+            published_dt = parser.parse(published_str)
+            if published_dt.tzinfo is not None:
+                published_dt = published_dt.astimezone(pytz.utc)
+            else:
+                published_dt = published_dt.replace(tzinfo=pytz.utc)
+        except:
+            published_dt = datetime.now(pytz.utc)
 
-            # 处理摘要：去除 HTML 标签
-            raw_summary = getattr(entry, 'summary', getattr(entry, 'description', ''))
-            soup = BeautifulSoup(raw_summary, 'html.parser')
-            clean_summary = soup.get_text(separator=' ').strip()
-            
-            # 针对 Hacker News 的特殊处理
-            if feed['name'] == 'Hacker News':
-                # Hacker News 的摘要通常只是 "Comments"，没有什么信息量，直接置空或者给个提示
-                if 'Comments' in clean_summary or len(clean_summary) < 5:
-                    clean_summary = "点击下方链接阅读 Hacker News 上的原文与讨论"
-
-            news_items.append({
-                'source': feed['name'],
-                'title': title,
-                'link': link,
-                'published': published_dt, # 存储 datetime 对象用于排序
-                'published_str': published_dt.strftime('%Y-%m-%d %H:%M'), # 用于展示
-                'summary': clean_summary[:200] + '...' if len(clean_summary) > 200 else clean_summary
-            })
+        # 处理摘要：去除 HTML 标签，收集到足够展示的字符后即停止
+        # Hacker News 需要完整文本判断摘要是否只有 "Comments"
+        raw_summary = getattr(entry, 'summary', getattr(entry, 'description', ''))
+        max_chars = None if feed['name'] == 'Hacker News' else SUMMARY_MAX_CHARS
+        clean_summary = html_to_text(raw_summary, max_chars=max_chars)
+        
+        # 针对 Hacker News 的特殊处理
+        if feed['name'] == 'Hacker News':
+            # Hacker News 的摘要通常只是 "Comments"，没有什么信息量，直接置空或者给个提示
+            if 'Comments' in clean_summary or len(clean_summary) < 5:
+                clean_summary = "点击下方链接阅读 Hacker News 上的原文与讨论"
+
+        news_items.append({
+            'source': feed['name'],
+            'title': title,
+            'link': link,
+            'published': published_dt, # 存储 datetime 对象用于排序
+            'published_str': published_dt.strftime('%Y-%m-%d %H:%M'), # 用于展示
+            'summary': clean_summary[:SUMMARY_MAX_CHARS] + '...' if len(clean_summary) > SUMMARY_MAX_CHARS else clean_summary
+        })
+    return news_items
+
+def filter_recent_entries(feed, news_items):
+    """
+    按发布时间窗口过滤条目 (每次都要基于当前时间重新计算，不能缓存)
+    """
+    # 获取当前时间（UTC）用于后续判断
+    now_utc = datetime.now(pytz.utc)
+
+    # 动态调整时间窗口
+    # 用户反馈希望严格看到“最新”日期，因此统一设置为 48 小时
+    # 这样可以容纳时区差异，但不会显示一周前的内容
+    # 如果是 Hacker News/Reddit 这种高频源，依然保持 24 小时
+    is_high_freq = any(n in feed['name'] for n in ['Hacker News', 'Reddit'])
+    time_window_hours = 24 if is_high_freq else 48
+
+    return [
+        item for item in news_items
+        if (now_utc - item['published']).total_seconds() <= time_window_hours * 3600
+    ]
+
+RSS_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'}
+
+def rss_request_headers(feed, feed_cache):
+    # 更新 User-Agent 为较新的版本，避免被 Reddit 等站点拦截
+    headers = dict(RSS_HEADERS)
+    headers.update(feed_cache.conditional_headers(feed['url']))
+    return headers
+
+def handle_rss_response(feed, response, feed_cache, stats=None):
+    """
+    处理 RSS 响应：304 返回缓存条目，200 解析并写入缓存
+    stats: 本次抓取的命中统计 (feed_cache.new_stats())
+    Returns: 条目列表；304 但缓存已丢失时返回 None (调用方需要发起完整请求)
+    """
+    if response.status_code == 304:
+        feed_cache.record_not_modified(len(response.content), stats)
+        return feed_cache.get_entries(feed['url'], stats)
+
+    if response.status_code != 200:
+        print(f"Failed to fetch {feed['name']}: {response.status_code}")
+        return []
+
+    news_items = parse_rss_entries(feed, response.content)
+    feed_cache.store(feed['url'], response.headers, news_items, size=len(response.content), stats=stats)
+    return news_items
+
+def fetch_rss_feed(feed, stats=None):
+    # 单个 RSS 源获取函数，用于并发执行
+    # 带上 ETag / Last-Modified 发起条件请求，304 时复用上一次解析的条目
+    print(f"Fetching {feed['name']}...")
+    feed_cache = get_feed_cache()
+    try:
+        response = http_get(feed['url'], headers=rss_request_headers(feed, feed_cache), timeout=5)
+        news_items = handle_rss_response(feed, response, feed_cache, stats)
+        if news_items is None:
+            # 缓存在请求期间丢失，退回到完整请求
+            response = http_get(feed['url'], headers=RSS_HEADERS, timeout=5)
+            news_items = handle_rss_response(feed, response, feed_cache, stats) or []
+
+        return filter_recent_entries(feed, news_items)
     except Exception as e:
         print(f"Error fetching {feed['name']}: {e}")
-    return news_items
+    return []
 
-def get_ai_news(target_date=None):
-    # 如果指定了日期且不是今天，尝试从数据库获取
+def fetch_rss_feeds_async(rss_feeds, stats=None, deadline=None):
+    """
+    asyncio 后端：所有 RSS 请求在同一个线程内并发发出，解析在请求全部返回后进行
+    304 但缓存已丢失的源再并发发起一轮不带条件头的完整请求 (与 fetch_rss_feed 一致)
+    """
+    feed_cache = get_feed_cache()
+    all_news = []
+    pending = [(feed, rss_request_headers(feed, feed_cache)) for feed in rss_feeds]
+    conditional = True
+    while pending:
+        responses = fetch_many(
+            [{'url': feed['url'], 'headers': headers, 'timeout': 5} for feed, headers in pending],
+            per_host_limit=4,
+            deadline=deadline
+        )
+        refetch = []
+        for (feed, _), response in zip(pending, responses):
+            if response.error:
+                print(f"Error fetching {feed['name']}: {response.error}")
+                continue
+            try:
+                news_items = handle_rss_response(feed, response, feed_cache, stats)
+                if news_items is None and conditional:
+                    refetch.append((feed, dict(RSS_HEADERS)))
+                elif news_items:
+                    all_news.extend(filter_recent_entries(feed, news_items))
+            except Exception as e:
+                print(f"Error parsing {feed['name']}: {e}")
+        pending = refetch
+        conditional = False
+    return all_news
+
+def get_ai_news(target_date=None, backend=None, allow_scrape=True, deadline=None):
+    # 如果指定了日期且不是今天 (或不允许抓取，例如只读 UI)，从数据库获取
     today_str = datetime.now().strftime('%Y-%m-%d')
     query_date = target_date.strftime('%Y-%m-%d') if target_date else today_str
     
-    if query_date != today_str:
+    if query_date != today_str or not allow_scrape:
         print(f"Querying DB for AI News on {query_date}...")
         db_data = get_news_from_db(query_date)
         if db_data:
@@ -409,6 +587,11 @@ def get_ai_news(target_date=None):
         else:
             return pd.DataFrame()
             
+    # 如果是今天，快照未过期时直接读库，过期才重新抓取
+    db_data = get_fresh_snapshot('ai_news', today_str, get_news_from_db)
+    if db_data:
+        return pd.DataFrame(db_data)
+            
     rss_feeds = [
         {'name': 'TechCrunch AI', 'url': 'https://techcrunch.com/category/artificial-intelligence/feed/'},
         {'name': 'The Verge AI', 'url': 'https://www.theverge.com/rss/artificial-intelligence/index.xml'},
@@ -427,15 +610,22 @@ def get_ai_news(target_date=None):
     ]
     
     all_news = []
+    # 本次抓取自己的命中统计，并发的 get_ai_news 调用互不覆盖
+    cache_stats = new_stats()
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_feed = {executor.submit(fetch_rss_feed, feed): feed for feed in rss_feeds}
-        for future in concurrent.futures.as_completed(future_to_feed):
-            try:
-                items = future.result()
-                all_news.extend(items)
-            except Exception as exc:
-                print(f"RSS feed generated an exception: {exc}")
+    if resolve_backend(backend) == BACKEND_ASYNC:
+        all_news = fetch_rss_feeds_async(rss_feeds, cache_stats, deadline)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            future_to_feed = {executor.submit(fetch_rss_feed, feed, cache_stats): feed for feed in rss_feeds}
+            for future in concurrent.futures.as_completed(future_to_feed):
+                try:
+                    items = future.result()
+                    all_news.extend(items)
+                except Exception as exc:
+                    print(f"RSS feed generated an exception: {exc}")
+
+    print(f"RSS conditional GET: {cache_stats['hits']} hits (304) / {cache_stats['misses']} misses (200), {cache_stats['bytes']} bytes received")
     
     if not all_news:
         print("Warning: No AI news fetched. Using mock data.")
@@ -451,95 +641,92 @@ def get_ai_news(target_date=None):
     
     # 保存到数据库 (只保存今天的)
     # 注意：为了避免 datetime 对象序列化问题，save_news_to_db 内部会处理
-    save_news_to_db(all_news, today_str)
+    if save_news_to_db(all_news, today_str) is not None:
+        record_fetch_run('ai_news', today_str, len(all_news))
     
     return df
 
-def fetch_github_trending_raw():
+GITHUB_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# Trending 榜单的时间范围和语言，可通过 CROW_GITHUB_SINCE / CROW_GITHUB_LANGUAGES (逗号分隔) 配置
+# 默认并发抓取 今日 / 本周 / 本月 × 全部语言 三个榜单；每多一个组合，抓取、入库和翻译的行数都会相应增加，可通过配置减少
+# 语言使用 GitHub URL 中的写法 (例如 python, typescript, c%2B%2B)，all 表示不限语言
+GITHUB_ALL_LANGUAGES = 'all'
+GITHUB_TRENDING_RANGES = [
+    s.strip() for s in get_secret("CROW_GITHUB_SINCE", default="daily,weekly,monthly").split(",") if s.strip()
+]
+GITHUB_TRENDING_LANGUAGES = [
+    l.strip() for l in get_secret("CROW_GITHUB_LANGUAGES", default="all").split(",") if l.strip()
+]
+
+def github_trending_url(since='daily', lang=GITHUB_ALL_LANGUAGES):
+    path = "https://github.com/trending"
+    if lang and lang != GITHUB_ALL_LANGUAGES:
+        path += f"/{lang}"
+    return f"{path}?since={since}"
+
+def parse_github_response(response, since='daily', lang=GITHUB_ALL_LANGUAGES):
     """
-    抓取 GitHub Trending 页面
+    解析一次 Trending 请求的响应，每条结果带上 since/lang
     """
-    url = "https://github.com/trending"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
-    
-    print("Fetching GitHub Trending...")
-    items = []
-    
+    if response.status_code != 200:
+        print(f"Failed to fetch GitHub Trending ({since}, {lang}): {response.status_code}")
+        return []
+    items = parse_trending_html(response.content)
+    for item in items:
+        item['since'] = since
+        item['lang'] = lang
+    return items
+
+def fetch_github_trending_raw(since='daily', lang=GITHUB_ALL_LANGUAGES):
+    """
+    抓取一个 GitHub Trending 榜单 (时间范围 + 语言)
+    """
+    print(f"Fetching GitHub Trending ({since}, {lang})...")
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            print(f"Failed to fetch GitHub Trending: {response.status_code}")
-            return []
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        rows = soup.select('.Box-row')
-        
-        for row in rows:
+        response = http_get(github_trending_url(since, lang), headers=GITHUB_HEADERS, timeout=10)
+        return parse_github_response(response, since, lang)
+    except Exception as e:
+        print(f"Error fetching GitHub Trending ({since}, {lang}): {e}")
+        return []
+
+def fetch_github_trending_all(ranges=None, languages=None, backend=None, deadline=None):
+    """
+    并发抓取所有 时间范围 x 语言 的榜单，结果按 ranges、languages 的顺序排列
+    """
+    ranges = ranges or GITHUB_TRENDING_RANGES
+    languages = languages or GITHUB_TRENDING_LANGUAGES
+    combos = [(since, lang) for since in ranges for lang in languages]
+
+    if resolve_backend(backend) == BACKEND_ASYNC:
+        responses = fetch_many(
+            [{'url': github_trending_url(since, lang), 'headers': GITHUB_HEADERS, 'timeout': 10} for since, lang in combos],
+            per_host_limit=6,
+            deadline=deadline
+        )
+        results = []
+        for (since, lang), response in zip(combos, responses):
+            if response.error:
+                print(f"Error fetching GitHub Trending ({since}, {lang}): {response.error}")
+                continue
             try:
-                # Repo Name and Link
-                h2_a = row.select_one('h2 a')
-                if not h2_a: continue
-                
-                repo_name = h2_a.text.strip().replace('\n', '').replace(' ', '')
-                repo_url = f"https://github.com{h2_a['href']}"
-                
-                # Description
-                p_desc = row.select_one('p')
-                description = p_desc.text.strip() if p_desc else ""
-                
-                # Language
-                lang_span = row.select_one('span[itemprop="programmingLanguage"]')
-                language = lang_span.text.strip() if lang_span else "Unknown"
-                
-                # Stars
-                # Usually there are two links with svg icons for stars and forks.
-                # Total stars is the first one.
-                # Today stars is just text in a span usually at the end.
-                
-                footer_links = row.select('div.f6 a')
-                total_stars = 0
-                if footer_links:
-                    total_stars_str = footer_links[0].text.strip().replace(',', '')
-                    try:
-                        total_stars = int(total_stars_str)
-                    except:
-                        pass
-                        
-                stars_today_span = row.select_one('span.d-inline-block.float-sm-right')
-                stars_today = 0
-                if stars_today_span:
-                    stars_today_text = stars_today_span.text.strip()
-                    # extract number from "123 stars today"
-                    match = re.search(r'(\d+)', stars_today_text.replace(',', ''))
-                    if match:
-                        stars_today = int(match.group(1))
-                
-                items.append({
-                    'repo_name': repo_name,
-                    'description': description,
-                    'language': language,
-                    'stars_today': stars_today,
-                    'total_stars': total_stars,
-                    'url': repo_url
-                })
-                
+                results.append(parse_github_response(response, since, lang))
             except Exception as e:
-                print(f"Error parsing a GitHub row: {e}")
-                continue
-                
-    except Exception as e:
-        print(f"Error fetching GitHub Trending: {e}")
-        
-    return items
+                print(f"Error parsing GitHub Trending ({since}, {lang}): {e}")
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(6, len(combos))) as executor:
+            results = list(executor.map(lambda combo: fetch_github_trending_raw(*combo), combos))
 
-def get_github_trending(target_date=None):
-    # 如果指定了日期且不是今天，尝试从数据库获取
+    return [item for items in results for item in items]
+
+def get_github_trending(target_date=None, backend=None, allow_scrape=True, deadline=None):
+    # 如果指定了日期且不是今天 (或不允许抓取，例如只读 UI)，从数据库获取
     today_str = datetime.now().strftime('%Y-%m-%d')
     query_date = target_date.strftime('%Y-%m-%d') if target_date else today_str
     
-    if query_date != today_str:
+    if query_date != today_str or not allow_scrape:
         print(f"Querying DB for GitHub Trending on {query_date}...")
         db_data = get_github_trending_from_db(query_date)
         if db_data:
@@ -547,8 +734,12 @@ def get_github_trending(target_date=None):
         else:
             return pd.DataFrame()
             
-    # 如果是今天，直接爬取
-    items = fetch_github_trending_raw()
+    # 如果是今天，快照未过期时直接读库，过期才重新爬取
+    db_data = get_fresh_snapshot('github', today_str, get_github_trending_from_db)
+    if db_data:
+        return pd.DataFrame(db_data)
+    
+    items = fetch_github_trending_all(backend=backend, deadline=deadline)
     
     if not items:
         # Mock data if failed
@@ -560,7 +751,9 @@ def get_github_trending(target_date=None):
                 'language': 'Python',
                 'stars_today': 120,
                 'total_stars': 5000,
-                'url': 'https://github.com'
+                'url': 'https://github.com',
+                'since': 'daily',
+                'lang': GITHUB_ALL_LANGUAGES
             },
             {
                 'repo_name': 'mock/repo-2',
@@ -568,57 +761,142 @@ def get_github_trending(target_date=None):
                 'language': 'TypeScript',
                 'stars_today': 85,
                 'total_stars': 2300,
-                'url': 'https://github.com'
+                'url': 'https://github.com',
+                'since': 'daily',
+                'lang': GITHUB_ALL_LANGUAGES
             }
         ]
         
     # 存入数据库
     if items and items[0]['repo_name'] != 'mock/repo-1':
-        save_github_trending_to_db(items, today_str)
+        if save_github_trending_to_db(items, today_str) is not None:
+            record_fetch_run('github', today_str, len(items))
         
     return pd.DataFrame(items)
 
 import json
 
+SERPER_URL = "https://google.serper.dev/search"
+
+def get_serper_api_key():
+    return get_secret("SERPER_API_KEY")
+
+def serper_request(query, api_key, tbs="qdr:w", num=10):
+    """
+    构造一次 Serper 搜索请求 (同时用于线程池和 asyncio 后端)
+    """
+    return {
+        'method': 'POST',
+        'url': SERPER_URL,
+        'headers': {
+            'X-API-KEY': api_key,
+            'Content-Type': 'application/json'
+        },
+        'data': json.dumps({
+            "q": query,
+            "tbs": tbs,
+            "num": num
+        }),
+        'timeout': 10
+    }
+
+def send_serper_request(req):
+    # 所有 Serper 请求共用一个令牌桶，并发查询时也不超过配额
+    get_rate_limiter('serper').acquire()
+    return http_request(req['method'], req['url'], headers=req['headers'], data=req['data'], timeout=req['timeout'])
+
+def fetch_serper_many(reqs, deadline=None):
+    """
+    asyncio 后端批量发送 Serper 请求：先按配额拿到所有令牌，再一次性并发发出
+    """
+    limiter = get_rate_limiter('serper')
+    for _ in reqs:
+        limiter.acquire()
+    return fetch_many(reqs, per_host_limit=4, deadline=deadline)
+
+def build_xhs_serper_query(keywords):
+    if "site:" not in keywords:
+        return f"site:xiaohongshu.com {keywords} -site:xiaohongshu.com/user/"
+    return keywords
+
+def broaden_xhs_query(query):
+    # site: 限定没有结果时，去掉站点限制，改为追加 "小红书" 关键词
+    broad_query = re.sub(r'\bsite:[^\s]+', '', query)
+    broad_query = re.sub(r'-site:[^\s]+', '', broad_query)
+    broad_query = re.sub(r'\s+', ' ', broad_query).strip()
+    if "小红书" not in broad_query:
+        broad_query = f"{broad_query} 小红书".strip()
+    return broad_query
+
+def parse_xhs_serper_results(organic_results, keywords):
+    items = []
+    for res in organic_results:
+        title = res.get("title")
+        link = res.get("link")
+        snippet = res.get("snippet", "")
+        date_str = res.get("date", "") # Serper 有时会直接返回日期字段
+        
+        if not title or not link:
+            continue
+            
+        if "xiaohongshu.com" not in link:
+            continue
+            
+        if "user/profile" in link or "No information is available" in snippet:
+            continue
+        
+        if title.startswith("http") or "xiaohongshu.com" in title:
+            title = snippet if snippet else "小红书笔记"
+            
+        # 处理日期
+        if not date_str:
+            date_str = datetime.now().strftime('%Y-%m-%d')
+            # 尝试从 snippet 提取 "3 days ago"
+            if 'days ago' in snippet:
+                 try:
+                    days = int(re.search(r'(\d+) days ago', snippet).group(1))
+                    date_str = (datetime.now() - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+                 except:
+                    pass
+            elif 'hours ago' in snippet:
+                 date_str = datetime.now().strftime('%Y-%m-%d')
+        else:
+            # Serper 返回的 date 可能是 "Jan 25, 2024" 或 "2 days ago"
+            if 'ago' in date_str:
+                 date_str = datetime.now().strftime('%Y-%m-%d') # 简化处理
+            else:
+                try:
+                    parsed = parser.parse(date_str)
+                    date_str = parsed.strftime('%Y-%m-%d')
+                except:
+                    date_str = datetime.now().strftime('%Y-%m-%d')
+
+        items.append({
+            'title': title,
+            'link': link,
+            'snippet': snippet,
+            'keyword': keywords,
+            'date': date_str
+        })
+    return items
+
 def fetch_xhs_search_serper(keywords):
     """
     使用 Serper.dev API (Google Search Wrapper) 搜索小红书
     这是最稳定、最适合云端部署的方案，不会被反爬拦截。
     需要配置 SERPER_API_KEY
     """
-    api_key = None
-    try:
-        if "SERPER_API_KEY" in st.secrets:
-            api_key = st.secrets["SERPER_API_KEY"]
-    except:
-        pass
-        
-    if not api_key:
-        api_key = os.environ.get("SERPER_API_KEY")
-        
+    api_key = get_serper_api_key()
     if not api_key:
         return []
         
     print(f"Using Serper API for XHS: {keywords}")
-    url = "https://google.serper.dev/search"
-    
-    query = keywords
-    if "site:" not in keywords:
-        query = f"site:xiaohongshu.com {keywords} -site:xiaohongshu.com/user/"
-    payload = json.dumps({
-        "q": query,
-        "tbs": "qdr:w", 
-        "num": 10
-    })
-    
-    headers = {
-        'X-API-KEY': api_key,
-        'Content-Type': 'application/json'
-    }
+    query = build_xhs_serper_query(keywords)
     
     items = []
     try:
-        response = requests.request("POST", url, headers=headers, data=payload, timeout=10)
+        req = serper_request(query, api_key)
+        response = send_serper_request(req)
         if response.status_code != 200:
             print(f"Serper API failed: {response.status_code} - {response.text}")
             return []
@@ -626,81 +904,65 @@ def fetch_xhs_search_serper(keywords):
         data = response.json()
         organic_results = data.get("organic", [])
         if not organic_results:
-            broad_query = re.sub(r'\bsite:[^\s]+', '', query)
-            broad_query = re.sub(r'-site:[^\s]+', '', broad_query)
-            broad_query = re.sub(r'\s+', ' ', broad_query).strip()
-            if "小红书" not in broad_query:
-                broad_query = f"{broad_query} 小红书".strip()
-            payload = json.dumps({
-                "q": broad_query,
-                "tbs": "qdr:w",
-                "num": 10
-            })
-            response = requests.request("POST", url, headers=headers, data=payload, timeout=10)
+            req = serper_request(broaden_xhs_query(query), api_key)
+            response = send_serper_request(req)
             if response.status_code == 200:
                 data = response.json()
                 organic_results = data.get("organic", [])
         
-        for res in organic_results:
-            title = res.get("title")
-            link = res.get("link")
-            snippet = res.get("snippet", "")
-            date_str = res.get("date", "") # Serper 有时会直接返回日期字段
-            
-            if not title or not link:
-                continue
-                
-            if "xiaohongshu.com" not in link:
-                continue
-                
-            if "user/profile" in link or "No information is available" in snippet:
-                continue
-            
-            if title.startswith("http") or "xiaohongshu.com" in title:
-                title = snippet if snippet else "小红书笔记"
-                
-            # 处理日期
-            if not date_str:
-                date_str = datetime.now().strftime('%Y-%m-%d')
-                # 尝试从 snippet 提取 "3 days ago"
-                if 'days ago' in snippet:
-                     try:
-                        days = int(re.search(r'(\d+) days ago', snippet).group(1))
-                        date_str = (datetime.now() - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
-                     except:
-                        pass
-                elif 'hours ago' in snippet:
-                     date_str = datetime.now().strftime('%Y-%m-%d')
-            else:
-                # Serper 返回的 date 可能是 "Jan 25, 2024" 或 "2 days ago"
-                if 'ago' in date_str:
-                     date_str = datetime.now().strftime('%Y-%m-%d') # 简化处理
-                else:
-                    try:
-                        parsed = parser.parse(date_str)
-                        date_str = parsed.strftime('%Y-%m-%d')
-                    except:
-                        date_str = datetime.now().strftime('%Y-%m-%d')
-
-            items.append({
-                'title': title,
-                'link': link,
-                'snippet': snippet,
-                'keyword': keywords,
-                'date': date_str
-            })
+        items = parse_xhs_serper_results(organic_results, keywords)
             
     except Exception as e:
         print(f"Error calling Serper API: {e}")
         
     return items
 
+def fetch_xhs_searches_async(queries, deadline=None):
+    """
+    asyncio 后端：所有 Serper 查询同时发出；没有结果的查询再统一发一轮放宽条件的查询。
+    Returns: {query: items}，仍然为空的查询由调用方回退到 DuckDuckGo
+    """
+    results = {q: [] for q in queries}
+    api_key = get_serper_api_key()
+    if not api_key:
+        return results
+
+    print(f"Using Serper API (async) for {len(queries)} XHS queries")
+    site_queries = [build_xhs_serper_query(q) for q in queries]
+    responses = fetch_serper_many([serper_request(query, api_key) for query in site_queries], deadline)
+
+    organic = {}
+    for q, response in zip(queries, responses):
+        if response.status_code != 200:
+            print(f"Serper API failed for {q}: {response.error or response.status_code}")
+            continue
+        try:
+            organic[q] = response.json().get("organic", [])
+        except Exception as e:
+            print(f"Error parsing Serper response for {q}: {e}")
+
+    # 第二轮：site: 限定没有结果的查询放宽条件重试 (请求失败的查询不重试，与同步版本一致)
+    broad = [(q, query) for q, query in zip(queries, site_queries) if q in organic and not organic[q]]
+    if broad:
+        responses = fetch_serper_many([serper_request(broaden_xhs_query(query), api_key) for _, query in broad], deadline)
+        for (q, _), response in zip(broad, responses):
+            if response.status_code == 200:
+                try:
+                    organic[q] = response.json().get("organic", [])
+                except Exception as e:
+                    print(f"Error parsing Serper response for {q}: {e}")
+
+    for q, organic_results in organic.items():
+        results[q] = parse_xhs_serper_results(organic_results, q)
+    return results
+
 def fetch_xhs_search_ddg(keywords):
     """
     通过 DuckDuckGo Search 搜索小红书相关内容
     替代不稳定的 Bing Search
     site:xiaohongshu.com {keywords}
     """
+    DDGS = get_ddgs()
     if not DDGS:
         print("DuckDuckGo Search not installed.")
         return []
@@ -715,11 +977,13 @@ def fetch_xhs_search_ddg(keywords):
         with DDGS() as ddgs:
             # 第一次尝试: 限制时间为过去一周 (time='w')
             print(f"Searching DDG (time='w') for: {query}")
+            get_rate_limiter('ddg').acquire()
             results = list(ddgs.text(query, region='wt-wt', safesearch='off', time='w', max_results=10))
             
             # 如果没结果，尝试放宽时间限制 (移除 time='w')
             if not results:
                 print(f"No results with time='w', retrying without time limit for: {query}")
+                get_rate_limiter('ddg').acquire()
                 results = list(ddgs.text(query, region='wt-wt', safesearch='off', max_results=10))
             
             for res in results:
@@ -763,84 +1027,65 @@ def fetch_xhs_search_ddg(keywords):
         
     return items
 
+# 小红书关键词过滤，严格匹配用户需求（美妆/拍照/plog/女生需求）
+XHS_KEYWORDS = [
+    '美妆', '化妆', '护肤', '拍照', '写真', '修图', '穿搭', '口红', '底妆', '眼妆', '妆容', '皮肤', '洁面', '面膜', '粉底', '腮红',
+    '美白', '眼线', '眉毛', '睫毛', '拍摄', '滤镜', '自拍', '姿势', 'OOTD', '探店', '好物', '测评', '种草', '独居', '女生',
+    'Plog', 'Vlog', '生活碎片', '美甲', '发型', '编发', '卷发', '染发', '显瘦', '减脂', '瑜伽', '普拉提'
+]
+XHS_KEYWORD_MATCHER = KeywordMatcher(XHS_KEYWORDS)
+
+# 探索页/搜索页 SSR 状态中笔记列表的位置，按顺序尝试
+XHS_FEED_PATHS = [('feed', 'feeds'), ('search', 'feeds')]
+# 笔记详情页：note.noteDetailMap = {note_id: {'note': {...}}}
+XHS_NOTE_DETAIL_PATH = ('note', 'noteDetailMap')
+
+def find_xhs_notes(state):
+    """
+    按已知路径从 __INITIAL_STATE__ 中取出笔记，不遍历整个状态树
+    """
+    notes = []
+    for path in XHS_FEED_PATHS:
+        feeds = get_path(state, path)
+        if not isinstance(feeds, list):
+            continue
+        for item in feeds:
+            item = unwrap(item)
+            if isinstance(item, dict) and isinstance(unwrap(item.get('noteCard')), dict):
+                note_obj = unwrap(item['noteCard'])
+                # 如果 noteCard 里没有 id，尝试从外层 item 获取
+                if 'id' not in note_obj and 'id' in item:
+                    note_obj['id'] = item['id']
+                notes.append(note_obj)
+        if notes:
+            return notes
+
+    detail_map = get_path(state, XHS_NOTE_DETAIL_PATH)
+    if isinstance(detail_map, dict):
+        for detail in detail_map.values():
+            note = get_path(detail, ('note',))
+            if isinstance(note, dict):
+                notes.append(note)
+    return notes
+
 def fetch_xhs_explore_hot(limit=30):
     url = "https://www.xiaohongshu.com/explore"
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url, headers=headers, timeout=10)
         if response.status_code != 200:
             return []
-        html = response.text
-        key = "__INITIAL_STATE__="
-        idx = html.find(key)
-        if idx == -1:
-            return []
-        start = html.find("{", idx)
-        if start == -1:
+        state = extract_js_object(response.text, "__INITIAL_STATE__=")
+        if state is None:
             return []
-        brace = 0
-        in_str = False
-        esc = False
-        end = -1
-        for i in range(start, len(html)):
-            c = html[i]
-            if in_str:
-                if esc:
-                    esc = False
-                elif c == "\\":
-                    esc = True
-                elif c == "\"":
-                    in_str = False
-            else:
-                if c == "\"":
-                    in_str = True
-                elif c == "{":
-                    brace += 1
-                elif c == "}":
-                    brace -= 1
-                    if brace == 0:
-                        end = i + 1
-                        break
-        if end == -1:
-            return []
-        raw = html[start:end].replace("undefined", "null")
-        data = json.loads(raw)
-        notes = []
-        
-        # 1. 尝试从 feed.feeds 中提取 (SSR data)
-        if 'feed' in data and 'feeds' in data['feed']:
-            feeds = data['feed']['feeds']
-            if isinstance(feeds, list):
-                for item in feeds:
-                    if isinstance(item, dict) and 'noteCard' in item:
-                        note_obj = item['noteCard']
-                        # 如果 noteCard 里没有 id，尝试从外层 item 获取
-                        if 'id' not in note_obj and 'id' in item:
-                            note_obj['id'] = item['id']
-                        notes.append(note_obj)
-        
-        # 2. 如果没找到，尝试递归查找 (兼容其他结构)
+        notes = find_xhs_notes(state)
         if not notes:
-            def walk(obj):
-                if isinstance(obj, dict):
-                    if "noteCard" in obj and isinstance(obj["noteCard"], dict):
-                        notes.append(obj["noteCard"])
-                    if "note" in obj and isinstance(obj["note"], dict):
-                        notes.append(obj["note"])
-                    for v in obj.values():
-                        walk(v)
-                elif isinstance(obj, list):
-                    for v in obj:
-                        walk(v)
-            walk(data)
+            print("No notes found at the known XHS state paths, the page layout may have changed.")
             
         items = []
         seen = set()
-        # 恢复并增强关键词过滤，严格匹配用户需求（美妆/拍照/plog/女生需求）
-        keyword_re = re.compile(r"美妆|化妆|护肤|拍照|写真|修图|穿搭|口红|底妆|眼妆|妆容|皮肤|洁面|面膜|粉底|腮红|美白|眼线|眉毛|睫毛|拍摄|滤镜|自拍|姿势|OOTD|探店|好物|测评|种草|独居|女生|Plog|Vlog|生活碎片|美甲|发型|编发|卷发|染发|显瘦|减脂|瑜伽|普拉提")
-        
         for note in notes:
             note_id = note.get("id") or note.get("noteId")
             if not note_id or note_id in seen:
@@ -852,7 +1097,7 @@ def fetch_xhs_explore_hot(limit=30):
             
             # 严格过滤：标题或描述中必须包含关键词
             text_to_check = f"{title} {desc}"
-            if not keyword_re.search(text_to_check):
+            if not XHS_KEYWORD_MATCHER.search(text_to_check):
                 continue
                 
             seen.add(note_id)
@@ -860,7 +1105,7 @@ def fetch_xhs_explore_hot(limit=30):
             text = f"{title} {desc}".strip()
             
             # 暂时放宽过滤条件，如果是 Explore 首页的热门内容，通常都是高质量的
-            # if not keyword_re.search(text):
+            # if not XHS_KEYWORD_MATCHER.search(text):
             #    continue
             
             link = f"https://www.xiaohongshu.com/explore/{note_id}"
@@ -893,12 +1138,24 @@ def fetch_xhs_explore_hot(limit=30):
         print(f"Error fetching XHS explore: {e}")
         return []
 
-def get_xhs_trends(target_date=None):
-    # 1. 检查数据库
+# 小红书搜索的并发查询数 (实际请求速率由 rate_limit 中的令牌桶控制)
+XHS_SEARCH_WORKERS = 4
+
+def search_xhs_query(q):
+    # 1. 优先尝试 Serper (Google API)，最稳定
+    items = fetch_xhs_search_serper(q)
+    
+    # 2. 如果没配置 Serper 或用完了，回退到 DuckDuckGo
+    if not items:
+        items = fetch_xhs_search_ddg(q)
+    return items
+
+def get_xhs_trends(target_date=None, backend=None, allow_scrape=True, deadline=None):
+    # 1. 检查数据库 (历史日期或不允许抓取时只读库)
     today_str = datetime.now().strftime('%Y-%m-%d')
     query_date = target_date.strftime('%Y-%m-%d') if target_date else today_str
     
-    if query_date != today_str:
+    if query_date != today_str or not allow_scrape:
         print(f"Querying DB for XHS on {query_date}...")
         db_data = get_xhs_from_db(query_date)
         if db_data:
@@ -985,22 +1242,38 @@ def get_xhs_trends(target_date=None):
     
     all_items = []
     
-    # 串行执行
-    # 为了避免请求过多，随机选几个 query 跑一下，或者全跑
-    # 这里我们只跑前 5 个 query 组合，避免 API 消耗过大
-    import random
+    # 为了避免 API 消耗过大，只跑前 6 个 query 组合
     selected_queries = search_queries[:6] # 取前6个，覆盖不同领域
     
-    for q in selected_queries:
-        # 1. 优先尝试 Serper (Google API)，最稳定
-        items = fetch_xhs_search_serper(q)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=XHS_SEARCH_WORKERS + 1) as executor:
+        # 无论搜索结果如何，都尝试获取首页热门数据进行补充，与搜索同时进行
+        # 注意：fetch_xhs_explore_hot 内部已经有了严格的关键词过滤
+        explore_future = executor.submit(fetch_xhs_explore_hot, 30) # 增加 limit，因为过滤后可能会变少
         
-        # 2. 如果没配置 Serper 或用完了，回退到 DuckDuckGo
-        if not items:
-            items = fetch_xhs_search_ddg(q)
-            
-        if items:
-            all_items.extend(items)
+        if resolve_backend(backend) == BACKEND_ASYNC:
+            # Serper 查询全部并发发出，没有结果的再逐个回退到 DuckDuckGo
+            serper_results = fetch_xhs_searches_async(selected_queries, deadline)
+            for q in selected_queries:
+                items = serper_results[q] or fetch_xhs_search_ddg(q)
+                if items:
+                    all_items.extend(items)
+        else:
+            # 查询并发执行，Serper / DDG 各自的令牌桶保证不超过配额
+            # 按 query 顺序收集结果，保证去重结果稳定
+            query_futures = [executor.submit(search_xhs_query, q) for q in selected_queries]
+            for q, future in zip(selected_queries, query_futures):
+                try:
+                    items = future.result()
+                    if items:
+                        all_items.extend(items)
+                except Exception as exc:
+                    print(f"XHS query {q} generated an exception: {exc}")
+        
+        try:
+            explore_items = explore_future.result()
+        except Exception as exc:
+            print(f"XHS explore generated an exception: {exc}")
+            explore_items = []
             
     # 去重
     seen_links = set()
@@ -1011,19 +1284,14 @@ def get_xhs_trends(target_date=None):
             unique_items.append(item)
             
     if not unique_items:
-        print("Search failed or returned no results, fetching explore feed...")
+        print("Search failed or returned no results, using explore feed only...")
     
-    # 无论搜索结果如何，都尝试获取首页热门数据进行补充
-    # 注意：fetch_xhs_explore_hot 内部已经有了严格的关键词过滤
-    explore_items = fetch_xhs_explore_hot(limit=30) # 增加 limit，因为过滤后可能会变少
     if explore_items:
         print(f"Fetched {len(explore_items)} items from Explore (Filtered)")
         unique_items.extend(explore_items)
             
     # 再次去重并应用统一过滤 (针对 Search 结果可能没过滤干净的情况)
-    # 复用之前的正则
-    keyword_re = re.compile(r"美妆|化妆|护肤|拍照|写真|修图|穿搭|口红|底妆|眼妆|妆容|皮肤|洁面|面膜|粉底|腮红|美白|眼线|眉毛|睫毛|拍摄|滤镜|自拍|姿势|OOTD|探店|好物|测评|种草|独居|女生|Plog|Vlog|生活碎片|美甲|发型|编发|卷发|染发|显瘦|减脂|瑜伽|普拉提")
-    
+    # 复用 Explore 的关键词匹配器
     seen_links = set()
     final_items = []
     
@@ -1048,7 +1316,7 @@ def get_xhs_trends(target_date=None):
             continue
         
         # 2. 如果是 Search 来源，必须检查关键词；Explore 来源理论上已经检查过了，但再查一次也无妨
-        if not keyword_re.search(text_check):
+        if not XHS_KEYWORD_MATCHER.search(text_check):
             # 只有当 title 很短且 snippet 为空时，可能会误杀。但宁可误杀不可放过无关内容。
             # 稍微放宽一点：如果来源是 Explore，我们信任它的内部过滤（除非内部过滤失效）
             # 但为了保证用户体验，这里统一执行严格过滤
@@ -1064,11 +1332,12 @@ def get_xhs_trends(target_date=None):
         return pd.DataFrame()
     
     # 存入数据库
-    save_xhs_to_db(final_items, today_str)
+    if save_xhs_to_db(final_items, today_str) is not None:
+        record_fetch_run('xhs', today_str, len(final_items))
         
     return pd.DataFrame(final_items)
 
-def get_web_ai_news(target_date=None):
+def get_web_ai_news(target_date=None, backend=None, deadline=None):
     """
     通过 Serper/DDG 搜索全网 AI 重大新闻 (Web Search)
     补充 RSS 的不足
@@ -1089,22 +1358,23 @@ def get_web_ai_news(target_date=None):
     seen_links = set()
     
     # 尝试 Serper
-    api_key = st.secrets.get("SERPER_API_KEY") or os.environ.get("SERPER_API_KEY")
+    api_key = get_serper_api_key()
     if api_key:
-        url = "https://google.serper.dev/search"
-        headers = {
-            'X-API-KEY': api_key,
-            'Content-Type': 'application/json'
-        }
+        serper_queries = queries[:3] # 只跑前3个避免消耗过多
+        reqs = [serper_request(q, api_key, tbs="qdr:d", num=5) for q in serper_queries] # 过去24小时
         
-        for q in queries[:3]: # 只跑前3个避免消耗过多
+        if resolve_backend(backend) == BACKEND_ASYNC:
+            responses = fetch_serper_many(reqs, deadline)
+        else:
+            responses = []
+            for req in reqs:
+                try:
+                    responses.append(send_serper_request(req))
+                except Exception as e:
+                    print(f"Error fetching web AI news via Serper: {e}")
+        
+        for response in responses:
             try:
-                payload = json.dumps({
-                    "q": q,
-                    "tbs": "qdr:d", # 过去24小时
-                    "num": 5
-                })
-                response = requests.request("POST", url, headers=headers, data=payload, timeout=10)
                 if response.status_code == 200:
                     data = response.json()
                     results = data.get("organic", [])
@@ -1125,10 +1395,12 @@ def get_web_ai_news(target_date=None):
                 print(f"Error fetching web AI news via Serper: {e}")
     
     # 如果 Serper 没数据或没配置，尝试 DDG
+    DDGS = get_ddgs()
     if not all_items and DDGS:
         for q in queries:
             try:
                 with DDGS() as ddgs:
+                    get_rate_limiter('ddg').acquire()
                     results = list(ddgs.text(q, region='wt-wt', safesearch='off', time='d', max_results=5))
                     for res in results:
                         link = res.get("href")
@@ -1148,6 +1420,11 @@ def get_web_ai_news(target_date=None):
                 
     return pd.DataFrame(all_items)
 
+DOUYIN_MUSIC_KEYWORDS = ['音乐', '歌', '唱', '乐', '曲', '演唱', '伴奏', 'MV', '专辑', '翻唱', 'BGM', '歌手', '演唱会', '说唱', '电音']
+DOUYIN_ODD_KEYWORDS = ['odd', '拍摄', '运镜', '转场', '镜头', '卡点', '摄影', '大片', '高级感', 'vlog', 'plog', '质感']
+DOUYIN_MUSIC_MATCHER = KeywordMatcher(DOUYIN_MUSIC_KEYWORDS, ignore_case=True)
+DOUYIN_ODD_MATCHER = KeywordMatcher(DOUYIN_ODD_KEYWORDS, ignore_case=True)
+
 def get_douyin_hot(target_date=None):
     """
     获取抖音热榜，并过滤出音乐相关和odd（拍摄风格）相关的内容
@@ -1157,12 +1434,9 @@ def get_douyin_hot(target_date=None):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
     }
     
-    music_keywords = ['音乐', '歌', '唱', '乐', '曲', '演唱', '伴奏', 'MV', '专辑', '翻唱', 'BGM', '歌手', '演唱会', '说唱', '电音']
-    odd_keywords = ['odd', '拍摄', '运镜', '转场', '镜头', '卡点', '摄影', '大片', '高级感', 'vlog', 'plog', '质感']
-    
     items = []
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url, headers=headers, timeout=10)
         if response.status_code == 200:
             text = response.text
             # 处理可能的 trailing garbage bytes
@@ -1176,9 +1450,8 @@ def get_douyin_hot(target_date=None):
                 hot_value = word_item.get('hot_value', 0)
                 
                 # Check categories
-                word_lower = word.lower()
-                is_music = any(k.lower() in word_lower for k in music_keywords)
-                is_odd = any(k.lower() in word_lower for k in odd_keywords)
+                is_music = DOUYIN_MUSIC_MATCHER.search(word)
+                is_odd = DOUYIN_ODD_MATCHER.search(word)
                 
                 category = []
                 if is_music:
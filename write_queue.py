@@ -0,0 +1,337 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from config import get_float, get_int, cache_path
+
+# 数据库写入的 write-behind 队列
+# 抓取函数只把待写入的行放进队列并追加到本地 spool 文件 (JSONL)，立即返回，不再等待网络写入。
+# 后台线程定期把队列中所有数据源的行按表合并后批量写入，每张表单独写入、单独重试：
+# 一张表写入失败 (例如缺少迁移的列、违反约束) 不会挡住其他表。全部失败 (数据库不可用) 时按指数退避重试；
+# 数据库可用 (同一轮有其他写入成功) 时仍然失败的操作计一次失败，达到 max_attempts 后移入 dead-letter 文件，不再重试。
+# 进程异常退出时 spool 里的行不会丢，下次启动 (任意一个进程) 会接管并继续写入。
+# 每个队列使用自己的 spool 文件 (<pid>-<随机 id>.jsonl)，避免 Streamlit 和 ingest 进程互相覆盖；
+# 容器重启后新进程可能拿到与上次相同的 pid，上次留下的文件仍会被当作孤儿文件接管。
+
+
+# flush_interval: 后台写入的间隔 (秒)，同一时间段内多个数据源的行会合并成一批
+# retry_max: 失败重试的最大间隔 (秒)
+# max_attempts: 数据库可用时同一操作最多失败的次数
+WRITE_QUEUE_CONFIG = {
+    'flush_interval': get_float("CROW_WRITE_FLUSH_INTERVAL", 2),
+    'retry_base': 1.0,
+    'retry_max': get_float("CROW_WRITE_RETRY_MAX", 60),
+    'max_attempts': get_int("CROW_WRITE_MAX_ATTEMPTS", 5)
+}
+
+SPOOL_DIR_NAME = "write_spool"
+# 放弃重试的操作追加到 spool 目录下的这个文件 (不是 *.jsonl，不会被当作 spool 接管)
+DEAD_LETTER_NAME = "dead_letter.jsonl.failed"
+
+# 队列中的操作：按自然键 upsert 数据表；fetch_runs 在对应数据表 (after) 写入成功之后才写
+OP_UPSERT = "upsert"
+OP_FETCH_RUN = "fetch_run"
+
+
+# 本进程中仍在使用的 spool 文件，接管时跳过
+_live_spools = set()
+_live_spools_lock = threading.Lock()
+
+
+def _spool_pid(path):
+    # <pid>-<id>.jsonl，旧版本为 <pid>.jsonl
+    name = os.path.splitext(os.path.basename(path))[0].split("-", 1)[0]
+    return int(name) if name.isdigit() else None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # 没有权限发信号说明进程存在；其他平台上无法判断时按存活处理
+        return True
+    return True
+
+
+class WriteBehindQueue:
+    def __init__(self, writer, spool_dir=None, config=None):
+        """
+        writer(op, table, rows): 写入同一张表的一组行，失败时抛出异常 (会被重试，因此必须幂等)
+        """
+        self.writer = writer
+        self.config = dict(WRITE_QUEUE_CONFIG, **(config or {}))
+        self.spool_dir = spool_dir or os.path.dirname(cache_path(os.path.join(SPOOL_DIR_NAME, "")))
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.spool_path = os.path.join(self.spool_dir, f"{os.getpid()}-{uuid.uuid4().hex[:12]}.jsonl")
+        self.dead_letter_path = os.path.join(self.spool_dir, DEAD_LETTER_NAME)
+        with _live_spools_lock:
+            _live_spools.add(self.spool_path)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._pending = []
+        # 正在写入的一批，写入成功前仍计入队列深度
+        self._inflight = []
+        self._stopped = False
+        self.stats = {
+            'enqueued_rows': 0,
+            'flushed_rows': 0,
+            'flushes': 0,
+            'failures': 0,
+            'dead_letter_rows': 0,
+            'last_flush_latency': None,
+            'last_error': None
+        }
+
+        self._adopt_orphan_spools()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _adopt_orphan_spools(self):
+        # 接管已退出的进程 (或本进程中已关闭的队列) 留下的 spool 文件；
+        # pid 与本进程相同但不在 _live_spools 中的文件来自上一次使用相同 pid 的运行
+        adopted = []
+        with _live_spools_lock:
+            live = set(_live_spools)
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "*.jsonl"))):
+            pid = _spool_pid(path)
+            if path in live or (pid is not None and pid != os.getpid() and _pid_alive(pid)):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            adopted.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # 写到一半的最后一行
+                            continue
+                os.remove(path)
+            except OSError as e:
+                print(f"Failed to read write spool {path}: {e}")
+        if adopted:
+            print(f"Recovered {sum(len(item['rows']) for item in adopted)} unsaved rows from write spool.")
+            self._pending.extend(adopted)
+            self._rewrite_spool()
+
+    def _append_spool(self, item):
+        # 调用方持有 self._lock；先落盘再确认入队
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self):
+        # 调用方持有 self._lock；用剩余未写入的操作替换 spool
+        if not self._pending:
+            try:
+                os.remove(self.spool_path)
+            except FileNotFoundError:
+                pass
+            return
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for item in self._pending:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, self.spool_path)
+
+    def enqueue(self, op, table, rows, after=None):
+        """
+        after: fetch_runs 等记录所依赖的数据表，该表排在前面的行写入成功后才写入这一条
+        """
+        if not rows:
+            return 0
+        item = {'op': op, 'table': table, 'rows': rows, 'enqueued_at': time.time(), 'attempts': 0}
+        if after:
+            item['after'] = after
+        with self._lock:
+            try:
+                self._append_spool(item)
+            except OSError as e:
+                # 磁盘不可写时仍然放进内存队列，只是失去进程崩溃时的保护
+                print(f"Failed to spool rows for {table}: {e}")
+            self._pending.append(item)
+            self.stats['enqueued_rows'] += len(rows)
+            self._wakeup.notify()
+        return len(rows)
+
+    def _run(self):
+        try:
+            self._flush_loop()
+        finally:
+            with _live_spools_lock:
+                _live_spools.discard(self.spool_path)
+
+    def _flush_loop(self):
+        delay = 0
+        while True:
+            with self._lock:
+                # 等待新数据，再多等一个 flush_interval 让其他数据源的行一起进入这一批
+                while not self._pending and not self._stopped:
+                    self._wakeup.wait()
+                if not self._pending and self._stopped:
+                    return
+            time.sleep(delay or self.config['flush_interval'])
+
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                self._inflight = batch
+
+            started = time.perf_counter()
+            written, errors = self._write(batch)
+            remaining = [item for item in batch if id(item) not in written]
+            dead = self._expire(remaining, errors) if written else set()
+
+            with self._lock:
+                if dead:
+                    try:
+                        self._append_dead_letters([item for item in remaining if id(item) in dead], errors)
+                    except OSError as e:
+                        # 写不进 dead-letter 文件时继续留在队列中，不丢弃
+                        print(f"Failed to write dead letters: {e}")
+                        dead = set()
+                # 未写入的操作放回队首，保持顺序
+                self._pending = [item for item in remaining if id(item) not in dead] + self._pending
+                self._inflight = []
+                if written:
+                    self.stats['flushes'] += 1
+                    self.stats['flushed_rows'] += sum(len(item['rows']) for item in batch if id(item) in written)
+                    self.stats['last_flush_latency'] = round(time.perf_counter() - started, 3)
+                if errors:
+                    self.stats['failures'] += 1
+                    self.stats['last_error'] = "; ".join(f"{table}: {e}" for table, e in errors.items())
+                try:
+                    self._rewrite_spool()
+                except OSError as e:
+                    print(f"Failed to update write spool: {e}")
+                self._idle.notify_all()
+
+            if errors and self._stopped:
+                return
+            if written or not errors:
+                delay = 0
+            else:
+                # 一个都没写成功，多半是数据库不可用，整体退避
+                delay = min(self.config['retry_max'], max(self.config['retry_base'], delay * 2))
+                print(f"Write-behind retrying {len(remaining)} ops in {delay:.1f}s")
+
+    def _write(self, batch):
+        """
+        按 (操作, 表) 分组写入，每组单独成功或失败；fetch_runs 在数据表之后写，
+        对应数据表本轮写入失败的记录留到下一轮
+        Returns: (已写入的操作 id 集合, {表: 异常})
+        """
+        groups = {}
+        for item in batch:
+            groups.setdefault((item['op'] == OP_FETCH_RUN, item['op'], item['table']), []).append(item)
+
+        written = set()
+        errors = {}
+        # False (数据表) 排在 True (fetch_runs) 之前
+        for (_, op, table), items in sorted(groups.items(), key=lambda group: group[0][0]):
+            items = [item for item in items if item.get('after') not in errors]
+            if not items:
+                continue
+            try:
+                self.writer(op, table, [row for item in items for row in item['rows']])
+            except Exception as e:
+                errors[table] = e
+                print(f"Write-behind flush failed for {table} ({sum(len(item['rows']) for item in items)} rows): {e}")
+                continue
+            written.update(id(item) for item in items)
+        return written, errors
+
+    def _expire(self, remaining, errors):
+        """
+        本轮有其他写入成功 (数据库可用) 时调用：失败的操作计一次失败，
+        Returns: 达到 max_attempts 需要移入 dead-letter 的操作 id (连同依赖这些数据的 fetch_runs)
+        """
+        dead = set()
+        for item in remaining:
+            if item['table'] in errors:
+                item['attempts'] = item.get('attempts', 0) + 1
+                if item['attempts'] >= self.config['max_attempts']:
+                    dead.add(id(item))
+        dead_tables = {item['table'] for item in remaining if id(item) in dead}
+        live_tables = {item['table'] for item in remaining if id(item) not in dead}
+        for item in remaining:
+            # 数据已经放弃写入，对应的新鲜度记录也不能写，否则会跳过重新抓取
+            if item.get('after') in dead_tables and item['after'] not in live_tables:
+                dead.add(id(item))
+        return dead
+
+    def _append_dead_letters(self, items, errors):
+        # 调用方持有 self._lock；保留原始行和最后一次的错误，便于排查后手动重放
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            for item in items:
+                error = errors.get(item['table']) or errors.get(item.get('after'))
+                record = dict(item, error=str(error), dead_at=time.time())
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        rows = sum(len(item['rows']) for item in items)
+        self.stats['dead_letter_rows'] += rows
+        print(f"Gave up writing {rows} rows ({', '.join(sorted({item['table'] for item in items}))}), "
+              f"moved to {self.dead_letter_path}")
+
+    def flush(self, timeout=30):
+        """
+        等待队列写空，返回是否在超时前完成
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._wakeup.notify()
+            while self._pending or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """
+        写出剩余数据后停止后台线程；超时未写完的行留在 spool 中，下次启动时继续写入
+        """
+        done = self.flush(timeout)
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        return done
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            items = self._inflight + self._pending
+            stats['queue_depth'] = sum(len(item['rows']) for item in items)
+            stats['pending_ops'] = len(items)
+            oldest = min((item['enqueued_at'] for item in items), default=None)
+            stats['oldest_age'] = round(time.time() - oldest, 1) if oldest else None
+            return stats
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue(writer=None):
+    """
+    获取全局共享的写入队列 (第一次调用时必须提供 writer)
+    """
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                if writer is None:
+                    return None
+                _write_queue = WriteBehindQueue(writer)
+                # 进程正常退出时尽量写完，写不完的留在 spool 中
+                atexit.register(_write_queue.close, 5)
+    return _write_queue